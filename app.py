@@ -1,11 +1,15 @@
+# first import: start-up times are measured from here (Api.get_startup_report)
+from backend.perf import STARTUP
 import webview
 import os
 import sys
 import threading
 from backend.api import Api
+STARTUP.mark("imports")
 
 # Set up the API
 api = Api()
+STARTUP.mark("api_ready")
 
 def get_entrypoint():
     """
@@ -39,5 +43,16 @@ if __name__ == '__main__':
         resizable=True
     )
     api.set_window(window)
+
+    def on_loaded():
+        # the window is usable; see Api.get_startup_report
+        STARTUP.mark("window_loaded")
+    window.events.loaded += on_loaded
+
+    # pyedb import and EDB engine start-up overlap with the window rendering;
+    # the first load_edb waits for them instead of starting its own. The
+    # engine is started for the version the last session opened.
+    api.edb_manager.start_warm_up()
     
     webview.start(debug=False)
+    api.edb_manager.close()
@@ -0,0 +1,210 @@
+"""
+Headless batch runs: load -> generate -> save, without the webview window.
+
+    python -m backend board.aedb --settings settings.json --output "out/board_{k:03d}.aedb" \\
+        --variants 10 --seed 7 --workers 8 --nets "DDR*" --layers TOP BOTTOM
+
+Progress goes to stderr, the machine-readable JSON summary to stdout (and to
+--summary FILE). Exit code 0 when every variant was written, 1 otherwise.
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+
+from backend.edb_manager import EdbManager
+from backend.ensemble import variant_path
+from backend.geometry_backend import BACKENDS
+from backend.perf import PERF
+
+
+class ProgressBar:
+    """One-line progress bar on a terminal; plain start / done lines otherwise (logs)."""
+
+    def __init__(self, stream=sys.stderr, width=30, enabled=True):
+        self.stream = stream
+        self.width = width
+        self.enabled = enabled
+        self.tty = enabled and stream.isatty()
+        self.label = ""
+        self._t0 = 0.0
+        self._last = 0.0
+
+    def start(self, label):
+        self.label = label
+        self._t0 = self._last = time.perf_counter()
+        if self.enabled and not self.tty:
+            print(f"{label} ...", file=self.stream, flush=True)
+
+    def update(self, done, total):
+        if not self.tty:
+            return
+        now = time.perf_counter()
+        if now - self._last < 0.1 and done < total:
+            return
+        self._last = now
+        frac = done / total if total else 1.0
+        filled = int(round(frac * self.width))
+        eta = ""
+        if 0 < done < total:
+            eta = f" ETA {(now - self._t0) / done * (total - done):.0f}s"
+        self.stream.write(
+            f"\r{self.label:18} [{'#' * filled}{'.' * (self.width - filled)}] {frac:4.0%} {done}/{total}{eta}\033[K"
+        )
+        self.stream.flush()
+
+    def finish(self, note=""):
+        elapsed = time.perf_counter() - self._t0
+        if self.enabled:
+            line = f"{self.label} done in {elapsed:.2f}s{note}"
+            if self.tty:
+                self.stream.write(f"\r{line}\033[K\n")
+                self.stream.flush()
+            else:
+                print(line, file=self.stream, flush=True)
+        return elapsed
+
+
+def load_settings(path):
+    """Generation settings (same keys as the UI sends) from a JSON or YAML file."""
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.lower().endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise SystemExit("YAML settings need PyYAML (pip install pyyaml); or use a JSON file")
+        settings = yaml.safe_load(text) or {}
+    else:
+        settings = json.loads(text)
+    if not isinstance(settings, dict):
+        raise SystemExit(f"{path}: settings must be a mapping of setting -> value")
+    return settings
+
+
+def output_path(pattern, k, n_variants):
+    """pattern itself for a single variant without "{k}", else the numbered variant path."""
+    if n_variants == 1 and "{" not in pattern:
+        return pattern
+    return variant_path(pattern, k)
+
+
+def run(args, bar):
+    settings = load_settings(args.settings)
+    for key in ("workers", "nets", "layers"):
+        value = getattr(args, key)
+        if value is not None:
+            settings[key] = value
+
+    summary = {
+        "input": args.input,
+        "version": args.version,
+        "backend": args.backend,
+        "settings": settings,
+        "variants": args.variants,
+        "outputs": [],
+        "timings": {},
+        "ok": False,
+    }
+    t_start = time.perf_counter()
+    manager = EdbManager()
+    if args.no_cache:
+        manager.disk_cache.enabled = False
+    try:
+        bar.start("load")
+        snap = manager.open_edb(args.input, args.version, args.backend)
+        summary["timings"]["load"] = bar.finish(f" ({len(snap)} paths, {len(snap.net_names)} nets)")
+        summary["primitives"] = len(snap)
+        summary["nets"] = len(snap.net_names)
+        summary["selected"] = int(len(manager.selected_rows(snap, settings)))
+        if summary["selected"] == 0:
+            summary["error"] = "No Path primitive matches the net / layer filter"
+            return summary
+
+        # the same producer / writer pipeline as start_ensemble: bounded queue,
+        # variant k seeded with derive_seed(base_seed, k, primitive id)
+        base_seed = args.seed if args.seed is not None else settings.get("seed")
+        bar.start(f"{args.variants} variant(s)")
+        manager.start_ensemble(
+            settings, args.variants, lambda k: output_path(args.output, k, args.variants), base_seed=base_seed,
+            on_progress=lambda status: bar.update(status["written"] + status["failed"], args.variants),
+        )
+        status = manager.ensemble.wait()
+        bar.finish()
+        summary["base_seed"] = status["base_seed"]
+        summary["timings"]["generate"] = status["generate_time"]
+        summary["timings"]["save"] = status["write_time"]
+        summary["timings"]["ensemble"] = status["elapsed"]
+        for variant in sorted(status["variants"], key=lambda v: v["variant"]):
+            save = variant["save"] or {}
+            summary["outputs"].append({
+                "variant": variant["variant"],
+                "path": variant["path"],
+                "state": variant["state"],
+                "error": variant["error"],
+                "primitives": variant["primitives"],
+                "generate_time": variant["generate_time"],
+                "write_time": variant["write_time"],
+                "replaced": save.get("replaced"),
+                "missing": save.get("missing"),
+                "failed": save.get("failed"),
+                "save_timings": save.get("timings"),
+            })
+        if status["errors"]:
+            summary["error"] = "; ".join(status["errors"])
+        summary["ok"] = status["state"] == "done" and status["written"] == args.variants
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        manager.close()
+        summary["timings"]["total"] = time.perf_counter() - t_start
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m backend", description="Generate line width variations of an .aedb without the GUI."
+    )
+    parser.add_argument("input", help="source .aedb folder (or .json board, see geometry_backend.MemoryBackend)")
+    parser.add_argument("-s", "--settings", help="generation settings, JSON or YAML (same keys as the UI)")
+    parser.add_argument("-o", "--output", required=True,
+                        help='output .aedb, or a pattern like "out/board_{k:03d}.aedb" for several variants')
+    parser.add_argument("-n", "--variants", type=int, default=1, help="number of variants to write")
+    parser.add_argument("--seed", type=int,
+                        help="base seed, as start_ensemble uses it (reproducible runs); random when omitted")
+    parser.add_argument("-w", "--workers", type=int, help="worker processes, 0 = all cores")
+    parser.add_argument("--nets", nargs="+", metavar="NET", help="only vary these nets (fnmatch patterns)")
+    parser.add_argument("--layers", nargs="+", metavar="LAYER", help="only vary paths on these layers")
+    parser.add_argument("--version", default="2024.1", help="AEDT / EDB version")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), help="geometry backend, default: from the input path")
+    parser.add_argument("--summary", metavar="JSON", help="also write the summary to this file")
+    parser.add_argument("--no-cache", action="store_true", help="do not use the on-disk snapshot / generation cache")
+    parser.add_argument("--perf", action="store_true", help="include the per-stage perf report in the summary")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress output")
+    args = parser.parse_args(argv)
+    if args.variants < 1:
+        parser.error("--variants must be at least 1")
+
+    if args.perf:
+        PERF.enable()
+    # stdout is reserved for the summary; EdbManager's DEBUG prints go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        summary = run(args, ProgressBar(enabled=not args.quiet))
+    if args.perf:
+        summary["perf"] = PERF.report()
+
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            f.write(text)
+    if summary.get("error"):
+        print(f"Error: {summary['error']}", file=sys.stderr)
+    return 0 if summary["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ import os
 import json
 
 from backend.edb_manager import EdbManager
+from backend.perf import PERF, STARTUP
 
 class Api:
     def __init__(self):
@@ -36,6 +37,7 @@ class Api:
             return result
         return None
     
+    @PERF.timed("api.load_edb", payload=True)
     def load_edb(self, path, version="2024.1"):
         print(f"Loading EDB from {path} with version {version}")
         try:
@@ -44,6 +46,31 @@ class Api:
             print(f"Error loading EDB: {e}")
             return {"error": str(e)}
 
+    def start_load_edb(self, path, version="2024.1", priority=None, encoding="json"):
+        # streaming load: chunks of nets go to window.onLoadEvent(event) as they are
+        # extracted (priority nets first, see net_order), then a "complete" event
+        print(f"Streaming EDB from {path} with version {version}")
+        try:
+            return self.edb_manager.start_load(
+                path, version, on_event=self._push_load_event, on_progress=self._push_job_status,
+                priority=priority, encoding=encoding,
+            )
+        except Exception as e:
+            print(f"Error loading EDB: {e}")
+            return {"error": str(e)}
+
+    def _push_load_event(self, event):
+        if self._window is None:
+            return
+        try:
+            with PERF.stage("api.push_load_event") as span:
+                text = json.dumps(event)
+                span.add(items=len(event.get("nets", ())) if event.get("type") == "chunk" else 0, nbytes=len(text))
+                self._window.evaluate_js(f"window.onLoadEvent && window.onLoadEvent({text})")
+        except Exception as e:
+            print(f"Error pushing load event: {e}")
+
+    @PERF.timed("api.save_edb")
     def save_edb(self, path):
         print(f"Saving EDB to {path}")
         try:
@@ -52,6 +79,19 @@ class Api:
             print(f"Error saving EDB: {e}")
             return False
 
+    def queue_save(self, path):
+        # returns a job id; the save is written in the background
+        print(f"Queueing save to {path}")
+        try:
+            return self.edb_manager.queue_save(path)
+        except Exception as e:
+            print(f"Error queueing save: {e}")
+            return None
+
+    def get_save_status(self, job_id=None):
+        return self.edb_manager.get_save_status(job_id)
+
+    @PERF.timed("api.generate_variation")
     def generate_variation(self, settings):
         print(f"Generating variation with settings: {settings}")
         try:
@@ -60,5 +100,128 @@ class Api:
             print(f"Error generating variation: {e}")
             return False
 
-    def get_primitive_stats(self, primitive_id):
-        return self.edb_manager.get_primitive_stats(primitive_id)
+    def start_generation(self, settings):
+        # non-blocking generate; progress is pushed to window.onJobProgress(status)
+        print(f"Starting generation job with settings: {settings}")
+        try:
+            return self.edb_manager.start_generation(settings, on_progress=self._push_job_status)
+        except Exception as e:
+            print(f"Error starting generation: {e}")
+            return {"error": str(e)}
+
+    def get_job_status(self, job_id=None):
+        # state, processed / total primitives, elapsed and ETA (seconds)
+        return self.edb_manager.get_job_status(job_id)
+
+    def cancel_job(self, job_id):
+        return self.edb_manager.cancel_job(job_id)
+
+    def _push_job_status(self, status):
+        if self._window is None:
+            return
+        try:
+            self._window.evaluate_js(f"window.onJobProgress && window.onJobProgress({json.dumps(status)})")
+        except Exception as e:
+            print(f"Error pushing job status: {e}")
+
+    def start_ensemble(self, settings, n_variants, output_pattern, base_seed=None, store_path=None):
+        # N variants into numbered .aedb outputs; returns the initial status
+        print(f"Starting ensemble of {n_variants} variants -> {output_pattern}")
+        try:
+            return self.edb_manager.start_ensemble(
+                settings, n_variants, output_pattern, base_seed=base_seed, store_path=store_path
+            )
+        except Exception as e:
+            print(f"Error starting ensemble: {e}")
+            return {"error": str(e)}
+
+    def get_ensemble_status(self):
+        # generated / written / failed counts, outputs and variants per minute
+        return self.edb_manager.get_ensemble_status()
+
+    def cancel_ensemble(self):
+        return self.edb_manager.cancel_ensemble()
+
+    # encoding: "json" (default) or the opt-in binary "float64" / "float32" /
+    # "quantized" buffers of backend/transport.py
+    @PERF.timed("api.get_nets", payload=True)
+    def get_nets(self, zoom=None, pixel_tol=0.5, selected_id=None, encoding="json", viewport_px=1000):
+        # zoom: canvas scale; polygons are decimated to within pixel_tol pixels
+        # viewport_px: pixels the board diagonal spans at zoom 1
+        return self.edb_manager.get_nets(
+            zoom=zoom, pixel_tol=pixel_tol, viewport_px=viewport_px, selected_id=selected_id, encoding=encoding
+        )
+
+    @PERF.timed("api.get_lod", payload=True)
+    def get_lod(self, zoom, pixel_tol=0.5, selected_id=None, primitive_ids=None, encoding="json", viewport_px=1000):
+        # generated polygons only, at the level of detail of the new zoom
+        return self.edb_manager.get_lod(
+            zoom=zoom, pixel_tol=pixel_tol, viewport_px=viewport_px, selected_id=selected_id,
+            primitive_ids=primitive_ids, encoding=encoding,
+        )
+
+    @PERF.timed("api.query_viewport", payload=True)
+    def query_viewport(self, bbox, layers=None, zoom=None, encoding="json", viewport_px=1000, selected_id=None):
+        # primitives overlapping bbox = [xmin, ymin, xmax, ymax], optionally on layers only
+        return self.edb_manager.query_viewport(
+            bbox, layers, zoom=zoom, viewport_px=viewport_px, selected_id=selected_id, encoding=encoding
+        )
+
+    @PERF.timed("api.pick_primitive", payload=True)
+    def pick_primitive(self, x, y, tol):
+        # nearest primitive within tol of (x, y) in board units, or None
+        return self.edb_manager.pick_primitive(x, y, tol)
+
+    def open_ensemble_store(self, path):
+        try:
+            return self.edb_manager.open_ensemble_store(path)
+        except Exception as e:
+            print(f"Error opening ensemble store: {e}")
+            return {"error": str(e)}
+
+    @PERF.timed("api.get_primitive_stats", payload=True)
+    def get_primitive_stats(self, primitive_id, variant=None, encoding="json"):
+        # variant: index of an ensemble variant in the open store
+        return self.edb_manager.get_primitive_stats(primitive_id, variant, encoding=encoding)
+
+    def get_transport_report(self):
+        # payload bytes and latency of every encoding compared with JSON
+        return self.edb_manager.get_transport_report()
+
+    def get_generation_report(self):
+        # primitives, workers, chunk_size, wall/compute time and speedup of the last generate
+        return self.edb_manager.get_generation_report()
+
+    def get_cache_info(self):
+        # on-disk cache of snapshots / generations: entries, bytes, hits and misses
+        return self.edb_manager.get_cache_info()
+
+    def clear_cache(self):
+        return self.edb_manager.clear_cache()
+
+    def get_save_report(self):
+        # found / replaced / missing counts and per-phase timings of the last save
+        return self.edb_manager.get_save_report()
+
+    def set_perf_recording(self, enabled=True, trace_memory=False):
+        # off by default (near-zero cost); trace_memory adds tracemalloc peaks but slows everything down
+        if enabled:
+            PERF.enable(trace_memory=trace_memory)
+        else:
+            PERF.disable()
+        return PERF.options()
+
+    def get_startup_report(self):
+        # seconds from launch to imports, window loaded, engine warm-up and first board load
+        return STARTUP.report()
+
+    def get_perf_report(self, reset=False):
+        # per stage: calls, seconds, items, payload bytes and peak memory, slowest first
+        return PERF.report(reset=reset)
+
+    def dump_perf_report(self, path, reset=False):
+        try:
+            return PERF.dump(path, reset=reset)
+        except Exception as e:
+            print(f"Error writing perf report: {e}")
+            return None
@@ -0,0 +1,437 @@
+"""
+Headless benchmarks of the trace pipeline on synthetic boards (no pyedb needed).
+
+    python -m backend.benchmark                          # run and print the results
+    python -m backend.benchmark --save baseline.json     # run and store a baseline
+    python -m backend.benchmark --compare baseline.json  # flag regressions, exit code 1
+
+Timings are the best of --repeat runs; peak memory is measured in a separate
+run under tracemalloc (numpy buffers included), so it does not slow the timings.
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from backend import trace_generator as trace
+from backend.geometry_snapshot import GeometrySnapshot
+from backend.trace_generator import SENTINEL_Y
+
+# build_trace parameters of the stage benchmarks (per-trace pipeline)
+STAGE_PARAMS = {
+    "mu_w": 1e-4,
+    "sigma_w": 1e-5,
+    "L_c": 0.002,
+    "model": "matern32",
+    "ds_arc": 2e-4,
+    "n_resample": 1200,
+}
+STAGES = ("densify", "resample", "width_random_field_fft", "trace_polygon")
+
+# apply_variation settings of the board benchmarks. Adaptive sampling: a fixed
+# 1200 samples for 100k primitives would be ~6 GB of polygons and stats.
+BOARD_SETTINGS = {
+    "sigma_w": 10,
+    "L_c": 0.002,
+    "model": "matern32",
+    "resample_mode": "adaptive",
+    "seed": 0,
+    "workers": 1,
+}
+BOARD_SIZES = (10_000, 100_000)
+SHAPES = ("straight", "serpentine", "arcs")
+
+# -----------------------------
+# 1) Synthetic center lines ([x, y] points and [h, SENTINEL_Y] arc markers)
+# -----------------------------
+def straight_run(rng, length=0.02, corners=3):
+    """Polyline of straight segments with 45/90 degree corners (no arcs)."""
+    pts = [[0.0, 0.0]]
+    x = y = 0.0
+    heading = 0.0
+    for leg in rng.dirichlet(np.ones(corners + 1)) * length:
+        x += leg * np.cos(heading)
+        y += leg * np.sin(heading)
+        pts.append([x, y])
+        heading += rng.choice([-np.pi / 2, -np.pi / 4, np.pi / 4, np.pi / 2])
+    return pts
+
+def serpentine(rng, meanders=6, run=0.004, radius=5e-4):
+    """Length-matching meander: runs along x joined by semicircular U-turns."""
+    pts = [[0.0, 0.0]]
+    x = y = 0.0
+    for m in range(meanders):
+        x += run if m % 2 == 0 else -run
+        pts.append([x, y])
+        # chord 2r, sagitta r; bulge away from the runs
+        pts.append([-radius if m % 2 == 0 else radius, SENTINEL_Y])
+        y += 2 * radius
+        pts.append([x, y])
+    x += run if meanders % 2 == 0 else -run
+    pts.append([x, y])
+    return pts
+
+def many_arcs(rng, arcs=20, chord=0.001):
+    """Wavy path of consecutive arcs with random sagitta (up to semicircles)."""
+    pts = [[0.0, 0.0]]
+    x = 0.0
+    for a in range(arcs):
+        c = chord * rng.uniform(0.5, 1.5)
+        sign = 1.0 if a % 2 == 0 else -1.0
+        pts.append([sign * c * rng.uniform(0.05, 0.5), SENTINEL_Y])
+        x += c
+        pts.append([x, 0.0])
+    return pts
+
+def synthetic_path(shape, rng, scale=1.0):
+    """One center line of the given shape; scale < 1 makes short board segments."""
+    if shape == "straight":
+        return straight_run(rng, length=0.02 * scale * rng.uniform(0.5, 1.5), corners=int(rng.integers(0, 5)))
+    if shape == "serpentine":
+        return serpentine(rng, meanders=int(rng.integers(2, 10)), run=0.004 * scale, radius=5e-4 * scale)
+    if shape == "arcs":
+        return many_arcs(rng, arcs=int(rng.integers(5, 30)), chord=0.001 * scale)
+    raise ValueError(f"Unknown shape: {shape}")
+
+def synthetic_paths(shape, count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [synthetic_path(shape, rng) for _ in range(count)]
+
+def synthetic_board(primitives, seed=0, shapes=SHAPES, per_net=4, layers=4, scale=0.25):
+    """
+    GeometrySnapshot of a board with the given number of Path primitives:
+    a mix of the shapes, per_net primitives per net, spread over a grid of
+    cells so the board has a realistic extent.
+    """
+    rng = np.random.default_rng(seed)
+    cols = int(np.ceil(np.sqrt(primitives)))
+    pitch = 0.03 * scale
+    ids, widths, net_index, layer_index, lengths, chunks = [], [], [], [], [], []
+    for i in range(primitives):
+        pts = np.asarray(synthetic_path(shapes[i % len(shapes)], rng, scale), dtype=float)
+        normal = pts[:, 1] != SENTINEL_Y
+        pts[normal] += [(i % cols) * pitch, (i // cols) * pitch]
+        ids.append(i + 1)
+        widths.append(rng.uniform(7.5e-5, 1.5e-4))
+        net_index.append(i // per_net)
+        layer_index.append(i % layers)
+        lengths.append(len(pts))
+        chunks.append(pts)
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    points = np.concatenate(chunks) if chunks else np.empty((0, 2))
+    net_names = [f"NET_{k}" for k in range((primitives + per_net - 1) // per_net)]
+    layer_names = [f"L{k + 1}" for k in range(layers)]
+    return GeometrySnapshot(ids, widths, net_index, layer_index, offsets, points, net_names, layer_names)
+
+# -----------------------------
+# 2) Measurements
+# -----------------------------
+def _peak_memory(run):
+    """Peak traced bytes while run() executes, above what was allocated before."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run()
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+def _result(seconds, items, points=None, peak_bytes=None):
+    out = {
+        "seconds": seconds,
+        "items": items,
+        "items_per_s": items / seconds if seconds > 0 else None,
+    }
+    if points is not None:
+        out["points"] = points
+        out["points_per_s"] = points / seconds if seconds > 0 else None
+    if peak_bytes is not None:
+        out["peak_bytes"] = peak_bytes
+    return out
+
+def _run_stages(paths, params, seeds, timings=None):
+    """build_trace stages A-D on every path; adds the seconds of each stage to timings."""
+    outputs = {stage: [] for stage in STAGES}
+    clock = time.perf_counter
+    for path, seed in zip(paths, seeds):
+        t0 = clock()
+        dense = trace.densify_path_with_arc_height(path, ds_arc=params["ds_arc"])
+        t1 = clock()
+        centerline, s = trace.resample_by_arclength(dense, n_samples=params["n_resample"])
+        t2 = clock()
+        w_s = trace.width_random_field_fft(
+            s, params["mu_w"], params["sigma_w"], params["L_c"], model=params["model"], seed=seed
+        )
+        t3 = clock()
+        polygon, _, _ = trace.trace_polygon(centerline, w_s)
+        t4 = clock()
+        if timings is not None:
+            timings["densify"] += t1 - t0
+            timings["resample"] += t2 - t1
+            timings["width_random_field_fft"] += t3 - t2
+            timings["trace_polygon"] += t4 - t3
+        outputs["densify"].append(dense)
+        outputs["resample"].append(centerline)
+        outputs["width_random_field_fft"].append(w_s)
+        outputs["trace_polygon"].append(polygon)
+    return outputs
+
+def _stage_peaks(paths, params, seeds):
+    """Largest working memory of a single call of each stage."""
+    peaks = dict.fromkeys(STAGES, 0)
+    tracemalloc.start()
+    try:
+        for path, seed in zip(paths, seeds):
+            def measure(stage, fn):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                out = fn()
+                peaks[stage] = max(peaks[stage], tracemalloc.get_traced_memory()[1] - before)
+                return out
+
+            dense = measure("densify", lambda: trace.densify_path_with_arc_height(path, ds_arc=params["ds_arc"]))
+            centerline, s = measure("resample", lambda: trace.resample_by_arclength(dense, params["n_resample"]))
+            w_s = measure("width_random_field_fft", lambda: trace.width_random_field_fft(
+                s, params["mu_w"], params["sigma_w"], params["L_c"], model=params["model"], seed=seed
+            ))
+            measure("trace_polygon", lambda: trace.trace_polygon(centerline, w_s))
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def bench_stages(shape, count=1000, repeat=3, params=None, seed=0, memory=True):
+    """Time every build_trace stage over count synthetic paths of one shape."""
+    params = {**STAGE_PARAMS, **(params or {})}
+    paths = synthetic_paths(shape, count, seed)
+    seeds = [trace.derive_seed(seed, i) for i in range(count)]
+
+    best = dict.fromkeys(STAGES, np.inf)
+    for _ in range(repeat):
+        timings = dict.fromkeys(STAGES, 0.0)
+        outputs = _run_stages(paths, params, seeds, timings)
+        for stage in STAGES:
+            best[stage] = min(best[stage], timings[stage])
+    peaks = _stage_peaks(paths, params, seeds) if memory else {}
+
+    results = {}
+    for stage in STAGES:
+        points = int(sum(len(o) for o in outputs[stage]))
+        results[f"stages/{shape}/{stage}"] = _result(best[stage], count, points, peaks.get(stage))
+    return results
+
+def bench_board(primitives, repeat=1, settings=None, seed=0, memory=True):
+    """
+    The whole apply_variation flow on a synthetic board: a cold generation
+    (empty stage cache) and a regeneration that only changes sigma_w, with the
+    disk cache off. The *_default runs repeat the regeneration as the app runs
+    it, with the disk cache on (in a temporary directory): seeded, and without
+    a seed as the UI sends it.
+    """
+    import tempfile
+    from backend.disk_cache import DiskCache
+    from backend.edb_manager import EdbManager
+
+    settings = {**BOARD_SETTINGS, **(settings or {})}
+    sigma_w = float(settings.get("sigma_w", 10))
+    unseeded = {k: v for k, v in settings.items() if k != "seed"}
+    snap = synthetic_board(primitives, seed)
+
+    manager = EdbManager()
+    manager.snapshot = snap
+    manager.edb_fingerprint = f"benchmark-{primitives}-{seed}"
+    cache_dir = tempfile.TemporaryDirectory(prefix="lwv-bench-")
+    manager.disk_cache = DiskCache(cache_dir.name)
+    rescales = itertools.count(1)
+    try:
+        def cold():
+            manager.stage_cache.clear()
+            manager.apply_variation(settings)
+
+        def regenerate(base=settings):
+            # a new sigma_w every call: a disk cache miss that reuses the stage cache
+            manager.apply_variation({**base, "sigma_w": sigma_w * (1.5 + 0.01 * next(rescales))})
+
+        # settings.seed fixes the seeds, so after a cold run every rescale
+        # finds its width fields in the stage cache
+        results = {}
+        for name, run, disk_cache in (
+            ("apply_variation", cold, False),
+            ("apply_variation_rescale", regenerate, False),
+            ("apply_variation_rescale_default", regenerate, True),
+            ("apply_variation_rescale_default_unseeded", lambda: regenerate(unseeded), True),
+        ):
+            manager.disk_cache.enabled = disk_cache
+            best = np.inf
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                run()
+                best = min(best, time.perf_counter() - t0)
+                # background cache writes are not part of the call, but must not overlap the next one
+                manager.disk_cache.flush()
+            points = int(len(manager.generated_data.polygons.values))
+            peak = _peak_memory(run) if memory else None
+            manager.disk_cache.flush()
+            result = _result(best, primitives, points, peak)
+            result["report"] = {
+                k: manager.generation_report.get(k)
+                for k in ("wall_time", "merge_time", "workers", "chunks", "recomputed", "bytes", "disk_cache")
+            }
+            results[f"board/{primitives}/{name}"] = result
+    finally:
+        manager.close()
+        cache_dir.cleanup()
+    return results
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+def run_suite(paths_per_shape=1000, boards=BOARD_SIZES, repeat=3, seed=0, memory=True, settings=None, log=print):
+    """Stage benchmarks of every shape, then the board benchmarks. Returns the results JSON."""
+    results = {}
+    for shape in SHAPES:
+        log(f"stages: {paths_per_shape} {shape} paths")
+        results.update(bench_stages(shape, paths_per_shape, repeat, seed=seed, memory=memory))
+    for primitives in boards:
+        log(f"board: {primitives} primitives")
+        # a board run is long enough that one repetition is stable
+        results.update(bench_board(primitives, max(1, repeat // 3), settings, seed=seed, memory=memory))
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "config": {
+            "paths_per_shape": paths_per_shape,
+            "boards": list(boards),
+            "repeat": repeat,
+            "seed": seed,
+            "stage_params": STAGE_PARAMS,
+            "board_settings": {**BOARD_SETTINGS, **(settings or {})},
+        },
+        "results": results,
+    }
+
+# -----------------------------
+# 3) Baseline comparison
+# -----------------------------
+def compare(current, baseline, threshold=0.25, memory_threshold=0.25):
+    """
+    Benchmarks present in both runs with their ratios (current / baseline).
+    A benchmark regressed when it got slower than 1 + threshold or its peak
+    memory grew above 1 + memory_threshold.
+    """
+    rows = []
+    for name, cur in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        time_ratio = cur["seconds"] / base["seconds"] if base["seconds"] else None
+        mem_ratio = None
+        if cur.get("peak_bytes") and base.get("peak_bytes"):
+            mem_ratio = cur["peak_bytes"] / base["peak_bytes"]
+        rows.append({
+            "name": name,
+            "seconds": cur["seconds"],
+            "baseline_seconds": base["seconds"],
+            "time_ratio": time_ratio,
+            "memory_ratio": mem_ratio,
+            "regression": bool(
+                (time_ratio is not None and time_ratio > 1 + threshold)
+                or (mem_ratio is not None and mem_ratio > 1 + memory_threshold)
+            ),
+        })
+    return rows
+
+def _format_bytes(n):
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+
+def format_results(report):
+    lines = [f"{'benchmark':48} {'seconds':>10} {'items/s':>12} {'points/s':>12} {'peak':>10}"]
+    for name, r in report["results"].items():
+        lines.append(
+            f"{name:48} {r['seconds']:10.4f} {r['items_per_s'] or 0:12.0f} "
+            f"{r.get('points_per_s') or 0:12.0f} {_format_bytes(r.get('peak_bytes')):>10}"
+        )
+    return "\n".join(lines)
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':48} {'seconds':>10} {'baseline':>10} {'time':>7} {'memory':>7}"]
+    for row in rows:
+        # no ratio when the baseline took no measurable time
+        ratio = f"{row['time_ratio']:.2f}x" if row["time_ratio"] is not None else "n/a"
+        mem = f"{row['memory_ratio']:.2f}x" if row["memory_ratio"] is not None else "-"
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(
+            f"{row['name']:48} {row['seconds']:10.4f} {row['baseline_seconds']:10.4f} "
+            f"{ratio:>7} {mem:>7}{flag}"
+        )
+    return "\n".join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmark", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paths", type=int, default=1000, help="synthetic paths per shape for the stage benchmarks")
+    parser.add_argument("--boards", type=int, nargs="*", default=list(BOARD_SIZES),
+                        help="primitive counts of the apply_variation boards")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=BOARD_SETTINGS["workers"])
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--save", metavar="JSON", help="write the results (e.g. as the new baseline)")
+    parser.add_argument("--compare", metavar="JSON", help="baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown / memory growth, 0.25 = 25%%")
+    parser.add_argument("--write-board", metavar="JSON",
+                        help="only write a synthetic board of the first --boards size as a JSON board file")
+    args = parser.parse_args(argv)
+
+    if args.write_board:
+        from backend.geometry_backend import MemoryBackend
+
+        primitives = args.boards[0] if args.boards else BOARD_SIZES[0]
+        MemoryBackend.from_snapshot(synthetic_board(primitives, args.seed)).save_as(args.write_board)
+        print(f"{primitives} primitives written to {args.write_board}", file=sys.stderr)
+        return 0
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    report = run_suite(
+        args.paths, args.boards, args.repeat, args.seed, memory=not args.no_memory,
+        settings={"workers": args.workers}, log=log,
+    )
+    print(format_results(report))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        log(f"results written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("environment") != report["environment"]:
+            log("warning: baseline was recorded in a different environment")
+        rows = compare(report, baseline, args.threshold, args.threshold)
+        print()
+        print(format_comparison(rows))
+        regressions = [row["name"] for row in rows if row["regression"]]
+        if regressions:
+            log(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+from backend.geometry_snapshot import GeometrySnapshot
+from backend.packed_data import PackedSeries
+from backend.perf import PERF
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "line-width-variator")
+
+_fingerprints = {} # (edb.def path, size, mtime) -> fingerprint
+
+
+def edb_fingerprint(edb_path):
+    """
+    Content fingerprint of an .aedb: size, mtime and SHA-1 of its edb.def
+    (of the file itself for single-file boards such as JSON).
+    The hash is memoized per (path, size, mtime), so it is computed once per
+    file version. Returns None when there is no edb.def to fingerprint.
+    """
+    def_path = edb_path if os.path.isfile(edb_path) else os.path.join(edb_path, "edb.def")
+    try:
+        st = os.stat(def_path)
+    except OSError:
+        return None
+    memo_key = (os.path.abspath(def_path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _fingerprints:
+        h = hashlib.sha1()
+        with open(def_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _fingerprints[memo_key] = f"{st.st_size:x}-{st.st_mtime_ns:x}-{h.hexdigest()}"
+    return _fingerprints[memo_key]
+
+
+def generation_key(fingerprint, settings, ids, seeds, ignore=()):
+    """Cache key of one generation: board, normalized settings and per-primitive seeds."""
+    normalized = {k: settings[k] for k in sorted(settings) if k not in ignore}
+    h = hashlib.sha1()
+    h.update(fingerprint.encode())
+    h.update(json.dumps(normalized, sort_keys=True, default=str).encode())
+    h.update(np.ascontiguousarray(ids, dtype=np.int64).tobytes())
+    h.update(np.ascontiguousarray(seeds, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Size-capped cache directory of snapshots and generations, as compressed .npz.
+
+      snap-<fingerprint>.npz - GeometrySnapshot arrays of one board
+      gen-<key>.npz          - polygons and width fields of one generation
+
+    Every hit refreshes the file's mtime and the oldest files are evicted once
+    the directory exceeds max_bytes, generations before snapshots. An entry
+    larger than max_bytes is not stored at all.
+
+    Generations are written on a background thread (store_generation with
+    background=True) so compressing them stays off the apply_variation path;
+    a newer generation replaces one still waiting, flush() waits for the write.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=1024 * 2**20, enabled=True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = Counter()
+        self.misses = Counter()
+        self.skipped = 0 # entries larger than max_bytes
+        self.last_error = None # of the background writer
+        self._lock = threading.Lock()
+        self._pending = None # (name, arrays) waiting for the writer thread
+        self._pending_lock = threading.Lock()
+        self._writer = None
+
+    # -----------------------------
+    # snapshots
+    # -----------------------------
+    def load_snapshot(self, fingerprint):
+        data = self._load("snapshot", f"snap-{fingerprint}") if fingerprint else None
+        if data is None:
+            return None
+        return GeometrySnapshot(
+            data["ids"], data["widths"], data["net_index"], data["layer_index"],
+            data["offsets"], data["points"], data["net_names"].tolist(), data["layer_names"].tolist(),
+        )
+
+    def store_snapshot(self, fingerprint, snap):
+        if not fingerprint:
+            return
+        self._store(f"snap-{fingerprint}", {
+            "ids": snap.ids,
+            "widths": snap.widths,
+            "net_index": snap.net_index,
+            "layer_index": snap.layer_index,
+            "offsets": snap.offsets,
+            "points": snap.points,
+            "net_names": np.array(snap.net_names, dtype=str),
+            "layer_names": np.array(snap.layer_names, dtype=str),
+        })
+
+    # -----------------------------
+    # generations
+    # -----------------------------
+    def load_generation(self, key):
+        """(polygons, s, w_s) PackedSeries and the LOD significance (or None), or None on a miss."""
+        data = self._load("generation", f"gen-{key}")
+        if data is None:
+            return None
+        ids = data["ids"]
+        return (
+            PackedSeries(ids, data["poly_offsets"], data["polygons"]),
+            PackedSeries(ids, data["field_offsets"], data["s"]),
+            PackedSeries(ids, data["field_offsets"], data["w_s"]),
+            data.get("significance"),
+        )
+
+    def store_generation(self, key, polygons, s, w_s, significance=None, background=False):
+        arrays = {
+            "ids": polygons.ids,
+            "poly_offsets": polygons.offsets,
+            "polygons": polygons.values,
+            "field_offsets": s.offsets,
+            "s": s.values,
+            "w_s": w_s.values,
+        }
+        if significance is not None:
+            arrays["significance"] = significance
+        if background:
+            self._store_later(f"gen-{key}", arrays)
+        else:
+            self._store(f"gen-{key}", arrays)
+
+    def _store_later(self, name, arrays):
+        if not self.enabled:
+            return
+        with self._pending_lock:
+            self._pending = (name, arrays)
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._drain, daemon=True)
+                self._writer.start()
+
+    def _drain(self):
+        while True:
+            with self._pending_lock:
+                item, self._pending = self._pending, None
+                if item is None:
+                    self._writer = None
+                    return
+            name, arrays = item
+            try:
+                with PERF.stage("disk_cache.store_generation", nbytes=sum(a.nbytes for a in arrays.values())):
+                    self._store(name, arrays)
+            except Exception as e:
+                self.last_error = f"{name}: {e}"
+
+    def flush(self):
+        """Wait until the background writer stored every pending generation."""
+        while True:
+            with self._pending_lock:
+                writer = self._writer
+            if writer is None:
+                return
+            writer.join()
+
+    # -----------------------------
+    # housekeeping
+    # -----------------------------
+    def info(self):
+        entries = self._entries()
+        return {
+            "enabled": self.enabled,
+            "root": self.root,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "skipped": self.skipped,
+            "pending": self._writer is not None,
+            "last_error": self.last_error,
+        }
+
+    def clear(self):
+        self.flush()
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.hits.clear()
+            self.misses.clear()
+
+    def _path(self, name):
+        return os.path.join(self.root, f"{name}-v{CACHE_VERSION}.npz")
+
+    def _entries(self):
+        """(path, size, mtime) of every cache file."""
+        if not os.path.isdir(self.root):
+            return []
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".npz"):
+                st = entry.stat()
+                entries.append((entry.path, st.st_size, st.st_mtime_ns))
+        return entries
+
+    def _load(self, kind, name):
+        if not self.enabled:
+            return None
+        path = self._path(name)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                data = {k: npz[k] for k in npz.files}
+        except (OSError, ValueError, KeyError):
+            self.misses[kind] += 1
+            return None
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass
+        self.hits[kind] += 1
+        return data
+
+    def _store(self, name, arrays):
+        if not self.enabled:
+            return
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **arrays)
+        if buf.getbuffer().nbytes > self.max_bytes:
+            # would evict everything else and then itself on the next store
+            self.skipped += 1
+            return
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            path = self._path(name)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(buf.getbuffer())
+            os.replace(tmp, path)
+            self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        # oldest generations first: a snapshot saves a whole board extraction
+        entries = sorted(self._entries(), key=lambda e: (os.path.basename(e[0]).startswith("snap-"), e[2]))
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if path == keep:
+                continue
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
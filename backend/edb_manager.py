@@ -1,23 +1,176 @@
-from pyedb import Edb
 import sys
 import os
+import random
+import fnmatch
+import itertools
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
 
 # Add parent directory to path to import trace.py if it's in the root
 # sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # import trace
 from backend import trace_generator as trace
+from backend.geometry_backend import backend_class
+from backend.geometry_snapshot import GeometrySnapshot, extract_nets, net_order
+from backend.edb_writer import EdbWriter
+from backend.stage_cache import StageCache
+from backend.ensemble import EnsembleRun
+from backend.jobs import GenerationJob, JobCancelled, LoadJob
+from backend.ensemble_store import EnsembleStore
+from backend.disk_cache import DEFAULT_CACHE_DIR, DiskCache, edb_fingerprint, generation_key
+from backend.packed_data import GeneratedData, VariationData, pack_generation
+from backend import transport
+from backend.perf import PERF, STARTUP, call_recorded
+from backend.spatial_index import SpatialIndex, distance_to_path, distance_to_polygon, path_bounds, series_bounds
+
+# Finest level of detail, relative to the board diagonal (deeper zoom: full resolution)
+LOD_FLOOR = 1e-5
+
+# Engine version last opened per backend: what start_warm_up prepares at the next start
+LAST_SESSION_PATH = os.path.join(DEFAULT_CACHE_DIR, "last_session.json")
+
+def _read_last_session():
+    try:
+        with open(LAST_SESSION_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# Settings that only change how a generation runs, not its result
+RUN_ONLY_SETTINGS = ("reseed", "workers", "batch_size", "stage_cache_mb", "disk_cache")
 
 class EdbManager:
     def __init__(self):
-        self.edb = None
+        self.edb = None # GeometryBackend of the open board (pyedb, or a JSON board)
         self.edb_path = None
         self.variation_data = {}
-        self.generated_data = {} # Map of original_id -> {points, width, layer, net, type}
+        self.generated_data = {} # GeneratedData: original_id -> {points, width, layer, net}
+        self.generation_report = {}
+        self.save_report = {}
+        self.snapshot = None # GeometrySnapshot of the open EDB, see get_snapshot()
+        self._pool = None
+        self._pool_workers = 0
+        self.writer = EdbWriter()
+        self.stage_cache = StageCache()
+        self.disk_cache = DiskCache() # snapshots and generations across sessions
+        self.edb_fingerprint = None
+        self.spatial_index = None # SpatialIndex of the displayed geometry, see get_spatial_index()
+        self.seeds = {} # primitive id -> seed of its current width field
+        self._last_settings = None
+        self._reseeded = False
+        self._generate_lock = threading.RLock()
+        self.ensemble = None # current / last EnsembleRun
+        self.jobs = {} # job id -> GenerationJob
+        self._job_ids = itertools.count(1)
+        self.ensemble_store = None # EnsembleStore queried by get_primitive_stats(..., variant)
+        self._ensemble_store_path = None
+        self._streaming = False # load_edb_streaming is filling the snapshot
+        self._warm_up = None # thread of start_warm_up
+        self.warm_up_report = {}
+
+    def start_warm_up(self, backend="pyedb", version=None):
+        """
+        Import the geometry backend and start its engine on a background thread
+        (while the window renders); the first load_edb waits for it instead of
+        initializing the engine a second time. version defaults to the one the
+        last session opened (see LAST_SESSION_PATH).
+        """
+        if self._warm_up is not None:
+            return self.warm_up_report
+        if version is None:
+            version = _read_last_session().get(backend, {}).get("version", "2024.1")
+        report = self.warm_up_report = {"backend": backend, "version": version, "state": "running"}
+
+        def run():
+            STARTUP.mark("warm_up_started")
+            try:
+                report["timings"] = backend_class(backend).warm_up(version)
+                report["state"] = "done"
+            except Exception as e:
+                # best effort: the first load_edb reports the real error
+                report.update(state="failed", error=str(e))
+            STARTUP.mark("warm_up_done")
+            STARTUP.note("warm_up", report)
+
+        self._warm_up = threading.Thread(target=run, daemon=True)
+        self._warm_up.start()
+        return report
+
+    def _wait_warm_up(self, backend, version):
+        """
+        Wait for a running warm-up; returns the version it started the engine
+        with when that differs from the one about to be opened, else None.
+        """
+        if self._warm_up is None:
+            return None
+        if self._warm_up.is_alive():
+            t0 = time.perf_counter()
+            self._warm_up.join()
+            STARTUP.note("first_open_waited_for_warm_up", time.perf_counter() - t0)
+        report = self.warm_up_report
+        if report.get("state") != "done" or report["backend"] != backend or report["version"] == version:
+            return None
+        STARTUP.note("warm_up_version_mismatch", {"warmed_up": report["version"], "opened": version})
+        return report["version"]
+
+    def _remember_version(self, backend, version):
+        session = _read_last_session()
+        if session.get(backend, {}).get("version") == version:
+            return
+        session[backend] = {"version": version}
+        try:
+            os.makedirs(os.path.dirname(LAST_SESSION_PATH), exist_ok=True)
+            with open(LAST_SESSION_PATH, "w", encoding="utf-8") as f:
+                json.dump(session, f)
+        except OSError:
+            pass
+
+    def load_edb(self, path, version="2024.1", backend=None):
+        self.open_edb(path, version, backend)
+        nets = self.get_nets()
+        STARTUP.mark("first_load_edb")
+        return nets
 
-    def load_edb(self, path, version="2024.1"):
+    def open_edb(self, path, version="2024.1", backend=None):
+        """
+        load_edb without building the nets payload (headless runs); returns the snapshot.
+        backend: GeometryBackend name, by default guessed from path (see backend_class).
+        """
+        self._stop_jobs()
+        with self._generate_lock:
+            self._open_edb(path, version, backend)
+            self.snapshot = self.disk_cache.load_snapshot(self.edb_fingerprint)
+            if self.snapshot is None:
+                self.disk_cache.store_snapshot(self.edb_fingerprint, self.get_snapshot())
+            return self.snapshot
+
+    def _stop_jobs(self):
+        """
+        Cancel the generation / load jobs and the ensemble run of the open board
+        before another one is opened. Jobs stop at their next batch and release
+        _generate_lock, which _open_edb runs under; the ensemble is waited for
+        since its writer still reads the board it was started on.
+        """
+        for job in self.jobs.values():
+            if job.status()["state"] in ("queued", "running"):
+                job.cancel()
+        if self.ensemble is not None:
+            self.ensemble.cancel()
+            self.ensemble.wait()
+
+    def _open_edb(self, path, version, backend=None):
+        """
+        Close the previous session, reset everything derived from it and open
+        path. Callers hold _generate_lock, so no generation runs meanwhile.
+        """
         if self.edb:
             try:
-                self.edb.close_edb()
+                self.edb.close()
             except:
                 pass
         
@@ -25,174 +178,803 @@ class EdbManager:
         self.edb_version = version
         self.generated_data = {}
         self.variation_data = {}
-        # You might want to make the version configurable
-        self.edb = Edb(path, edbversion=version) 
-        return self.get_nets()
+        self.stage_cache.clear()
+        self.seeds = {}
+        self._last_settings = None
+        self.invalidate_snapshot()
+        self.spatial_index = None
+        # pyedb is only imported once an .aedb is opened (JSON boards and benchmarks run without it),
+        # or ahead of time by start_warm_up
+        cls = backend_class(backend, path)
+        warmed_up = self._wait_warm_up(cls.name, version)
+        with PERF.stage(f"{cls.name}.open"):
+            try:
+                self.edb = cls.open(path, version)
+            except Exception as e:
+                if warmed_up is None:
+                    raise
+                # one engine version per process: the warm-up already loaded another one
+                raise RuntimeError(
+                    f"{e} (the EDB engine of this session was started for version {warmed_up}; "
+                    f"restart the application to open version {version})"
+                ) from e
+        self._remember_version(cls.name, version)
+        self.edb_fingerprint = edb_fingerprint(path)
+        STARTUP.mark("first_board_open")
 
-    def get_nets(self):
-        if not self.edb:
+    def load_edb_streaming(self, path, version="2024.1", emit=None, chunk_size=500, priority=None,
+                           encoding="json", progress=None, cancel=None, backend=None):
+        """
+        load_edb that hands the Paths to emit(event) in chunks while they are
+        extracted: the nets named in priority first, then in net_order (smallest first where cheap):
+          {"type": "chunk", "nets": [...], "processed", "total"} - nets in get_nets
+              format; a large net may be split over several chunks
+          {"type": "complete", "nets", "primitives", "elapsed"}
+        progress(done, total) counts nets; cancel: see apply_variation.
+        """
+        t0 = time.perf_counter()
+        # a LoadJob already holds the lock (start_load stopped the other jobs)
+        with self._generate_lock:
+            self._open_edb(path, version, backend)
+            snap = self.disk_cache.load_snapshot(self.edb_fingerprint)
+            if snap is not None:
+                total = len(snap.net_names)
+                source = snap.iter_nets(priority)
+            else:
+                order = net_order(self.edb, priority)
+                total = len(order)
+                source = extract_nets(self.edb, order)
+
+            self._streaming = True
+            try:
+                snap = self._stream_nets(source, snap, total, emit, chunk_size, encoding, progress, cancel)
+            finally:
+                self._streaming = False
+        event = {"type": "complete", "nets": len(snap.net_names), "primitives": len(snap), "elapsed": time.perf_counter() - t0}
+        if emit:
+            emit(event)
+        STARTUP.mark("first_load_edb")
+        return event
+
+    def _stream_nets(self, source, snap, total, emit, chunk_size, encoding, progress, cancel):
+        """Chunking loop of load_edb_streaming; returns the finished snapshot."""
+        extracted, batch, pending, done = [], [], 0, 0
+
+        def flush():
+            nonlocal batch, pending
+            primitives = [p for net in batch for p in net["primitives"]]
+            event = {"type": "chunk", "nets": batch, "processed": done, "total": total}
+            event.update(transport.encode_primitives(primitives, encoding))
+            if emit:
+                emit(event)
+            if progress:
+                progress(done, total)
+            batch, pending = [], 0
+
+        for k, net_name, records in source:
+            if cancel is not None and cancel.is_set():
+                raise JobCancelled()
+            extracted.append((k, net_name, records))
+            done += 1
+            # records of one net are split into chunk_size pieces
+            for start in range(0, max(len(records), 1), chunk_size):
+                piece = records[start:start + chunk_size]
+                batch.append({"name": net_name, "primitives": [
+                    {"id": pid, "type": "Path", "layer": layer, "width": float(width), "points": center_line}
+                    for pid, width, layer, center_line in piece
+                ]})
+                pending += len(piece)
+                if pending >= chunk_size:
+                    flush()
+        if batch:
+            flush()
+
+        if snap is None:
+            snap = GeometrySnapshot.from_nets(extracted)
+            self.disk_cache.store_snapshot(self.edb_fingerprint, snap)
+        self.snapshot = snap
+        return snap
+
+    def get_snapshot(self):
+        """Geometry of all signal-net Paths, extracted from pyedb once per EDB session."""
+        if self.snapshot is None and self.edb and not self._streaming:
+            with PERF.stage("manager.extract_snapshot") as span:
+                self.snapshot = GeometrySnapshot.from_edb(self.edb)
+                span.add(items=len(self.snapshot))
+        return self.snapshot
+
+    def invalidate_snapshot(self):
+        """Call whenever the open EDB changes; the next access re-extracts it."""
+        self.snapshot = None
+
+    def lod_tolerance(self, zoom=None, pixel_tol=0.5, viewport_px=1000):
+        """
+        Board units one pixel_tol covers at the given canvas zoom, assuming the
+        whole board fits viewport_px pixels at zoom 1. None (full resolution)
+        when no zoom is given.
+        """
+        snap = self.get_snapshot()
+        if zoom is None or snap is None:
+            return None
+        xmin, ymin, xmax, ymax = snap.bounds()
+        diag = float(np.hypot(xmax - xmin, ymax - ymin))
+        return float(pixel_tol) * diag / (float(viewport_px) * float(zoom))
+
+    def lod_floor(self):
+        """Finest precomputed level; smaller tolerances get full resolution."""
+        snap = self.get_snapshot()
+        xmin, ymin, xmax, ymax = snap.bounds()
+        return LOD_FLOOR * float(np.hypot(xmax - xmin, ymax - ymin))
+
+    @PERF.timed("manager.get_nets", items=lambda payload: sum(len(net["primitives"]) for net in payload.get("nets", ())))
+    def get_nets(self, zoom=None, pixel_tol=0.5, viewport_px=1000, tolerance=None, selected_id=None,
+                 encoding="json", quantum=1e-9):
+        """
+        Nets payload for the canvas. With a zoom (or a tolerance in board
+        units) generated polygons are decimated to stay within that error;
+        selected_id is always sent at full resolution. encoding selects JSON
+        lists or one binary points buffer (see transport.encode_primitives).
+        """
+        snap = self.get_snapshot()
+        if snap is None:
             return {}
+        if tolerance is None:
+            tolerance = self.lod_tolerance(zoom, pixel_tol, viewport_px)
+        floor = self.lod_floor() if tolerance is not None else None
+        if floor is not None and tolerance >= floor and self.generated_data:
+            self.generated_data.prepare_lod(self.generated_data, floor)
+        sent = full = 0
         
         nets_data = []
-        for net_name, net in self.edb.nets.signal_nets.items():
+        for net_name, rows in snap.net_rows():
             primitives = []
-            for p in net.primitives:
-                if p.type == "Path": # Only interested in Paths for now
-                    
-                    # Check if we have generated data for this primitive
-                    if p.id in self.generated_data:
-                        gen_data = self.generated_data[p.id]
-                        prim_data = {
-                            "id": p.id,
-                            "type": "Polygon", # It's now a polygon
-                            "layer": p.layer_name,
-                            "width": 0, # Polygons don't have a single width
-                            "points": gen_data["points"], 
-                        }
-                    else:
-                        prim_data = {
-                            "id": p.id,
-                            "type": p.type,
-                            "layer": p.layer_name,
-                            "width": p.width,
-                            "points": p.center_line, # List of [x, y] or [x, y, h]
-                        }
-                    primitives.append(prim_data)
+            for i in rows:
+                prim_data = self._primitive_payload(i, tolerance, floor, selected_id)
+                if prim_data["type"] == "Polygon":
+                    sent += len(prim_data["points"])
+                    full += len(self.generated_data.polygons.get(prim_data["id"]))
+                primitives.append(prim_data)
             
-            if primitives:
-                nets_data.append({
-                    "name": net_name,
-                    "primitives": primitives
-                })
+            nets_data.append({
+                "name": net_name,
+                "primitives": primitives
+            })
         
-        return {"nets": nets_data}
+        payload = {"nets": nets_data}
+        payload.update(self._encode([p for net in nets_data for p in net["primitives"]], encoding, quantum))
+        if tolerance is not None:
+            payload["lod"] = {"tolerance": tolerance, "points": sent, "points_full": full}
+        return payload
+
+    def _encode(self, primitives, encoding, quantum=1e-9):
+        """Points of the primitive dicts as JSON lists or a binary buffer relative to the board origin."""
+        xmin, ymin, _, _ = self.snapshot.bounds()
+        with PERF.stage(f"transport.encode.{encoding}", items=len(primitives)):
+            return transport.encode_primitives(primitives, encoding, origin=(xmin, ymin), quantum=quantum)
+
+    def get_lod(self, zoom=None, pixel_tol=0.5, viewport_px=1000, tolerance=None, selected_id=None, primitive_ids=None,
+                encoding="json", quantum=1e-9):
+        """
+        Only the generated polygons at a new level of detail, for redrawing
+        after a zoom without resending the nets: {"tolerance", "primitives": [{id, points}]}.
+        """
+        if tolerance is None:
+            tolerance = self.lod_tolerance(zoom, pixel_tol, viewport_px)
+        if not self.generated_data:
+            return {"tolerance": tolerance, "primitives": []}
+        floor = self.lod_floor() if tolerance is not None else None
+        ids = self.generated_data if primitive_ids is None else [pid for pid in primitive_ids if pid in self.generated_data]
+        if floor is not None and tolerance >= floor:
+            self.generated_data.prepare_lod(ids, floor)
+        primitives = [{"id": pid, "points": self._lod_points(pid, tolerance, floor, selected_id)} for pid in ids]
+        return {"tolerance": tolerance, "primitives": primitives, **self._encode(primitives, encoding, quantum)}
+
+    def _primitive_payload(self, i, tolerance=None, floor=None, selected_id=None):
+        """Dict of snapshot row i (points as an array): its generated polygon, or the original Path."""
+        snap = self.snapshot
+        pid = int(snap.ids[i])
+        # Check if we have generated data for this primitive
+        if pid in self.generated_data:
+            return {
+                "id": pid,
+                "type": "Polygon", # It's now a polygon
+                "layer": snap.layer_name(i),
+                "width": 0, # Polygons don't have a single width
+                "points": self._lod_points(pid, tolerance, floor, selected_id),
+            }
+        return {
+            "id": pid,
+            "type": "Path",
+            "layer": snap.layer_name(i),
+            "width": float(snap.widths[i]),
+            "points": snap.center_line(i), # [x, y] / [h, SENTINEL_Y] rows
+        }
+
+    def _lod_points(self, pid, tolerance, floor, selected_id):
+        if tolerance is None or pid == selected_id:
+            return self.generated_data.polygons.get(pid)
+        return self.generated_data.simplified(pid, tolerance, floor)
+
+    def get_spatial_index(self):
+        if self.spatial_index is None and self.get_snapshot() is not None:
+            self.spatial_index = self._build_spatial_index()
+        return self.spatial_index
+
+    def _build_spatial_index(self):
+        """Grid over the boxes of what is displayed: generated polygons, else the Paths."""
+        snap = self.get_snapshot()
+        boxes = path_bounds(snap)
+        if self.generated_data:
+            polygons = self.generated_data.polygons
+            rows = np.array([snap.row(pid) for pid in polygons.ids.tolist()], dtype=np.int64)
+            boxes[rows] = series_bounds(polygons.values, polygons.offsets)
+        return SpatialIndex(boxes, snap.layer_index)
+
+    def query_viewport(self, bbox, layers=None, zoom=None, pixel_tol=0.5, viewport_px=1000, selected_id=None,
+                       encoding="json", quantum=1e-9):
+        """
+        Primitives whose bounding box overlaps bbox = [xmin, ymin, xmax, ymax],
+        optionally only on the named layers; zoom decimates like get_nets.
+        """
+        index = self.get_spatial_index()
+        if index is None:
+            return {"ids": [], "primitives": []}
+        snap = self.snapshot
+        layer_ids = None
+        if layers is not None:
+            layer_ids = [snap.layer_names.index(name) for name in layers if name in snap.layer_names]
+        rows = index.query(bbox, layer_ids)
+
+        tolerance = self.lod_tolerance(zoom, pixel_tol, viewport_px)
+        floor = self.lod_floor() if tolerance is not None else None
+        if floor is not None and tolerance >= floor and self.generated_data:
+            self.generated_data.prepare_lod(snap.ids[rows].tolist(), floor)
+        primitives = []
+        for i in rows.tolist():
+            prim_data = self._primitive_payload(i, tolerance, floor, selected_id)
+            prim_data["net"] = snap.net_name(i)
+            primitives.append(prim_data)
+        return {"ids": [p["id"] for p in primitives], "primitives": primitives, **self._encode(primitives, encoding, quantum)}
+
+    def pick_primitive(self, x, y, tol):
+        """
+        Nearest primitive within tol of (x, y): inside / distance to the generated
+        polygon, or to the outline of the original Path. None when nothing is that close.
+        """
+        index = self.get_spatial_index()
+        if index is None:
+            return None
+        x, y, tol = float(x), float(y), float(tol)
+        snap = self.snapshot
+        best, best_d = None, np.inf
+        for i in index.query((x - tol, y - tol, x + tol, y + tol)).tolist():
+            pid = int(snap.ids[i])
+            if pid in self.generated_data:
+                d = distance_to_polygon(self.generated_data.polygons.get(pid), x, y)
+            else:
+                center_line = trace.densify_path_with_arc_height(snap.center_line(i))
+                d = distance_to_path(center_line, float(snap.widths[i]), x, y)
+            if d <= tol and d < best_d:
+                best, best_d = i, d
+        if best is None:
+            return None
+        prim_data = self._primitive_payload(best)
+        prim_data["points"] = prim_data["points"].tolist()
+        prim_data["net"] = snap.net_name(best)
+        prim_data["distance"] = best_d
+        return prim_data
 
     def save_edb(self, path):
         print(f"DEBUG: EdbManager.save_edb called with path: {path}")
-        if not self.edb:
-            print("DEBUG: self.edb is None")
+        job_id = self.queue_save(path)
+        if job_id is None:
             return False
 
-        try:
-            # Capture original path
-            original_path = self.edb_path
-            
-            # 1. Save As to the new path
-            print(f"DEBUG: Calling self.edb.save_edb_as({path})")
-            self.edb.save_edb_as(path)
-            
-            # 2. Close the current session (which is now pointing to the new file)
-            print("DEBUG: Closing EDB session (new file)")
-            self.edb.close_edb()
-            
-            # 3. Open the NEW file to apply changes
-            print(f"DEBUG: Opening new EDB from {path}")
-            temp_edb = Edb(path, edbversion=self.edb_version)
-            
-            # 4. Apply variations to the NEW file
-            print(f"DEBUG: Applying {len(self.generated_data)} variations to saved file")
-            
-            for orig_id, data in self.generated_data.items():
-                found = False
-                for net_name, net in temp_edb.nets.nets.items():
-                    for p in net.primitives:
-                        if p.id == orig_id:
-                            # Found it!
-                            poly_points = data["points"]
-                            temp_edb.modeler.create_polygon_from_points(poly_points, p.layer_name, net_name)
-                            p.delete()
-                            found = True
-                            break
-                    if found:
-                        break
-                
-                if not found:
-                    print(f"WARNING: Could not find primitive {orig_id} to apply variation")
-
-            # 5. Save again to persist changes
-            temp_edb.save_edb()
-            temp_edb.close_edb()
-            print("DEBUG: save_edb completed on new file")
-            
-            # 6. Re-open the ORIGINAL file to restore session
-            print(f"DEBUG: Re-opening original EDB from {original_path}")
-            self.edb = Edb(original_path, edbversion=self.edb_version)
-            self.edb_path = original_path # Ensure path is consistent
-            
-            return True
-        except Exception as e:
-            print(f"DEBUG: Error in save_edb: {e}")
+        # The interactive session stays open; only this call waits for the writer.
+        with PERF.stage("manager.save_edb_wait"):
+            status = self.writer.wait(job_id)
+        if status["state"] != "done":
+            print(f"DEBUG: Error in save_edb: {status['error']}")
             return False
+        # copy / open / apply / save phases, timed in the writer process
+        PERF.record_phases("edb_write", status["report"].get("timings", {}))
+        return True
 
-    def apply_variation(self, settings):
+    def queue_save(self, path):
+        """
+        Hand a Save As to the background writer process and return its job id.
+        The writer copies the original board to path and applies the polygons
+        in its own session, so self.edb is never closed or reopened.
+        """
         if not self.edb:
+            print("DEBUG: self.edb is None")
+            return None
+
+        with PERF.stage("manager.save_payload", items=len(self.generated_data)):
+            generated = self.save_payload(self.generated_data)
+        print(f"DEBUG: Queueing save of {len(generated)} variations to {path}")
+        return self.writer.submit(self.edb_path, path, self.edb_version, generated, backend=self.edb.name)
+
+    @staticmethod
+    def save_payload(generated_data):
+        """Plain, picklable polygon data for the writer process."""
+        return {
+            orig_id: {"points": data["points"], "layer": data["layer"], "net": data["net"]}
+            for orig_id, data in generated_data.items()
+        }
+
+    def get_save_status(self, job_id=None):
+        """Status of one save job, or of all jobs when job_id is None."""
+        status = self.writer.get_status(job_id)
+        if job_id is not None and status and status["state"] == "done":
+            self.save_report = status["report"]
+        return status
+
+    def apply_variation(self, settings, progress=None, cancel=None):
+        """
+        Generate and replace the current variation. progress(done, total) is
+        called per finished batch; once the cancel event is set, JobCancelled
+        is raised after the current batch and the previous generation is kept.
+        """
+        snap = self.get_snapshot()
+        if snap is None:
             return False
 
-        # Clear previous generation
-        self.generated_data = {}
-        self.variation_data = {}
+        with PERF.stage("manager.apply_variation", items=len(snap)):
+            with self._generate_lock:
+                previous_seeds = (dict(self.seeds), self._last_settings, self._reseeded)
+                try:
+                    generated, variation, report = self._generate_or_restore(snap, settings, progress, cancel)
+                    if snap is not self.snapshot:
+                        # another board was opened before the lock was taken
+                        raise JobCancelled("The board changed during the generation")
+                except JobCancelled:
+                    self.seeds, self._last_settings, self._reseeded = previous_seeds
+                    raise
 
-        # Only apply to signal nets (those shown in the right panel)
-        for net_name, net in self.edb.nets.signal_nets.items():
-            for p in net.primitives:
-                if p.type != "Path":
-                    continue
-                
-                current_width = p.width
-                
-                # Calculate sigma absolute value
-                sigma_percent = float(settings.get("sigma_w", 10)) / 100.0
-                sigma_w = current_width * sigma_percent
-                
-                L_c = float(settings.get("L_c", 0.002))
-                model = settings.get("model", "matern32")
-                ds_arc = float(settings.get("ds_arc", 2e-4))
-                n_resample = int(settings.get("n_resample", 1200))
-                
-                # w_min/max are percentages of mu_w (current_width)
-                w_min_pct = float(settings.get("w_min", 80)) / 100.0
-                w_max_pct = float(settings.get("w_max", 120)) / 100.0
-                
-                w_min = current_width * w_min_pct
-                w_max = current_width * w_max_pct
-                
-                # Random seed? "the seed is random for each primitive"
-                import random
-                seed = random.randint(0, 100000)
-                
-                poly, (s, w_s), cl, dense = trace.build_trace(
-                    path_pts=p.center_line,
-                    mu_w=current_width,
-                    sigma_w=sigma_w,
-                    L_c=L_c,
-                    model=model,
-                    ds_arc=ds_arc,
-                    n_resample=n_resample,
-                    seed=seed,
-                    w_min=w_min,
-                    w_max=w_max,
-                    plot=False
+                # Replace the previous generation
+                self.generated_data = generated
+                self.variation_data = variation
+                self.generation_report = {**report, "reseeded": self._reseeded}
+                # polygons are wider than their paths and move with every generation
+                with PERF.stage("manager.spatial_index", items=len(snap)):
+                    self.spatial_index = self._build_spatial_index()
+        return True
+
+    def _generate_or_restore(self, snap, settings, progress=None, cancel=None):
+        """
+        Seeds, then the generation from the disk cache or the pipeline. Only
+        generations with settings.seed are cached: without it the seeds are
+        random, so an entry could never be found again in a later session.
+        """
+        seed_for = self._seed_policy(snap, settings)
+        key = None
+        use_cache = self.disk_cache.enabled and settings.get("disk_cache", True)
+        if self.edb_fingerprint and settings.get("seed") is not None and use_cache:
+            seeds = [seed_for(pid) for pid in snap.ids.tolist()]
+            key = generation_key(self.edb_fingerprint, settings, snap.ids, seeds, ignore=RUN_ONLY_SETTINGS)
+
+        t0 = time.perf_counter()
+        with PERF.stage("disk_cache.load_generation"):
+            cached = self.disk_cache.load_generation(key) if key else None
+        if cached is not None:
+            polygons, s, w_s, significance = cached
+            generated = GeneratedData(polygons, snap, significance, self.lod_floor() if significance is not None else None)
+            variation = VariationData(s, w_s)
+            report = {"primitives": len(generated), "disk_cache": "hit", "restore_time": time.perf_counter() - t0}
+        else:
+            generated, variation, report = self._generate(snap, settings, seed_for, progress, cancel)
+            if key:
+                # compressed and written on the cache's thread, not on the generate path
+                self.disk_cache.store_generation(
+                    key, generated.polygons, variation.s, variation.w_s, generated.significance_values(), background=True,
                 )
-                
-                # Store in generated_data
-                # We convert poly to list of lists
-                poly_list = [list(pt) for pt in poly]
-                
-                self.generated_data[p.id] = {
-                    "points": poly_list,
-                    "width": current_width, # Original width
-                    "layer": p.layer_name,
-                    "net": net_name
-                }
-                
-                # Store stats
-                self.variation_data[p.id] = {
-                    "s": s.tolist(),
-                    "w_s": w_s.tolist(),
-                    "mu_w": current_width
+            report["disk_cache"] = "miss" if key else "off"
+        return generated, variation, report
+
+    @staticmethod
+    def selected_rows(snap, settings):
+        """
+        Snapshot rows a generation varies. settings.nets / settings.layers (names
+        or fnmatch patterns like "DDR*") restrict it; the other primitives keep
+        their original Paths.
+        """
+        rows = np.arange(len(snap))
+        for key, names, index in (("nets", snap.net_names, snap.net_index), ("layers", snap.layer_names, snap.layer_index)):
+            patterns = settings.get(key)
+            if not patterns:
+                continue
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            keep = [k for k, name in enumerate(names) if any(fnmatch.fnmatchcase(name, p) for p in patterns)]
+            rows = rows[np.isin(index[rows], keep)]
+        return rows
+
+    def _seed_policy(self, snap, settings):
+        """
+        Seeds stay with their primitive, so changing a setting reuses the cached
+        width fields. Generating again with unchanged settings draws new seeds
+        (a new random realization); settings.reseed forces either behaviour and
+        settings.seed makes every primitive's seed reproducible.
+        Returns: seed_for(primitive_id)
+        """
+        fingerprint = {k: v for k, v in settings.items() if k not in RUN_ONLY_SETTINGS}
+        reseed = settings.get("reseed")
+        if reseed is None:
+            reseed = fingerprint == self._last_settings
+        self._last_settings = fingerprint
+        self._reseeded = bool(reseed)
+
+        base_seed = settings.get("seed")
+        for pid in snap.ids.tolist():
+            if base_seed is not None:
+                self.seeds[pid] = trace.derive_seed(base_seed, pid)
+            elif reseed or pid not in self.seeds:
+                # Random seed? "the seed is random for each primitive"
+                self.seeds[pid] = random.randint(0, 100000)
+        return self.seeds.__getitem__
+
+    def _generate(self, snap, settings, seed_for, progress=None, cancel=None, lod=True, stage_cache=None):
+        """
+        Run the trace pipeline for every primitive of the snapshot.
+        progress(done, total) / cancel: see apply_variation. lod: also compute
+        the LOD significance of the polygons (for display; not for ensembles).
+        stage_cache: StageCache to reuse and fill, by default the session's
+        self.stage_cache (ensembles pass their own).
+        Returns: (GeneratedData, VariationData, report); self is only touched
+        through the stage cache and the process pool.
+        """
+        cache = self.stage_cache if stage_cache is None else stage_cache
+
+        sigma_percent = float(settings.get("sigma_w", 10)) / 100.0
+        L_c = float(settings.get("L_c", 0.002))
+        model = settings.get("model", "matern32")
+        ds_arc = float(settings.get("ds_arc", 2e-4))
+        n_resample = int(settings.get("n_resample", 1200))
+        exact_arcs = bool(settings.get("exact_arcs", False))
+        field_method = settings.get("field_method", "fft")
+        # precision of the stored polygons and width fields
+        storage_dtype = np.dtype(settings.get("storage_dtype", "float64"))
+
+        # "fixed": n_resample for every trace, "adaptive": sized from length, L_c and arc error
+        adaptive = settings.get("resample_mode", "fixed") == "adaptive"
+        max_error = float(settings.get("max_error", 1e-6))
+        simplify_tol = settings.get("simplify_tol", max_error if adaptive else None)
+        # batch_size is also the chunk handed to one worker process
+        batch_size = max(1, int(settings.get("batch_size", 256)))
+        # more processes than cores only adds start-up and time slicing
+        workers = int(settings.get("workers", 1))
+        if workers <= 0 or workers > (os.cpu_count() or 1):
+            workers = os.cpu_count() or 1
+        if "stage_cache_mb" in settings:
+            cache.max_bytes = int(float(settings["stage_cache_mb"]) * 2**20)
+
+        # w_min/max are percentages of mu_w (current_width)
+        w_min_pct = float(settings.get("w_min", 80)) / 100.0
+        w_max_pct = float(settings.get("w_max", 120)) / 100.0
+
+        # Path primitives of the signal nets (those shown in the right panel), from the snapshot
+        t_prepare = time.perf_counter()
+        records = []
+        for i in self.selected_rows(snap, settings).tolist():
+            pid = int(snap.ids[i])
+            records.append({
+                "id": pid,
+                "net": snap.net_name(i),
+                "layer": snap.layer_name(i),
+                "width": float(snap.widths[i]),
+                "center_line": snap.center_line(i),
+                "seed": seed_for(pid),
+            })
+
+        if adaptive:
+            counts = trace.adaptive_sample_counts(
+                [r["center_line"] for r in records],
+                L_c,
+                samples_per_lc=float(settings.get("samples_per_lc", 10)),
+                max_error=max_error,
+                max_vertices=settings.get("max_vertices"),
+                vertex_budget=settings.get("vertex_budget"),
+            )
+            for r, n in zip(records, counts):
+                r["n_resample"] = int(n)
+            # keep equal sample counts together so each batch is one FFT group
+            records.sort(key=lambda r: r["n_resample"])
+        else:
+            for r in records:
+                r["n_resample"] = n_resample
+
+        params = {
+            "model": model,
+            "L_c": L_c,
+            "ds_arc": ds_arc,
+            "exact_arcs": exact_arcs,
+            "field_method": field_method,
+            "simplify_tol": None if simplify_tol is None else float(simplify_tol),
+            "lod_floor": self.lod_floor() if lod else None,
+        }
+
+        # Look up the cached stages of every primitive; only the missing ones are computed
+        dense_key = ds_arc
+        for r in records:
+            r["geometry_key"] = (exact_arcs, None if exact_arcs else ds_arc, r["n_resample"])
+            r["field_key"] = (r["geometry_key"], model, L_c, field_method, r["seed"])
+
+        jobs = []
+        for start in range(0, len(records), batch_size):
+            items = []
+            for r in records[start:start + batch_size]:
+                item = {
+                    "path": r["center_line"],
+                    "n": r["n_resample"],
+                    "seed": r["seed"],
+                    "mu_w": r["width"],
+                    "sigma_w": r["width"] * sigma_percent,
+                    "w_min": r["width"] * w_min_pct,
+                    "w_max": r["width"] * w_max_pct,
+                    "geometry": cache.get(r["id"], "geometry", r["geometry_key"]),
+                    "field": cache.get(r["id"], "field", r["field_key"]),
                 }
-        
-        return True
+                if item["geometry"] is None and not exact_arcs:
+                    item["dense"] = cache.get(r["id"], "dense", dense_key)
+                items.append(item)
+            jobs.append(items)
 
-    def get_primitive_stats(self, primitive_id):
-        return self.variation_data.get(primitive_id, None)
+        # Chunks that still need geometry or fields go to the process pool; the
+        # rest only rescale/clip and rebuild polygons, which is cheap in-process.
+        # Seeds were drawn above, so results do not depend on the worker count.
+        t0 = time.perf_counter()
+        prepare_time = t0 - t_prepare
+        outputs = [None] * len(jobs)
+        heavy = [j for j, items in enumerate(jobs)
+                 if any(it["geometry"] is None or it["field"] is None for it in items)]
+        done = 0
+
+        def finished(j, output):
+            nonlocal done
+            outputs[j] = output
+            done += len(jobs[j])
+            if progress:
+                progress(done, len(records))
+            if cancel is not None and cancel.is_set() and done < len(records):
+                raise JobCancelled()
+
+        if workers > 1 and len(heavy) > 1:
+            pool = self._get_pool(workers)
+            # workers record their stages like this process and send them back
+            options = PERF.options()
+            futures = {pool.submit(call_recorded, options, trace.build_stages_job, jobs[j], params): j for j in heavy}
+            try:
+                for future in as_completed(futures):
+                    output, stats = future.result()
+                    PERF.merge(stats)
+                    finished(futures[future], output)
+            finally:
+                for future in futures:
+                    future.cancel() # no-op for finished ones
+        for j, items in enumerate(jobs):
+            if outputs[j] is None:
+                finished(j, trace.build_stages_job(items, params))
+        wall_time = time.perf_counter() - t0
+        compute_time = sum(elapsed for _, elapsed in outputs)
+
+        recomputed = {"dense": 0, "geometry": 0, "field": 0}
+        ids, polygons, s_arrays, w_arrays, significance = [], [], [], [], []
+        for start, (results, _) in zip(range(0, len(records), batch_size), outputs):
+            for r, out in zip(records[start:start + batch_size], results):
+                if "dense" in out:
+                    cache.put(r["id"], "dense", dense_key, out["dense"])
+                    recomputed["dense"] += 1
+                if "geometry" in out:
+                    cache.put(r["id"], "geometry", r["geometry_key"], out["geometry"])
+                    recomputed["geometry"] += 1
+                if "field" in out:
+                    cache.put(r["id"], "field", r["field_key"], out["field"])
+                    recomputed["field"] += 1
+
+                ids.append(r["id"])
+                polygons.append(out["polygon"])
+                s_arrays.append(out["s"])
+                w_arrays.append(out["w_s"])
+                if lod:
+                    significance.append(out["significance"])
+
+        # One buffer for all polygons and one per stats series; width, layer and
+        # net are read from the snapshot, JSON lists are only built on request
+        generated_data, variation_data = pack_generation(
+            snap, ids, polygons, s_arrays, w_arrays, storage_dtype,
+            significance=significance if lod else None, floor=params["lod_floor"],
+        )
+        merge_time = time.perf_counter() - t0 - wall_time
+        if PERF.enabled:
+            PERF.record("generate.prepare", prepare_time, items=len(records))
+            PERF.record("generate.compute", wall_time, items=len(records))
+            PERF.record("generate.pack", merge_time, items=len(records),
+                        nbytes=generated_data.nbytes + variation_data.nbytes)
+
+        report = {
+            "primitives": len(records),
+            "chunks": len(jobs),
+            "workers": workers if len(heavy) > 1 else 1,
+            "chunk_size": batch_size,
+            "wall_time": wall_time,
+            "compute_time": compute_time,
+            "merge_time": merge_time,
+            # CPU time of all chunks / elapsed compute time: ~1 when serial (or
+            # all workers on one core), below 1 when the pool overhead dominates
+            "speedup": compute_time / wall_time if wall_time > 0 else 1.0,
+            "recomputed": recomputed,
+            "stage_cache": cache.info(),
+            "bytes": generated_data.nbytes + variation_data.nbytes,
+        }
+        return generated_data, variation_data, report
+
+    def start_generation(self, settings, on_progress=None):
+        """
+        Run apply_variation on a background thread and return the job status.
+        A generation job still running is cancelled first (the newest wins).
+        """
+        if self.get_snapshot() is None:
+            return None
+        for job in self.jobs.values():
+            if job.status()["state"] in ("queued", "running"):
+                job.cancel()
+        job = GenerationJob(self, next(self._job_ids), settings, on_progress=on_progress)
+        # registered before it runs, so its first progress push can already be cancelled
+        self.jobs[job.id] = job
+        return job.start().status()
+
+    def start_load(self, path, version="2024.1", on_event=None, on_progress=None, chunk_size=500, priority=None,
+                   encoding="json"):
+        """Run load_edb_streaming on a background thread; returns the job status."""
+        self._stop_jobs()
+        job = LoadJob(
+            self, next(self._job_ids), path, version, on_event=on_event, on_progress=on_progress,
+            chunk_size=chunk_size, priority=priority, encoding=encoding,
+        )
+        self.jobs[job.id] = job
+        return job.start().status()
+
+    def get_job_status(self, job_id=None):
+        """Status of one job, or of all jobs when job_id is None."""
+        if job_id is None:
+            return [job.status() for job in self.jobs.values()]
+        job = self.jobs.get(job_id)
+        return job.status() if job else None
+
+    def cancel_job(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel()
+        return job.status()
+
+    def start_ensemble(self, settings, n_variants, output_pattern, base_seed=None, queue_size=2, on_progress=None,
+                       store_path=None, store_dtype="float64"):
+        """
+        Generate n_variants copies of the board into numbered .aedb outputs in
+        the background; poll get_ensemble_status for progress. With store_path
+        the fields and polygons are kept in an EnsembleStore for later queries.
+        """
+        if not self.edb:
+            return None
+        if self.ensemble is not None and self.ensemble.status()["state"] == "running":
+            raise RuntimeError("An ensemble run is already in progress")
+        self.ensemble = EnsembleRun(
+            self, settings, n_variants, output_pattern,
+            base_seed=base_seed, queue_size=queue_size, on_progress=on_progress,
+            store_path=store_path, store_dtype=store_dtype,
+        ).start()
+        if store_path:
+            self.ensemble_store = None
+            self._ensemble_store_path = store_path
+        return self.ensemble.status()
+
+    def open_ensemble_store(self, path):
+        """Open an existing ensemble store (lazily: only its manifest is read)."""
+        self.ensemble_store = EnsembleStore.open(path)
+        self._ensemble_store_path = path
+        return {
+            "path": path,
+            "entries": len(self.ensemble_store),
+            "metadata": self.ensemble_store.manifest.get("metadata", {}),
+        }
+
+    def _get_ensemble_store(self):
+        if self.ensemble_store is None and self._ensemble_store_path:
+            try:
+                self.ensemble_store = EnsembleStore.open(self._ensemble_store_path)
+            except FileNotFoundError:
+                return None
+        elif self.ensemble_store is not None:
+            # the running ensemble may have appended chunks since
+            self.ensemble_store.refresh()
+        return self.ensemble_store
+
+    def get_ensemble_status(self):
+        return self.ensemble.status() if self.ensemble else None
+
+    def cancel_ensemble(self):
+        if self.ensemble:
+            self.ensemble.cancel()
+        return self.get_ensemble_status()
+
+    def close(self):
+        """Stop the worker processes (pending saves are finished first)."""
+        if self.ensemble:
+            self.ensemble.cancel()
+            self.ensemble.wait()
+        for job in self.jobs.values():
+            job.cancel()
+            job.wait()
+        self.shutdown_pool()
+        self.disk_cache.flush()
+        for entry in self.writer.close():
+            print(f"WARNING: Save to {entry['path']} did not finish: {entry['error']}")
+
+    def _get_pool(self, workers):
+        """
+        Reuse one process pool across generations (worker start-up is expensive).
+        Workers are spawned, not forked: generations run on job and ensemble
+        threads, and forking a multi-threaded process can deadlock the child.
+        """
+        if self._pool is None or self._pool_workers != workers:
+            self.shutdown_pool()
+            self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            self._pool_workers = workers
+        return self._pool
+
+    def shutdown_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+            self._pool_workers = 0
+
+    def get_generation_report(self):
+        return self.generation_report
+
+    def get_cache_info(self):
+        """Hits / misses and size of the on-disk cache."""
+        return self.disk_cache.info()
+
+    def clear_cache(self):
+        self.disk_cache.clear()
+        return self.disk_cache.info()
+
+    def get_save_report(self):
+        for status in reversed(self.writer.get_status()):
+            if status["state"] == "done":
+                self.save_report = status["report"]
+                break
+        return self.save_report
+
+    def get_primitive_stats(self, primitive_id, variant=None, encoding="json"):
+        """Stats of the current generation, or of one ensemble variant from the store."""
+        if variant is None:
+            stats = self.variation_data.get(primitive_id, None)
+        else:
+            store = self._get_ensemble_store()
+            stats = store.get_stats(variant, primitive_id) if store else None
+        if stats is None:
+            return None
+        stats = dict(stats)
+        snap = self.get_snapshot()
+        if snap is not None and primitive_id in snap:
+            i = snap.row(primitive_id)
+            stats["mu_w"] = float(snap.widths[i])
+            stats["net"] = snap.net_name(i)
+            stats["layer"] = snap.layer_name(i)
+        return transport.encode_series(stats, encoding)
+
+    def get_transport_report(self, encodings=transport.ENCODINGS):
+        """
+        Bytes and build + serialize time of the nets payload and of one
+        primitive's stats in every encoding, relative to JSON.
+        """
+        if self.get_snapshot() is None:
+            return {}
+        report = {"nets": transport.measure(lambda enc: self.get_nets(encoding=enc), encodings)}
+        if self.variation_data:
+            pid = next(iter(self.variation_data))
+            report["stats"] = transport.measure(lambda enc: self.get_primitive_stats(pid, encoding=enc), encodings)
+        return report
@@ -0,0 +1,233 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict
+
+
+def apply_generated_polygons(edb, generated_data):
+    """
+    Replace every primitive in generated_data by its varied polygon.
+
+    edb is a GeometryBackend. The primitives are indexed by id in one pass,
+    the polygons are created grouped by (layer, net) and the originals are
+    deleted afterwards in one batch.
+    Returns: report dict with found / replaced / missing counts and per-phase timings.
+    """
+    timings = {}
+
+    t0 = time.perf_counter()
+    index = edb.primitives_by_id()
+    timings["index"] = time.perf_counter() - t0
+
+    groups = defaultdict(list)
+    missing = []
+    for orig_id, data in generated_data.items():
+        p = index.get(orig_id)
+        if p is None:
+            missing.append(orig_id)
+            continue
+        groups[(data["layer"], data["net"])].append((orig_id, p, data["points"]))
+
+    t0 = time.perf_counter()
+    replaced = []
+    failed = []
+    for (layer, net_name), items in groups.items():
+        for orig_id, p, points in items:
+            if edb.create_polygon(points, layer, net_name):
+                replaced.append(p)
+            else:
+                failed.append(orig_id)
+    timings["create"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for p in replaced:
+        edb.delete(p)
+    timings["delete"] = time.perf_counter() - t0
+
+    for orig_id in missing:
+        print(f"WARNING: Could not find primitive {orig_id} to apply variation")
+
+    return {
+        "requested": len(generated_data),
+        "found": len(generated_data) - len(missing),
+        "replaced": len(replaced),
+        "missing": len(missing),
+        "failed": len(failed),
+        "missing_ids": missing[:100],
+        "failed_ids": failed[:100],
+        "timings": timings,
+    }
+
+
+def write_variation_copy(backend, source, target, version, generated_data):
+    """
+    Copy the source board to target and apply the varied polygons to the copy
+    (backend: GeometryBackend class). The caller's own session is never touched.
+    """
+    timings = {}
+
+    t0 = time.perf_counter()
+    if os.path.abspath(source) != os.path.abspath(target):
+        backend.copy(source, target)
+    timings["copy"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    edb = backend.open(target, version)
+    timings["open"] = time.perf_counter() - t0
+
+    try:
+        report = apply_generated_polygons(edb, generated_data)
+        timings.update(report.pop("timings"))
+
+        t0 = time.perf_counter()
+        edb.save()
+        timings["save"] = time.perf_counter() - t0
+    finally:
+        edb.close()
+
+    report["path"] = target
+    report["timings"] = timings
+    return report
+
+
+def _writer_main(jobs, events):
+    """
+    Writer process loop. A backend's library (pyedb) is imported, and its
+    engine initialized, by the first job that uses it and reused by every
+    later one; None on the job queue stops the loop.
+    """
+    from backend.geometry_backend import backend_class
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        events.put(("running", job["id"], None))
+        try:
+            report = write_variation_copy(
+                backend_class(job["backend"]), job["source"], job["target"], job["version"], job["generated"]
+            )
+            events.put(("done", job["id"], report))
+        except Exception as e:
+            events.put(("failed", job["id"], str(e)))
+
+
+class EdbWriter:
+    """
+    Long-lived worker process that writes Save As copies in the background.
+    Only the serialized polygon data is sent to it; jobs run in FIFO order.
+    """
+
+    def __init__(self):
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._jobs = None
+        self._events = None
+        self._listener = None
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self.status = {} # job id -> {state, path, report, error, submitted, finished}
+
+    def _ensure_started(self):
+        if self._process is not None and self._process.is_alive():
+            return
+        self._jobs = self._ctx.Queue()
+        self._events = self._ctx.Queue()
+        self._process = self._ctx.Process(target=_writer_main, args=(self._jobs, self._events), daemon=True)
+        self._process.start()
+        self._listener = threading.Thread(target=self._listen, args=(self._events,), daemon=True)
+        self._listener.start()
+
+    def _listen(self, events):
+        while True:
+            state, job_id, payload = events.get()
+            if state is None:
+                break
+            with self._lock:
+                entry = self.status.get(job_id)
+                if entry is None:
+                    continue
+                entry["state"] = state
+                if state == "done":
+                    entry["report"] = payload
+                elif state == "failed":
+                    entry["error"] = payload
+                if state in ("done", "failed"):
+                    entry["finished"] = time.time()
+                    self._done.notify_all()
+
+    def submit(self, source, target, version, generated_data, backend="pyedb"):
+        """Queue one Save As job (backend: GeometryBackend name); returns its id immediately."""
+        with self._lock:
+            self._ensure_started()
+            job_id = next(self._ids)
+            self.status[job_id] = {
+                "id": job_id,
+                "state": "queued",
+                "path": target,
+                "report": None,
+                "error": None,
+                "submitted": time.time(),
+                "finished": None,
+            }
+        self._jobs.put({
+            "id": job_id,
+            "source": source,
+            "target": target,
+            "version": version,
+            "generated": generated_data,
+            "backend": backend,
+        })
+        return job_id
+
+    def get_status(self, job_id=None):
+        with self._lock:
+            if job_id is None:
+                return [dict(entry) for entry in self.status.values()]
+            entry = self.status.get(job_id)
+            return dict(entry) if entry else None
+
+    def wait(self, job_id, timeout=None):
+        """Block until the job is done or failed (or timeout); returns its status."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._done:
+            entry = self.status[job_id]
+            while entry["state"] not in ("done", "failed"):
+                if self._process is None or not self._process.is_alive():
+                    entry["state"] = "failed"
+                    entry["error"] = "EDB writer process exited"
+                    break
+                remaining = 1.0 if deadline is None else min(1.0, deadline - time.monotonic())
+                if remaining <= 0:
+                    break
+                # re-check the process every second in case it died silently
+                self._done.wait(remaining)
+            return dict(entry)
+
+    def close(self, timeout=None):
+        """
+        Finish the queued saves and stop the writer process; with a timeout the
+        process is terminated once it expires. Returns the status of every save
+        that did not finish (marked failed), so callers can report them.
+        """
+        if self._process is None:
+            return []
+        if self._process.is_alive():
+            self._jobs.put(None)
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+        self._events.put((None, None, None))
+        self._listener.join(timeout=5)
+        with self._lock:
+            unfinished = [entry for entry in self.status.values() if entry["state"] not in ("done", "failed")]
+            for entry in unfinished:
+                entry.update(state="failed", error="EDB writer stopped before this save finished", finished=time.time())
+            self._done.notify_all()
+            unfinished = [dict(entry) for entry in unfinished]
+        self._process = None
+        return unfinished
@@ -0,0 +1,205 @@
+import os
+import queue
+import random
+import threading
+import time
+
+from backend.trace_generator import derive_seed
+from backend.ensemble_store import EnsembleStore
+from backend.stage_cache import StageCache
+
+
+def variant_path(pattern, k):
+    """
+    Output path of variant k: "{k}" style patterns are formatted
+    ("out/board_{k:03d}.aedb"), otherwise "_{k:03d}" is appended to the stem.
+    """
+    if "{" in pattern:
+        return pattern.format(k=k)
+    root, ext = os.path.splitext(pattern)
+    return f"{root}_{k:03d}{ext or '.aedb'}"
+
+
+class EnsembleRun:
+    """
+    Monte Carlo ensemble: n_variants rough copies of the open board.
+
+    A producer thread generates the variants one after the other while a
+    consumer thread hands them to the EDB writer process, so computing variant
+    k+1 overlaps with writing variant k. The queue between them is bounded,
+    which also bounds how many finished variants are held in memory.
+    Variant k uses seed derive_seed(base_seed, k, primitive id), so any
+    variant can be reproduced from base_seed alone.
+    With store_path the width fields and polygons of every variant are also
+    appended to an EnsembleStore while generating. output_pattern is a pattern
+    for variant_path, or a function k -> output path.
+    Variants share the geometry stages through the run's own StageCache; the
+    session's cache (the interactive generations) is left untouched.
+    """
+
+    def __init__(self, manager, settings, n_variants, output_pattern, base_seed=None, queue_size=2, on_progress=None,
+                 store_path=None, store_dtype="float64"):
+        self.manager = manager
+        self.settings = dict(settings)
+        self.n_variants = int(n_variants)
+        self.output_pattern = output_pattern
+        self.base_seed = random.randint(0, 2**31 - 1) if base_seed is None else int(base_seed)
+        self.on_progress = on_progress
+        self.store_path = store_path
+        self.store_dtype = store_dtype
+
+        self.stage_cache = StageCache()
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._status = {
+            "state": "idle",
+            "n_variants": self.n_variants,
+            "base_seed": self.base_seed,
+            "generated": 0,
+            "written": 0,
+            "failed": 0,
+            "outputs": [],
+            "variants": [], # per written / failed variant: path, state, timings, writer report
+            "store": store_path,
+            "errors": [],
+            "generate_time": 0.0,
+            "write_time": 0.0,
+            "stage_cache": None,
+            "elapsed": 0.0,
+            "variants_per_minute": 0.0,
+        }
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._update(state="running")
+        self._threads = [
+            threading.Thread(target=self._produce, daemon=True),
+            threading.Thread(target=self._consume, daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def cancel(self):
+        """Stop after the variant currently being generated/written."""
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+        return self.status()
+
+    def status(self):
+        with self._lock:
+            status = dict(self._status)
+            status["outputs"] = list(status["outputs"])
+            status["variants"] = list(status["variants"])
+            status["errors"] = list(status["errors"])
+        return status
+
+    def output_path(self, k):
+        if callable(self.output_pattern):
+            return self.output_pattern(k)
+        return variant_path(self.output_pattern, k)
+
+    def _update(self, **changes):
+        with self._lock:
+            for key, value in changes.items():
+                self._status[key] = value
+            if self._t0 is not None:
+                elapsed = time.perf_counter() - self._t0
+                self._status["elapsed"] = elapsed
+                if elapsed > 0:
+                    self._status["variants_per_minute"] = 60.0 * self._status["written"] / elapsed
+            status = dict(self._status)
+        if self.on_progress:
+            self.on_progress(status)
+
+    def _produce(self):
+        snap = self.manager.get_snapshot()
+        settings = {**self.settings, "reseed": False}
+        store = None
+        try:
+            if self.store_path:
+                store = EnsembleStore.create(self.store_path, dtype=self.store_dtype, metadata={
+                    "base_seed": self.base_seed,
+                    "n_variants": self.n_variants,
+                    "settings": self.settings,
+                })
+            for k in range(self.n_variants):
+                if self._cancel.is_set():
+                    break
+                t0 = time.perf_counter()
+                with self.manager._generate_lock:
+                    generated, variation, report = self.manager._generate(
+                        snap, settings, lambda pid, k=k: derive_seed(self.base_seed, k, pid), lod=False,
+                        stage_cache=self.stage_cache,
+                    )
+                if store is not None:
+                    for pid, data in generated.items():
+                        stats = variation[pid]
+                        store.append(k, pid, stats["s"], stats["w_s"], data["points"])
+                payload = self.manager.save_payload(generated)
+                generate_time = time.perf_counter() - t0
+                with self._lock:
+                    self._status["generate_time"] += generate_time
+                    generated_count = self._status["generated"] + 1
+                self._update(generated=generated_count)
+                info = {"variant": k, "primitives": report.get("primitives"), "generate_time": generate_time}
+                # blocks while the writer is queue_size variants behind
+                self._queue.put((k, self.output_path(k), payload, info))
+        except Exception as e:
+            with self._lock:
+                self._status["errors"].append(f"generate: {e}")
+        finally:
+            if store is not None:
+                store.close()
+            with self._lock:
+                self._status["stage_cache"] = self.stage_cache.info()
+            # nothing reuses the run's stages once it is done
+            self.stage_cache.clear()
+            self._queue.put(None)
+
+    def _consume(self):
+        writer = self.manager.writer
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            k, path, payload, info = item
+            t0 = time.perf_counter()
+            try:
+                job_id = writer.submit(
+                    self.manager.edb_path, path, self.manager.edb_version, payload, backend=self.manager.edb.name
+                )
+                result = writer.wait(job_id)
+            except Exception as e:
+                # keep draining the queue, or the producer blocks on it forever
+                result = {"state": "failed", "error": str(e)}
+            write_time = time.perf_counter() - t0
+            with self._lock:
+                self._status["write_time"] += write_time
+                self._status["variants"].append({
+                    **info, "path": path, "state": result["state"], "error": result.get("error"),
+                    "write_time": write_time, "save": result.get("report"),
+                })
+                if result["state"] == "done":
+                    self._status["written"] += 1
+                    self._status["outputs"].append(path)
+                else:
+                    self._status["failed"] += 1
+                    self._status["errors"].append(f"variant {k}: {result['error']}")
+            self._update()
+
+        with self._lock:
+            failed = self._status["failed"] or self._status["errors"]
+        if self._cancel.is_set():
+            state = "cancelled"
+        elif failed:
+            state = "failed"
+        else:
+            state = "done"
+        self._update(state=state)
@@ -0,0 +1,200 @@
+import json
+import os
+
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# one row per (variant, primitive) per chunk; offsets/lengths are in samples
+INDEX_DTYPE = np.dtype([
+    ("variant", np.int32),
+    ("primitive", np.int64),
+    ("field_offset", np.int64),
+    ("field_length", np.int64),
+    ("poly_offset", np.int64),
+    ("poly_length", np.int64),
+])
+
+
+class EnsembleStore:
+    """
+    Chunked on-disk store of width fields and polygons, (variant x primitive x samples).
+
+    Layout of the store directory:
+      manifest.json          - format, dtype and the list of chunks
+      s_<c>.npy, w_<c>.npy   - arc length and width samples of chunk c, concatenated
+      poly_<c>.npy           - polygon vertices (N, 2) of chunk c, concatenated
+      index_<c>.npy          - INDEX_DTYPE rows locating every entry of chunk c
+
+    Appends are buffered and written as a new chunk once chunk_bytes is
+    reached; the manifest is rewritten after every chunk so a store that is
+    still being filled can be opened. Reads memory-map the chunk files, so
+    a single (variant, primitive) slice is read without loading the rest.
+    """
+
+    def __init__(self, path, dtype="float64", chunk_bytes=64 * 2**20, mode="r"):
+        self.path = path
+        self.mode = mode
+        self.chunk_bytes = int(chunk_bytes)
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._maps = {}
+        self._keys = None
+        self._where = None
+
+        manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        elif mode == "r":
+            raise FileNotFoundError(f"No ensemble store at {path}")
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.manifest = {"format": FORMAT_VERSION, "dtype": np.dtype(dtype).name, "chunks": [], "metadata": {}}
+            self._write_manifest()
+        self.dtype = np.dtype(self.manifest["dtype"])
+
+    @classmethod
+    def create(cls, path, dtype="float64", chunk_bytes=64 * 2**20, metadata=None):
+        store = cls(path, dtype=dtype, chunk_bytes=chunk_bytes, mode="a")
+        if metadata:
+            store.manifest["metadata"].update(metadata)
+            store._write_manifest()
+        return store
+
+    @classmethod
+    def open(cls, path):
+        """Open lazily: only the manifest is read here."""
+        return cls(path, mode="r")
+
+    # -----------------------------
+    # writing
+    # -----------------------------
+    def append(self, variant, primitive_id, s, w_s, polygon):
+        if self.mode == "r":
+            raise IOError("Ensemble store is opened read-only")
+        s = np.asarray(s, self.dtype)
+        w_s = np.asarray(w_s, self.dtype)
+        polygon = np.asarray(polygon, self.dtype).reshape(-1, 2)
+        self._buffer.append((int(variant), int(primitive_id), s, w_s, polygon))
+        self._buffer_bytes += s.nbytes + w_s.nbytes + polygon.nbytes
+        if self._buffer_bytes >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        c = len(self.manifest["chunks"])
+        index = np.zeros(len(self._buffer), dtype=INDEX_DTYPE)
+        field_lengths = np.array([len(e[2]) for e in self._buffer], dtype=np.int64)
+        poly_lengths = np.array([len(e[4]) for e in self._buffer], dtype=np.int64)
+        index["variant"] = [e[0] for e in self._buffer]
+        index["primitive"] = [e[1] for e in self._buffer]
+        index["field_offset"] = np.cumsum(field_lengths) - field_lengths
+        index["field_length"] = field_lengths
+        index["poly_offset"] = np.cumsum(poly_lengths) - poly_lengths
+        index["poly_length"] = poly_lengths
+
+        np.save(self._file("s", c), np.concatenate([e[2] for e in self._buffer]))
+        np.save(self._file("w", c), np.concatenate([e[3] for e in self._buffer]))
+        np.save(self._file("poly", c), np.concatenate([e[4] for e in self._buffer]))
+        np.save(self._file("index", c), index)
+
+        self.manifest["chunks"].append({"id": c, "entries": len(self._buffer)})
+        self._write_manifest()
+        self._buffer = []
+        self._buffer_bytes = 0
+        self._keys = None
+
+    def close(self):
+        if self.mode != "r":
+            self.flush()
+        self._maps.clear()
+
+    def refresh(self):
+        """Pick up chunks another writer has added since the store was opened."""
+        with open(os.path.join(self.path, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if len(manifest["chunks"]) != len(self.manifest["chunks"]):
+            self.manifest = manifest
+            self._keys = None
+
+    # -----------------------------
+    # reading
+    # -----------------------------
+    def __len__(self):
+        return sum(chunk["entries"] for chunk in self.manifest["chunks"])
+
+    def get(self, variant, primitive_id):
+        """
+        (s, w_s, polygon) of one entry as memory-mapped views, or None.
+        """
+        loc = self._locate(variant, primitive_id)
+        if loc is None:
+            return None
+        c, row = loc
+        entry = self._map("index", c)[row]
+        f0, fn = int(entry["field_offset"]), int(entry["field_length"])
+        p0, pn = int(entry["poly_offset"]), int(entry["poly_length"])
+        return (
+            self._map("s", c)[f0:f0 + fn],
+            self._map("w", c)[f0:f0 + fn],
+            self._map("poly", c)[p0:p0 + pn],
+        )
+
+    def get_stats(self, variant, primitive_id):
+        entry = self.get(variant, primitive_id)
+        if entry is None:
+            return None
+        s, w_s, _ = entry
+        return {"s": np.array(s), "w_s": np.array(w_s), "variant": int(variant)}
+
+    def variants(self):
+        keys, _ = self._index()
+        return np.unique(keys >> 40).tolist() if len(keys) else []
+
+    def primitives(self, variant):
+        keys, _ = self._index()
+        mask = (keys >> 40) == int(variant)
+        return (keys[mask] & ((1 << 40) - 1)).tolist()
+
+    # -----------------------------
+    # internals
+    # -----------------------------
+    def _file(self, column, c):
+        return os.path.join(self.path, f"{column}_{c:05d}.npy")
+
+    def _write_manifest(self):
+        tmp = os.path.join(self.path, "manifest.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, os.path.join(self.path, "manifest.json"))
+
+    def _map(self, column, c):
+        key = (column, c)
+        if key not in self._maps:
+            self._maps[key] = np.load(self._file(column, c), mmap_mode="r")
+        return self._maps[key]
+
+    def _index(self):
+        """Sorted (variant << 40 | primitive) keys over all chunks, built on first lookup."""
+        if self._keys is None:
+            keys, where = [], []
+            for chunk in self.manifest["chunks"]:
+                c = chunk["id"]
+                index = self._map("index", c)
+                keys.append((index["variant"].astype(np.int64) << 40) | index["primitive"])
+                where.append(np.column_stack([np.full(len(index), c), np.arange(len(index))]))
+            keys = np.concatenate(keys) if keys else np.empty(0, np.int64)
+            where = np.concatenate(where) if where else np.empty((0, 2), np.int64)
+            order = np.argsort(keys, kind="stable")
+            self._keys, self._where = keys[order], where[order]
+        return self._keys, self._where
+
+    def _locate(self, variant, primitive_id):
+        keys, where = self._index()
+        key = (int(variant) << 40) | int(primitive_id)
+        i = np.searchsorted(keys, key, side="right") - 1 # latest append wins
+        if i < 0 or keys[i] != key:
+            return None
+        return int(where[i, 0]), int(where[i, 1])
@@ -0,0 +1,293 @@
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from backend.transport import decode_array, encode_array
+
+
+class GeometryBackend:
+    """
+    What the app needs from a board database. The snapshot reads the
+    signal-net Paths, the writer replaces them by polygons and saves.
+
+      signal_nets()            - [(net name, net handle)] in board order
+      path_count(net)          - cheap size estimate of a net (extraction order), None when
+                                 only a walk over its primitives could tell
+      net_paths(net)           - [(id, width, layer, center_line (N, 2))] of its Paths
+      primitives_by_id()       - {id: primitive handle} of every primitive
+      create_polygon(points, layer, net) -> truthy on success
+      delete(primitive)        - delete a handle from primitives_by_id()
+      save(), close()
+    """
+
+    name = None
+
+    @classmethod
+    def open(cls, path, version=None):
+        raise NotImplementedError
+
+    @staticmethod
+    def copy(source, target):
+        """Copy the board files at source to target (Save As)."""
+        raise NotImplementedError
+
+    @classmethod
+    def warm_up(cls, version=None):
+        """Load what the first open() would (libraries, engine); returns {step: seconds}."""
+        return {}
+
+    def signal_nets(self):
+        raise NotImplementedError
+
+    def path_count(self, net):
+        raise NotImplementedError
+
+    def net_paths(self, net):
+        raise NotImplementedError
+
+    def primitives_by_id(self):
+        raise NotImplementedError
+
+    def create_polygon(self, points, layer, net):
+        raise NotImplementedError
+
+    def delete(self, primitive):
+        raise NotImplementedError
+
+    def save(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PyEdbBackend(GeometryBackend):
+    """Ansys EDB (.aedb folder) through pyedb; pyedb is imported on first open."""
+
+    name = "pyedb"
+
+    def __init__(self, edb):
+        self.edb = edb
+
+    @classmethod
+    def open(cls, path, version=None):
+        from pyedb import Edb
+        return cls(Edb(path, edbversion=version))
+
+    @staticmethod
+    def copy(source, target):
+        # an existing .aedb is replaced, not merged into (stale files would survive)
+        if os.path.exists(target):
+            if not os.path.isfile(os.path.join(target, "edb.def")):
+                raise FileExistsError(f"{target} exists and is not an .aedb folder; not overwriting it")
+            shutil.rmtree(target)
+        shutil.copytree(source, target, ignore=shutil.ignore_patterns("*.lock"))
+
+    @classmethod
+    def warm_up(cls, version=None):
+        """
+        Import pyedb and initialize the EDB engine by creating (and removing)
+        a blank database; later Edb() calls in this process skip both.
+        """
+        timings = {}
+        t0 = time.perf_counter()
+        from pyedb import Edb
+        timings["import"] = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        edb = Edb(edbversion=version)
+        scratch = getattr(edb, "edbpath", None)
+        edb.close_edb()
+        if scratch and os.path.isdir(scratch):
+            shutil.rmtree(scratch, ignore_errors=True)
+        timings["engine"] = time.perf_counter() - t0
+        return timings
+
+    def signal_nets(self):
+        return list(self.edb.nets.signal_nets.items())
+
+    def path_count(self, net):
+        # net.primitives builds a wrapper per primitive: as slow as reading the net
+        return None
+
+    def net_paths(self, net):
+        records = []
+        for p in net.primitives:
+            if p.type != "Path":
+                continue
+            center_line = np.asarray(p.center_line, dtype=float).reshape(-1, 2)
+            records.append((p.id, p.width, p.layer_name, center_line))
+        return records
+
+    def primitives_by_id(self):
+        index = {}
+        for net in self.edb.nets.nets.values():
+            for p in net.primitives:
+                index[p.id] = p
+        return index
+
+    def create_polygon(self, points, layer, net):
+        if hasattr(points, "tolist"):
+            points = points.tolist()
+        return self.edb.modeler.create_polygon_from_points(points, layer, net)
+
+    def delete(self, primitive):
+        primitive.delete()
+
+    def save(self):
+        self.edb.save_edb()
+
+    def close(self):
+        self.edb.close_edb()
+
+
+class MemoryBackend(GeometryBackend):
+    """
+    Board held in plain Python / NumPy structures, saved as a JSON file.
+    Runs the whole pipeline (load, generate, save, caches) without Ansys, on
+    synthetic boards of any size.
+
+    File format:
+      {"format": FORMAT, "nets": [{"name", "signal": true, "primitives": [
+          {"id", "type": "Path", "layer", "width", "center_line": [[x, y] / [h, SENTINEL_Y], ...]},
+          {"id", "type": "Polygon", "layer", "points": [[x, y], ...]}, ...]}, ...]}
+    Point arrays may be lists (hand-written boards) or transport.encode_array
+    buffers, which save() writes: exact and far faster to write and parse.
+    """
+
+    name = "json"
+    FORMAT = "line-width-variator/board-v1"
+
+    def __init__(self, nets=None, path=None):
+        self.path = path
+        self.nets = {} # net name -> {"signal": bool, "primitives": {id: record}}
+        self._net_of = {} # primitive id -> net name
+        self._next_id = 1
+        for net in nets or ():
+            self.add_net(net["name"], net.get("signal", True))
+            for record in net.get("primitives", ()):
+                self._add(net["name"], dict(record))
+
+    @classmethod
+    def open(cls, path, version=None):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != cls.FORMAT:
+            raise ValueError(f"{path} is not a {cls.FORMAT} file")
+        return cls(data["nets"], path=path)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, path=None):
+        """Board with the Paths of a GeometrySnapshot (e.g. a synthetic benchmark board)."""
+        board = cls(path=path)
+        for name in snapshot.net_names:
+            board.add_net(name)
+        for i in range(len(snapshot)):
+            board._add(snapshot.net_name(i), {
+                "id": int(snapshot.ids[i]),
+                "type": "Path",
+                "layer": snapshot.layer_name(i),
+                "width": float(snapshot.widths[i]),
+                "center_line": snapshot.center_line(i),
+            })
+        return board
+
+    @staticmethod
+    def copy(source, target):
+        shutil.copyfile(source, target)
+
+    def add_net(self, name, signal=True):
+        self.nets.setdefault(name, {"signal": bool(signal), "primitives": {}})
+
+    def _add(self, net_name, record):
+        if record.get("id") is None:
+            record["id"] = self._next_id
+        pid = int(record["id"])
+        for key in ("center_line", "points"):
+            if key in record:
+                value = record[key]
+                if isinstance(value, dict):
+                    value = decode_array(value)
+                record[key] = np.asarray(value, dtype=float).reshape(-1, 2)
+        self.nets[net_name]["primitives"][pid] = record
+        self._net_of[pid] = net_name
+        self._next_id = max(self._next_id, pid + 1)
+        return pid
+
+    def signal_nets(self):
+        return [(name, net) for name, net in self.nets.items() if net["signal"]]
+
+    def path_count(self, net):
+        return len(net["primitives"])
+
+    def net_paths(self, net):
+        return [
+            (pid, r["width"], r["layer"], r["center_line"])
+            for pid, r in net["primitives"].items()
+            if r["type"] == "Path"
+        ]
+
+    def primitives_by_id(self):
+        return {pid: pid for pid in self._net_of}
+
+    def create_polygon(self, points, layer, net):
+        if net not in self.nets:
+            self.add_net(net)
+        return self._add(net, {"id": None, "type": "Polygon", "layer": layer, "points": points})
+
+    def delete(self, primitive):
+        net_name = self._net_of.pop(primitive)
+        del self.nets[net_name]["primitives"][primitive]
+
+    def _net_dicts(self):
+        for name, net in self.nets.items():
+            primitives = []
+            for record in net["primitives"].values():
+                record = dict(record)
+                for key in ("center_line", "points"):
+                    if key in record:
+                        record[key] = encode_array(record[key])
+                primitives.append(record)
+            yield {"name": name, "signal": net["signal"], "primitives": primitives}
+
+    def to_dict(self):
+        return {"format": self.FORMAT, "nets": list(self._net_dicts())}
+
+    def save(self):
+        if self.path is None:
+            raise ValueError("In-memory board without a file; use save_as(path)")
+        self.save_as(self.path)
+
+    def save_as(self, path):
+        # one json.dumps per net: the C encoder (json.dump streams through the
+        # pure Python one) without building the whole file in memory
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(f'{{"format": {json.dumps(self.FORMAT)}, "nets": [')
+            for k, net in enumerate(self._net_dicts()):
+                if k:
+                    f.write(", ")
+                f.write(json.dumps(net))
+            f.write("]}")
+        os.replace(tmp, path)
+        self.path = path
+        return path
+
+
+BACKENDS = {
+    PyEdbBackend.name: PyEdbBackend,
+    MemoryBackend.name: MemoryBackend,
+}
+
+
+def backend_class(name=None, path=None):
+    """Backend by name, or guessed from the path: *.json files are MemoryBackend boards, the rest pyedb."""
+    if name is None:
+        name = MemoryBackend.name if path and str(path).lower().endswith(".json") else PyEdbBackend.name
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown geometry backend: {name} (available: {', '.join(BACKENDS)})") from None
@@ -0,0 +1,158 @@
+import numpy as np
+
+from backend.perf import PERF
+from backend.trace_generator import SENTINEL_Y
+
+
+class GeometrySnapshot:
+    """
+    Plain-array copy of every signal-net Path primitive, read from the board
+    (a GeometryBackend) once.
+
+    Row i of the snapshot is one primitive:
+      ids[i], widths[i]           - primitive id and original width
+      net_index[i], layer_index[i] - indices into net_names / layer_names
+      points[offsets[i]:offsets[i+1]] - raw center_line ([x, y] / [h, SENTINEL_Y])
+    """
+
+    def __init__(self, ids, widths, net_index, layer_index, offsets, points, net_names, layer_names):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.widths = np.asarray(widths, dtype=float)
+        self.net_index = np.asarray(net_index, dtype=np.int32)
+        self.layer_index = np.asarray(layer_index, dtype=np.int32)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.points = np.asarray(points, dtype=float).reshape(-1, 2)
+        self.net_names = list(net_names)
+        self.layer_names = list(layer_names)
+        self._row = {int(pid): i for i, pid in enumerate(self.ids)}
+        self._bounds = None
+
+    @classmethod
+    def from_edb(cls, edb):
+        """Walk the signal nets of a GeometryBackend once and copy what the app needs."""
+        return cls.from_nets(extract_nets(edb))
+
+    @classmethod
+    def from_nets(cls, extracted):
+        """
+        Snapshot from extract_nets() output, in any order; rows and net names
+        are put back in EDB order.
+        """
+        ids, widths, net_index, layer_index, lengths, chunks = [], [], [], [], [], []
+        net_names, layer_names, layer_lookup = [], [], {}
+
+        for _, net_name, records in sorted(extracted, key=lambda e: e[0]):
+            net_names.append(net_name)
+            for pid, width, layer, center_line in records:
+                if layer not in layer_lookup:
+                    layer_lookup[layer] = len(layer_names)
+                    layer_names.append(layer)
+
+                ids.append(pid)
+                widths.append(width)
+                net_index.append(len(net_names) - 1)
+                layer_index.append(layer_lookup[layer])
+                lengths.append(len(center_line))
+                chunks.append(center_line)
+
+        offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        points = np.concatenate(chunks) if chunks else np.empty((0, 2))
+        return cls(ids, widths, net_index, layer_index, offsets, points, net_names, layer_names)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, primitive_id):
+        return primitive_id in self._row
+
+    def row(self, primitive_id):
+        return self._row.get(primitive_id)
+
+    def center_line(self, i):
+        return self.points[self.offsets[i]:self.offsets[i + 1]]
+
+    def net_name(self, i):
+        return self.net_names[self.net_index[i]]
+
+    def layer_name(self, i):
+        return self.layer_names[self.layer_index[i]]
+
+    def bounds(self):
+        """
+        (xmin, ymin, xmax, ymax) of all center-line points (arc markers skipped).
+        Computed once: every zoomed payload needs it and the arrays never change.
+        """
+        if self._bounds is None:
+            pts = self.points[self.points[:, 1] != SENTINEL_Y]
+            if not len(pts):
+                self._bounds = (0.0, 0.0, 0.0, 0.0)
+            else:
+                lo, hi = pts.min(axis=0), pts.max(axis=0)
+                self._bounds = (float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1]))
+        return self._bounds
+
+    def iter_nets(self, priority=None):
+        """Same tuples as extract_nets(), read from the snapshot, in net_order() order."""
+        counts = np.bincount(self.net_index, minlength=len(self.net_names))
+        rank = {name: k for k, name in enumerate(priority or ())}
+        order = sorted(
+            range(len(self.net_names)),
+            key=lambda k: (rank.get(self.net_names[k], len(rank)), counts[k] if self.net_names[k] not in rank else 0),
+        )
+        rows = dict((name, r) for name, r in self.net_rows())
+        for k in order:
+            name = self.net_names[k]
+            yield k, name, [
+                (int(self.ids[i]), float(self.widths[i]), self.layer_name(i), self.center_line(i))
+                for i in rows.get(name, ())
+            ]
+
+    def net_rows(self):
+        """(net_name, row indices) per net with at least one Path, in EDB order."""
+        order = np.argsort(self.net_index, kind="stable")
+        bounds = np.searchsorted(self.net_index[order], np.arange(len(self.net_names) + 1))
+        return [
+            (name, order[bounds[k]:bounds[k + 1]])
+            for k, name in enumerate(self.net_names)
+            if bounds[k + 1] > bounds[k]
+        ]
+
+
+def net_order(edb, priority=None):
+    """
+    Positions of edb.signal_nets() in extraction order: the nets named in
+    priority first (in that order), then the others by primitive count,
+    smallest first, when the backend can count cheaply (else in EDB order).
+    Nothing is read from the nets' primitives, so the first chunk is not delayed.
+    """
+    nets = edb.signal_nets()
+    rank = {name: k for k, name in enumerate(priority or ())}
+    counts = {}
+    for k, (name, net) in enumerate(nets):
+        if name not in rank:
+            count = edb.path_count(net)
+            if count is None:
+                counts = {}
+                break
+            counts[k] = count
+    return sorted(
+        range(len(nets)),
+        key=lambda k: (rank.get(nets[k][0], len(rank)), counts.get(k, 0)),
+    )
+
+
+def extract_nets(edb, order=None):
+    """
+    Generator over the signal nets of a GeometryBackend, one walk per net:
+    yields (position in EDB order, net name, [(id, width, layer, center_line), ...] of its Paths).
+    order: positions to visit (see net_order), default EDB order.
+    """
+    nets = edb.signal_nets()
+    # property reads, the slow part of loading with pyedb
+    stage = f"{edb.name}.read_net"
+    for k in (range(len(nets)) if order is None else order):
+        net_name, net = nets[k]
+        with PERF.stage(stage) as span:
+            records = edb.net_paths(net)
+            span.add(items=len(records))
+        yield k, net_name, records
@@ -0,0 +1,139 @@
+import threading
+import time
+
+
+class JobCancelled(Exception):
+    """Raised by the EdbManager work of a job once its cancel event is set."""
+
+
+class BackgroundJob:
+    """
+    One EdbManager operation on a background thread.
+
+    Progress (processed / total, ETA) is kept in the status dict and passed to
+    on_progress, at most every min_interval seconds plus once for the final
+    state. Cancelling stops the work at its next check (one batch / net).
+    Subclasses implement _work(progress, cancel) -> report.
+    """
+
+    kind = None
+
+    def __init__(self, manager, job_id, total=0, on_progress=None, min_interval=0.1):
+        self.manager = manager
+        self.id = job_id
+        self.on_progress = on_progress
+        self.min_interval = min_interval
+
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._t0 = None
+        self._last_push = 0.0
+        self._status = {
+            "id": job_id,
+            "kind": self.kind,
+            "state": "queued",
+            "processed": 0,
+            "total": total,
+            "elapsed": 0.0,
+            "eta": None,
+            "error": None,
+            "report": None,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.status()
+
+    def status(self):
+        with self._lock:
+            return dict(self._status)
+
+    def _update(self, force=False, **changes):
+        with self._lock:
+            self._status.update(changes)
+            if self._t0 is not None:
+                elapsed = time.perf_counter() - self._t0
+                self._status["elapsed"] = elapsed
+                done, total = self._status["processed"], self._status["total"]
+                if 0 < done < total:
+                    self._status["eta"] = elapsed / done * (total - done)
+                elif total and done >= total:
+                    self._status["eta"] = 0.0
+            status = dict(self._status)
+        now = time.perf_counter()
+        if self.on_progress and (force or now - self._last_push >= self.min_interval):
+            self._last_push = now
+            self.on_progress(status)
+
+    def _run(self):
+        # waits here while another job holds the manager's lock
+        with self.manager._generate_lock:
+            if self._cancel.is_set():
+                self._update(force=True, state="cancelled")
+                return
+            self._t0 = time.perf_counter()
+            self._update(force=True, state="running")
+            try:
+                report = self._work(
+                    lambda done, total: self._update(processed=done, total=total),
+                    self._cancel,
+                )
+            except JobCancelled:
+                self._update(force=True, state="cancelled")
+            except Exception as e:
+                self._update(force=True, state="failed", error=str(e))
+            else:
+                self._update(force=True, state="done", processed=self.status()["total"], report=report)
+
+    def _work(self, progress, cancel):
+        raise NotImplementedError
+
+
+class GenerationJob(BackgroundJob):
+    """apply_variation; a cancelled run keeps the previous generation."""
+
+    kind = "generation"
+
+    def __init__(self, manager, job_id, settings, on_progress=None, min_interval=0.1):
+        super().__init__(manager, job_id, len(manager.get_snapshot()), on_progress, min_interval)
+        self.settings = dict(settings)
+
+    def _work(self, progress, cancel):
+        self.manager.apply_variation(self.settings, progress=progress, cancel=cancel)
+        return self.manager.get_generation_report()
+
+
+class LoadJob(BackgroundJob):
+    """load_edb_streaming; chunks of nets go to on_event as they are extracted."""
+
+    kind = "load"
+
+    def __init__(self, manager, job_id, path, version, on_event=None, on_progress=None, min_interval=0.1,
+                 chunk_size=500, priority=None, encoding="json"):
+        super().__init__(manager, job_id, 0, on_progress, min_interval)
+        self.path = path
+        self.version = version
+        self.on_event = on_event
+        self.chunk_size = chunk_size
+        self.priority = priority
+        self.encoding = encoding
+
+    def _work(self, progress, cancel):
+        return self.manager.load_edb_streaming(
+            self.path, self.version, emit=self._emit, chunk_size=self.chunk_size, priority=self.priority,
+            encoding=self.encoding, progress=progress, cancel=cancel,
+        )
+
+    def _emit(self, event):
+        if self.on_event:
+            self.on_event({**event, "job": self.id})
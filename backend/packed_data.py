@@ -0,0 +1,182 @@
+from collections.abc import Mapping
+
+import numpy as np
+
+from backend.trace_generator import rdp_significance
+
+
+class PackedSeries:
+    """
+    Variable-length arrays of many primitives in one contiguous buffer.
+    values[offsets[i]:offsets[i+1]] belongs to primitive ids[i].
+    """
+
+    __slots__ = ("ids", "offsets", "values", "_row")
+
+    def __init__(self, ids, offsets, values):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.values = values
+        self._row = {pid: i for i, pid in enumerate(self.ids.tolist())}
+
+    @classmethod
+    def from_arrays(cls, ids, arrays, dtype=np.float64, offsets=None):
+        if offsets is None:
+            lengths = np.fromiter((len(a) for a in arrays), dtype=np.int64, count=len(arrays))
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+        values = np.concatenate(arrays).astype(dtype, copy=False) if len(arrays) else np.empty(0, dtype)
+        return cls(ids, offsets, values)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, primitive_id):
+        return primitive_id in self._row
+
+    def row(self, primitive_id):
+        return self._row.get(primitive_id)
+
+    def get(self, primitive_id):
+        """Read-only view of one primitive's array, or None."""
+        i = self._row.get(primitive_id)
+        if i is None:
+            return None
+        view = self.values[self.offsets[i]:self.offsets[i + 1]]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.offsets.nbytes + self.values.nbytes
+
+
+class GeneratedData(Mapping):
+    """
+    Polygons of one generation, read-only dict-like view:
+    generated[pid] -> {"points": (N, 2) array, "width", "layer", "net"}.
+    Width, layer and net come from the snapshot the polygons were built from.
+    """
+
+    __slots__ = ("polygons", "snapshot", "_lod")
+
+    def __init__(self, polygons, snapshot, significance=None, floor=None):
+        self.polygons = polygons
+        self.snapshot = snapshot
+        self._lod = None # (floor, RDP significance per vertex, rows computed)
+        if significance is not None:
+            self._lod = (floor, significance, np.ones(len(polygons), dtype=bool))
+
+    def __getitem__(self, primitive_id):
+        points = self.polygons.get(primitive_id)
+        if points is None:
+            raise KeyError(primitive_id)
+        i = self.snapshot.row(primitive_id)
+        return {
+            "points": points,
+            "width": float(self.snapshot.widths[i]), # Original width
+            "layer": self.snapshot.layer_name(i),
+            "net": self.snapshot.net_name(i),
+        }
+
+    def __iter__(self):
+        return iter(self.polygons.ids.tolist())
+
+    def __len__(self):
+        return len(self.polygons)
+
+    def __contains__(self, primitive_id):
+        return primitive_id in self.polygons
+
+    @property
+    def nbytes(self):
+        return self.polygons.nbytes + (self._lod[1].nbytes if self._lod is not None else 0)
+
+    def significance(self, floor, rows):
+        """
+        RDP significance (see trace.rdp_significance) of the polygon vertices
+        of the given rows. Normally computed with the generation (pack_generation);
+        otherwise on first request, in one batch for all rows still missing.
+        """
+        p = self.polygons
+        if self._lod is None or self._lod[0] != floor:
+            self._lod = (floor, np.zeros(len(p.values)), np.zeros(len(p), dtype=bool))
+        _, sig, done = self._lod
+        rows = np.asarray(rows, dtype=np.int64)
+        todo = rows[~done[rows]]
+        if len(todo):
+            todo = np.unique(todo)
+            starts, ends = p.offsets[todo], p.offsets[todo + 1]
+            lens = ends - starts
+            idx = np.arange(lens.sum()) + np.repeat(starts - (np.cumsum(lens) - lens), lens)
+            local = np.concatenate([[0], np.cumsum(lens)])
+            sig[idx] = rdp_significance(p.values[idx], local[:-1], local[1:] - 1, floor)
+            done[todo] = True
+        return sig
+
+    def significance_values(self):
+        """Significance of every polygon vertex when complete (as packed by pack_generation), else None."""
+        if self._lod is None or not self._lod[2].all():
+            return None
+        return self._lod[1]
+
+    def simplified(self, primitive_id, tol, floor):
+        """
+        Polygon within tol of the full one (RDP), or the full polygon when tol
+        is below floor, i.e. finer than the precomputed levels.
+        """
+        points = self.polygons.get(primitive_id)
+        if points is None or tol is None or tol < floor:
+            return points
+        i = self.polygons.row(primitive_id)
+        sig = self.significance(floor, [i])[self.polygons.offsets[i]:self.polygons.offsets[i + 1]]
+        return points[sig > tol]
+
+    def prepare_lod(self, primitive_ids, floor):
+        """Compute the levels of many primitives in one batch before simplified() calls."""
+        rows = [self.polygons.row(pid) for pid in primitive_ids]
+        self.significance(floor, [i for i in rows if i is not None])
+
+
+class VariationData(Mapping):
+    """
+    Width fields of one generation, read-only dict-like view:
+    variation[pid] -> {"s": array, "w_s": array}. s and w_s share their offsets.
+    """
+
+    __slots__ = ("s", "w_s")
+
+    def __init__(self, s, w_s):
+        self.s = s
+        self.w_s = w_s
+
+    def __getitem__(self, primitive_id):
+        s = self.s.get(primitive_id)
+        if s is None:
+            raise KeyError(primitive_id)
+        return {"s": s, "w_s": self.w_s.get(primitive_id)}
+
+    def __iter__(self):
+        return iter(self.s.ids.tolist())
+
+    def __len__(self):
+        return len(self.s)
+
+    def __contains__(self, primitive_id):
+        return primitive_id in self.s
+
+    @property
+    def nbytes(self):
+        return self.s.nbytes + self.w_s.values.nbytes
+
+
+def pack_generation(snapshot, ids, polygons, s, w_s, dtype=np.float64, significance=None, floor=None):
+    """
+    (GeneratedData, VariationData) from per-primitive arrays in ids order.
+    significance: optional per-polygon RDP significance at LOD floor.
+    """
+    polys = PackedSeries.from_arrays(ids, polygons, dtype)
+    s_packed = PackedSeries.from_arrays(ids, s, dtype)
+    w_packed = PackedSeries.from_arrays(ids, w_s, dtype, offsets=s_packed.offsets)
+    if significance is not None:
+        significance = PackedSeries.from_arrays(ids, significance, offsets=polys.offsets).values
+    return GeneratedData(polys, snapshot, significance, floor), VariationData(s_packed, w_packed)
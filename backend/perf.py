@@ -0,0 +1,286 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+# LINE_WIDTH_VARIATOR_PERF=1 records from start-up, =memory also traces allocations
+ENV_VAR = "LINE_WIDTH_VARIATOR_PERF"
+
+
+class _NullSpan:
+    """What stage() hands out while recording is off: every operation is a no-op."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add(self, items=0, nbytes=0):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "items", "nbytes", "peak", "_t0", "_mem0")
+
+    def __init__(self, recorder, name, items, nbytes):
+        self.recorder = recorder
+        self.name = name
+        self.items = items
+        self.nbytes = nbytes
+        self.peak = 0
+
+    def add(self, items=0, nbytes=0):
+        self.items += items
+        self.nbytes += nbytes
+
+    def __enter__(self):
+        if self.recorder.trace_memory:
+            self.recorder._memory_enter(self)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self._t0
+        peak = self.recorder._memory_exit(self) if self.recorder.trace_memory else None
+        self.recorder.record(self.name, seconds, self.items, self.nbytes, peak)
+        return False
+
+
+class PerfRecorder:
+    """
+    Wall time, calls, items, payload bytes and (optionally) tracemalloc peaks,
+    summed per named stage. While disabled, stage() returns a shared no-op span
+    and timed() functions only check one attribute.
+
+    Peaks are the largest allocation growth inside one call of the stage;
+    nested stages are handled, stages running concurrently on other threads
+    share the tracemalloc counters and make each other's peaks approximate.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_memory = False
+        self.payload_bytes = True
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._since = time.time()
+
+    def enable(self, trace_memory=False, payload_bytes=True):
+        self.trace_memory = bool(trace_memory)
+        self.payload_bytes = bool(payload_bytes)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.trace_memory = False
+
+    def options(self):
+        """enable() arguments that reproduce the current state, None while disabled."""
+        if not self.enabled:
+            return None
+        return {"trace_memory": self.trace_memory, "payload_bytes": self.payload_bytes}
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._since = time.time()
+
+    def stage(self, name, items=0, nbytes=0):
+        """Context manager timing one call of a stage; span.add() counts what it processed."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, items, nbytes)
+
+    def record(self, name, seconds=0.0, items=0, nbytes=0, peak=None, calls=1):
+        with self._lock:
+            entry = self._entry(name)
+            entry["calls"] += calls
+            entry["seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["items"] += items
+            entry["bytes"] += nbytes
+            if peak is not None:
+                entry["peak_bytes"] = max(entry["peak_bytes"] or 0, peak)
+
+    def record_phases(self, prefix, timings):
+        """One call of each phase of a {phase: seconds} report (e.g. the writer's timings)."""
+        if not self.enabled:
+            return
+        for phase, seconds in timings.items():
+            self.record(f"{prefix}.{phase}", float(seconds))
+
+    def merge(self, stats):
+        """Add the raw stats of another recorder (see take), e.g. from a worker process."""
+        if not stats:
+            return
+        with self._lock:
+            for name, other in stats.items():
+                entry = self._entry(name)
+                for key in ("calls", "seconds", "items", "bytes"):
+                    entry[key] += other[key]
+                entry["max_seconds"] = max(entry["max_seconds"], other["max_seconds"])
+                if other["peak_bytes"] is not None:
+                    entry["peak_bytes"] = max(entry["peak_bytes"] or 0, other["peak_bytes"])
+
+    def _entry(self, name):
+        entry = self._stats.get(name)
+        if entry is None:
+            entry = self._stats[name] = {
+                "calls": 0, "seconds": 0.0, "max_seconds": 0.0, "items": 0, "bytes": 0, "peak_bytes": None,
+            }
+        return entry
+
+    def take(self):
+        """Raw stats recorded so far, and start over."""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+        return stats
+
+    def timed(self, name, items=None, payload=False):
+        """
+        Decorator recording every call as stage name. items(result) counts the
+        processed items; payload=True also records the JSON size of the result
+        and the time to serialize it (stage name + ".json"), as the bridge would.
+        """
+        def decorate(fn):
+            @functools.wraps(fn)
+            def call(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with self.stage(name) as span:
+                    result = fn(*args, **kwargs)
+                    if items is not None:
+                        span.add(items=items(result))
+                if payload and self.payload_bytes:
+                    self._record_payload(f"{name}.json", result)
+                return result
+            return call
+        return decorate
+
+    def _record_payload(self, name, result):
+        t0 = time.perf_counter()
+        try:
+            size = len(json.dumps(result))
+        except (TypeError, ValueError):
+            return
+        self.record(name, time.perf_counter() - t0, nbytes=size)
+
+    def _memory_enter(self, span):
+        stack = self._stack()
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            # keep the enclosing stage's peak before resetting the counter
+            stack[-1].peak = max(stack[-1].peak, peak)
+        tracemalloc.reset_peak()
+        span._mem0 = current
+        span.peak = current
+        stack.append(span)
+
+    def _memory_exit(self, span):
+        stack = self._stack()
+        span.peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+        if stack and stack[-1] is span:
+            stack.pop()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, span.peak)
+        return span.peak - span._mem0
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def report(self, reset=False):
+        """{"enabled", "trace_memory", "since", "elapsed", "stages": {name: totals}}, slowest stage first."""
+        with self._lock:
+            stats = {name: dict(entry) for name, entry in self._stats.items()}
+            since = self._since
+        if reset:
+            self.reset()
+        for entry in stats.values():
+            entry["mean_seconds"] = entry["seconds"] / entry["calls"] if entry["calls"] else 0.0
+            entry["items_per_s"] = entry["items"] / entry["seconds"] if entry["items"] and entry["seconds"] > 0 else None
+        stages = dict(sorted(stats.items(), key=lambda kv: kv[1]["seconds"], reverse=True))
+        return {
+            "enabled": self.enabled,
+            "trace_memory": self.trace_memory,
+            "since": since,
+            "elapsed": time.time() - since,
+            "stages": stages,
+        }
+
+    def dump(self, path, reset=False):
+        """Write the report as JSON for offline comparison; returns path."""
+        report = self.report(reset)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+
+class StartupTimer:
+    """
+    Seconds from the first import of this module (the top of app.py) to
+    named start-up milestones; each milestone keeps its first time only.
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.started = time.time()
+        self.marks = {}
+        self.details = {}
+        self._lock = threading.Lock()
+
+    def mark(self, name):
+        with self._lock:
+            if name not in self.marks:
+                self.marks[name] = time.perf_counter() - self.t0
+            return self.marks[name]
+
+    def note(self, name, value):
+        with self._lock:
+            self.details[name] = value
+
+    def report(self):
+        with self._lock:
+            return {
+                "started": self.started,
+                "marks": dict(sorted(self.marks.items(), key=lambda kv: kv[1])),
+                "details": dict(self.details),
+            }
+
+
+def call_recorded(options, fn, *args):
+    """
+    Process-pool entry point: run fn(*args) with recording set up like the
+    parent (options from PerfRecorder.options) and return (result, stats) so
+    the parent can merge what the worker recorded.
+    """
+    if options is None:
+        if PERF.enabled:
+            PERF.disable()
+        return fn(*args), None
+    PERF.enable(**options)
+    PERF.take()
+    result = fn(*args)
+    return result, PERF.take()
+
+
+PERF = PerfRecorder()
+STARTUP = StartupTimer()
+_mode = os.environ.get(ENV_VAR, "").strip().lower()
+if _mode and _mode not in ("0", "false", "off"):
+    PERF.enable(trace_memory=_mode == "memory")
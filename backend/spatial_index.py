@@ -0,0 +1,126 @@
+import numpy as np
+
+from backend.trace_generator import SENTINEL_Y
+
+
+def path_bounds(snapshot):
+    """
+    (N, 4) [xmin, ymin, xmax, ymax] of every snapshot Path, grown by half its
+    width and by the largest arc sagitta (arc bulges are not in the vertices).
+    """
+    n = len(snapshot)
+    if n == 0:
+        return np.empty((0, 4))
+    pts = snapshot.points
+    marker = pts[:, 1] == SENTINEL_Y
+    x = np.where(marker, np.nan, pts[:, 0])
+    y = np.where(marker, np.nan, pts[:, 1])
+    starts = snapshot.offsets[:-1]
+    grow = snapshot.widths / 2 + np.maximum.reduceat(np.where(marker, np.abs(pts[:, 0]), 0.0), starts)
+    return np.column_stack([
+        np.fmin.reduceat(x, starts) - grow,
+        np.fmin.reduceat(y, starts) - grow,
+        np.fmax.reduceat(x, starts) + grow,
+        np.fmax.reduceat(y, starts) + grow,
+    ])
+
+
+def series_bounds(points, offsets):
+    """(N, 4) bounding boxes of the polygons points[offsets[i]:offsets[i+1]]."""
+    if len(offsets) < 2:
+        return np.empty((0, 4))
+    starts = offsets[:-1]
+    return np.column_stack([
+        np.minimum.reduceat(points[:, 0], starts),
+        np.minimum.reduceat(points[:, 1], starts),
+        np.maximum.reduceat(points[:, 0], starts),
+        np.maximum.reduceat(points[:, 1], starts),
+    ])
+
+
+class SpatialIndex:
+    """
+    Uniform grid over primitive bounding boxes (CSR layout: the rows of cell c
+    are rows[cell_start[c]:cell_start[c+1]]). Sized for about one box per cell.
+    """
+
+    def __init__(self, boxes, layer_index, max_cells=1024):
+        self.boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.layer_index = np.asarray(layer_index, dtype=np.int32)
+        n = len(self.boxes)
+        if n:
+            self.origin = self.boxes[:, :2].min(axis=0)
+            extent = np.maximum(self.boxes[:, 2:].max(axis=0) - self.origin, 1e-12)
+        else:
+            self.origin, extent = np.zeros(2), np.ones(2)
+        self.shape = np.clip(np.ceil(np.sqrt(max(n, 1)) * extent / extent.max()), 1, max_cells).astype(np.int64)
+        self.cell = extent / self.shape
+
+        lo, hi = self._cells(self.boxes[:, :2]), self._cells(self.boxes[:, 2:])
+        nx = hi[:, 0] - lo[:, 0] + 1
+        ny = hi[:, 1] - lo[:, 1] + 1
+        counts = nx * ny
+        # every (row, cell) pair a box covers
+        row = np.repeat(np.arange(n), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cx = lo[row, 0] + k % nx[row]
+        cy = lo[row, 1] + k // nx[row]
+        cells = cy * self.shape[0] + cx
+
+        order = np.argsort(cells, kind="stable")
+        self.rows = row[order]
+        self.cell_start = np.searchsorted(cells[order], np.arange(self.shape.prod() + 1))
+
+    def _cells(self, xy):
+        c = np.floor((np.asarray(xy, float) - self.origin) / self.cell).astype(np.int64)
+        return np.clip(c, 0, self.shape - 1)
+
+    def query(self, bbox, layers=None):
+        """Rows whose box overlaps bbox = (xmin, ymin, xmax, ymax), optionally on layers only."""
+        xmin, ymin, xmax, ymax = map(float, bbox)
+        if not len(self.boxes) or xmin > xmax or ymin > ymax:
+            return np.empty(0, dtype=np.int64)
+        (cx0, cy0), (cx1, cy1) = self._cells([xmin, ymin]), self._cells([xmax, ymax])
+        cells = (np.arange(cy0, cy1 + 1)[:, None] * self.shape[0] + np.arange(cx0, cx1 + 1)).ravel()
+        lens = self.cell_start[cells + 1] - self.cell_start[cells]
+        pos = np.arange(lens.sum()) + np.repeat(self.cell_start[cells] - (np.cumsum(lens) - lens), lens)
+        rows = np.unique(self.rows[pos])
+
+        b = self.boxes[rows]
+        hit = (b[:, 0] <= xmax) & (b[:, 2] >= xmin) & (b[:, 1] <= ymax) & (b[:, 3] >= ymin)
+        if layers is not None:
+            hit &= np.isin(self.layer_index[rows], np.asarray(layers, dtype=np.int32))
+        return rows[hit]
+
+
+def _segment_distance(points, x, y):
+    """Distance from (x, y) to the polyline points (N, 2)."""
+    if len(points) == 1:
+        return float(np.hypot(points[0, 0] - x, points[0, 1] - y))
+    a, b = points[:-1], points[1:]
+    ab = b - a
+    ap = np.array([x, y]) - a
+    denom = np.einsum("ij,ij->i", ab, ab)
+    t = np.clip(np.einsum("ij,ij->i", ap, ab) / np.where(denom > 0, denom, 1.0), 0.0, 1.0)
+    return float(np.min(np.linalg.norm(ap - t[:, None] * ab, axis=1)))
+
+
+def _inside_polygon(points, x, y):
+    """Even-odd rule point in closed polygon test."""
+    xi, yi = points[:, 0], points[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    crosses = (yi > y) != (yj > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_cross = xj + (y - yj) * (xi - xj) / (yi - yj)
+    return bool(np.count_nonzero(crosses & (x < x_cross)) % 2)
+
+
+def distance_to_polygon(points, x, y):
+    if len(points) >= 3 and _inside_polygon(points, x, y):
+        return 0.0
+    return _segment_distance(np.vstack([points, points[:1]]), x, y)
+
+
+def distance_to_path(center_line, width, x, y):
+    """Distance from (x, y) to the outline of a Path of the given width."""
+    return max(0.0, _segment_distance(center_line, x, y) - width / 2)
@@ -0,0 +1,71 @@
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(v) for v in value)
+    return 0
+
+
+class StageCache:
+    """
+    Per-primitive results of the trace pipeline stages.
+
+    Every stage value is stored with the key of the settings it depends on:
+      "dense"    - densified centerline        (ds_arc)
+      "geometry" - (centerline, s, tangent)    (exact_arcs, ds_arc, n)
+      "field"    - unit-variance width field    (geometry key, model, L_c, field method, seed)
+    A lookup only hits when the key matches, so a settings change re-runs just
+    the stages downstream of it. Primitives are evicted least-recently-used
+    once the cached arrays exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes=512 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = Counter()
+        self.misses = Counter()
+        self._entries = OrderedDict() # primitive id -> {stage: (key, value, nbytes)}
+
+    def get(self, primitive_id, stage, key):
+        entry = self._entries.get(primitive_id)
+        item = entry.get(stage) if entry else None
+        if item is not None and item[0] == key:
+            self.hits[stage] += 1
+            self._entries.move_to_end(primitive_id)
+            return item[1]
+        self.misses[stage] += 1
+        return None
+
+    def put(self, primitive_id, stage, key, value):
+        entry = self._entries.setdefault(primitive_id, {})
+        old = entry.get(stage)
+        if old is not None:
+            self.nbytes -= old[2]
+        nbytes = _nbytes(value)
+        entry[stage] = (key, value, nbytes)
+        self.nbytes += nbytes
+        self._entries.move_to_end(primitive_id)
+
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= sum(item[2] for item in evicted.values())
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+        self.hits.clear()
+        self.misses.clear()
+
+    def info(self):
+        return {
+            "primitives": len(self._entries),
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+        }
@@ -1,5 +1,9 @@
+import time
+from functools import lru_cache
+
 import numpy as np
-import matplotlib.pyplot as plt
+
+from backend.perf import PERF
 
 SENTINEL_Y = 1.7976931348623157e+308
 
@@ -55,45 +59,120 @@ def _arc_points_from_sagitta(p0, p1, h, ds_target=2e-4, max_pts=2000, left_posit
     thetas = np.linspace(ang0, ang0 + dtheta, nseg)
 
     return c + R * np.column_stack([np.cos(thetas), np.sin(thetas)])
+def _arc_geometry_from_sagitta(p0, p1, h, left_positive=False):
+    """
+    Vectorized circle parameters of many arcs (same maths as _arc_points_from_sagitta).
+      p0, p1: (M, 2) chord end points, h: (M,) signed sagitta
+    Return: center (M, 2), R (M,), ang0 (M,), dtheta (M,), chord length L (M,)
+    Degenerate arcs (L == 0 or |h| < 1e-20) get non-finite values; callers mask them.
+    """
+    p0 = np.asarray(p0, float).reshape(-1, 2)
+    p1 = np.asarray(p1, float).reshape(-1, 2)
+    h  = np.asarray(h, float).reshape(-1)
+
+    chord = p1 - p0
+    L = np.linalg.norm(chord, axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = chord / L[:, None]
+        n_left = np.column_stack([-t[:, 1], t[:, 0]])
+        h0 = np.abs(h)
+
+        R = (L * L) / (8.0 * h0) + (h0 / 2.0)
+        a = R - h0
+
+        sgn = np.where(h > 0, 1.0, -1.0)
+        if not left_positive:
+            sgn = -sgn
+
+        c = 0.5 * (p0 + p1) + (sgn * a)[:, None] * n_left
+
+        v0 = p0 - c
+        v1 = p1 - c
+        ang0 = np.arctan2(v0[:, 1], v0[:, 0])
+        ang1 = np.arctan2(v1[:, 1], v1[:, 0])
+        dtheta = _wrap_to_pi(ang1 - ang0)
+
+    return c, R, ang0, dtheta, L
+
+def _arc_points_from_sagitta_batch(p0, p1, h, ds_target=2e-4, max_pts=2000, left_positive=False):
+    """
+    Densify many arcs in one pass.
+    Return: (points, counts) - all arc points concatenated in arc order, and the
+    number of points of each arc. Arc m matches _arc_points_from_sagitta(p0[m], p1[m], h[m]).
+    """
+    p0 = np.asarray(p0, float).reshape(-1, 2)
+    p1 = np.asarray(p1, float).reshape(-1, 2)
+    h  = np.asarray(h, float).reshape(-1)
+    c, R, ang0, dtheta, L = _arc_geometry_from_sagitta(p0, p1, h, left_positive=left_positive)
+
+    is_point = L == 0
+    is_line = ~is_point & (np.abs(h) < 1e-20)
+    is_arc = ~(is_point | is_line)
+
+    # straight chords have R = inf and dtheta = 0
+    arc_len = np.zeros(len(h))
+    arc_len[is_arc] = np.abs(dtheta[is_arc]) * R[is_arc]
+    nseg = np.clip(np.ceil(arc_len / ds_target), 8, max_pts).astype(int)
+    counts = np.where(is_point, 1, np.where(is_line, 2, nseg))
+
+    idx = np.repeat(np.arange(len(h)), counts)
+    j = np.arange(len(idx)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    out = np.empty((len(idx), 2))
+    m = is_arc[idx]
+    ia, ja = idx[m], j[m]
+    # np.linspace(ang0, ang0 + dtheta, nseg), all arcs at once
+    step = dtheta[ia] / (counts[ia] - 1)
+    thetas = ja * step + ang0[ia]
+    last = ja == counts[ia] - 1
+    thetas[last] = ang0[ia][last] + dtheta[ia][last]
+    out[m] = c[ia] + R[ia, None] * np.column_stack([np.cos(thetas), np.sin(thetas)])
+
+    # straight chords give [p0, p1], zero-length chords give [p0]
+    nm = ~m
+    out[nm] = np.where((j[nm] == 1)[:, None], p1[idx[nm]], p0[idx[nm]])
+    return out, counts
+
 def densify_path_with_arc_height(raw_pts, ds_arc=2e-4):
     """
     Parse your mixed format:
       - normal point: [x, y]
       - arc marker : [h, SENTINEL_Y]  (h is signed sagitta)
     Return: dense centerline points (polyline).
+    All arc markers are located with masks and densified together.
     """
-    pts = np.asarray(raw_pts, float)
-    out = []
+    pts = np.asarray(raw_pts, float).reshape(-1, 2)
+    n = len(pts)
+    if n == 0:
+        return np.empty((0, 2))
 
-    def prev_normal(i):
-        j = i - 1
-        while j >= 0 and pts[j,1] == SENTINEL_Y:
-            j -= 1
-        return j
+    marker = pts[:, 1] == SENTINEL_Y
+    normal = ~marker
 
-    def next_normal(i):
-        j = i + 1
-        while j < len(pts) and pts[j,1] == SENTINEL_Y:
-            j += 1
-        return j
+    # nearest normal point before / after every row
+    idx = np.arange(n)
+    prev_normal = np.maximum.accumulate(np.where(normal, idx, -1))
+    next_normal = np.minimum.accumulate(np.where(normal, idx, n)[::-1])[::-1]
 
-    for i, (x, y) in enumerate(pts):
-        if y != SENTINEL_Y:
-            if (not out) or (np.linalg.norm(np.asarray(out[-1]) - pts[i]) > 1e-15):
-                out.append(pts[i].tolist())
-            continue
+    arcs = np.flatnonzero(marker & (prev_normal >= 0) & (next_normal < n))
+    arc_pts, arc_counts = _arc_points_from_sagitta_batch(
+        pts[prev_normal[arcs]], pts[next_normal[arcs]], pts[arcs, 0], ds_target=ds_arc
+    )
 
-        ip, inx = prev_normal(i), next_normal(i)
-        if ip < 0 or inx >= len(pts):
-            continue
+    # every normal row emits itself, every valid marker emits its arc
+    counts = normal.astype(int)
+    counts[arcs] = arc_counts
+    starts = np.cumsum(counts) - counts
 
-        arc_pts = _arc_points_from_sagitta(pts[ip], pts[inx], x, ds_target=ds_arc)
-        for p in arc_pts:
-            if out and np.linalg.norm(np.asarray(out[-1]) - p) < 1e-15:
-                continue
-            out.append(p.tolist())
+    out = np.empty((counts.sum(), 2))
+    out[starts[normal]] = pts[normal]
+    arc_starts = np.cumsum(arc_counts) - arc_counts
+    out[np.repeat(starts[arcs] - arc_starts, arc_counts) + np.arange(len(arc_pts))] = arc_pts
 
-    return np.asarray(out, float)
+    # drop consecutive duplicates
+    keep = np.ones(len(out), dtype=bool)
+    keep[1:] = np.linalg.norm(np.diff(out, axis=0), axis=1) > 1e-15
+    return out[keep]
 
 # -----------------------------
 # 2) Arc-length resample (uniform s)
@@ -110,47 +189,376 @@ def resample_by_arclength(points, n_samples=1200):
     y_new = np.interp(s_new, s, pts[:,1])
     return np.column_stack([x_new, y_new]), s_new
 
+def resample_many_by_arclength(point_sets, n_samples=1200):
+    """
+    Resample several polylines into one (B, n_samples, 2) array.
+    Row b matches resample_by_arclength(point_sets[b], n_samples).
+    """
+    B = len(point_sets)
+    centerlines = np.empty((B, n_samples, 2))
+    totals = np.empty(B)
+    cums = []
+    for b, pts in enumerate(point_sets):
+        s = arc_length(np.asarray(pts, float))
+        totals[b] = s[-1]
+        cums.append(s)
+
+    s_new = np.linspace(0, totals, n_samples, axis=-1)
+    for b, pts in enumerate(point_sets):
+        centerlines[b, :, 0] = np.interp(s_new[b], cums[b], pts[:,0])
+        centerlines[b, :, 1] = np.interp(s_new[b], cums[b], pts[:,1])
+    return centerlines, s_new
+
 # -----------------------------
-# 3) Fast spatial random width field (FFT method)
-#    (same μ, σ, Lc; different "model" shapes)
+# 2b) Exact path: line segments + circular arcs (closed-form arc length)
 # -----------------------------
-def width_random_field_fft(s, mu, sigma, Lc, model="exponential", seed=0):
+def path_segments(raw_pts, left_positive=False):
     """
-    Generate w(s) on uniform grid s using spectral shaping.
-    This is fast: O(N log N). Good for large N.
+    Decode the mixed [x, y] / [h, SENTINEL_Y] format into exact segments.
+    Each segment joins two consecutive normal points; it is a circular arc when
+    an arc marker sits between them, otherwise a straight line.
+    Return: dict of arrays (M segments)
+      p0, p1, center (M, 2); R, ang0, dtheta, length (M,); is_arc (M,) bool;
+      s0 (M+1,) cumulative arc length at the segment starts (s0[-1] = total length)
+    """
+    pts = np.asarray(raw_pts, float).reshape(-1, 2)
+    normals = np.flatnonzero(pts[:, 1] != SENTINEL_Y)
+    a, b = normals[:-1], normals[1:]
+
+    # the marker right before the next normal point carries the sagitta
+    has_marker = (b - a) > 1
+    h = np.where(has_marker, pts[b - 1, 0], 0.0)
+
+    p0, p1 = pts[a], pts[b]
+    c, R, ang0, dtheta, L = _arc_geometry_from_sagitta(p0, p1, h, left_positive=left_positive)
+    is_arc = has_marker & (np.abs(h) >= 1e-20) & (L > 0)
+    # R and dtheta are inf / nan on straight segments: only arcs use them
+    length = L.copy()
+    length[is_arc] = np.abs(dtheta[is_arc]) * R[is_arc]
+
+    keep = L > 0
+    seg = {
+        "p0": p0[keep], "p1": p1[keep], "center": c[keep], "R": R[keep],
+        "ang0": ang0[keep], "dtheta": dtheta[keep], "length": length[keep], "is_arc": is_arc[keep],
+    }
+    seg["s0"] = np.concatenate([[0.0], np.cumsum(seg["length"])])
+    seg["start"] = pts[normals[0]] if len(normals) else np.zeros(2)
+    return seg
+
+def sample_path_segments(seg, s):
+    """
+    Evaluate points and exact unit tangents at arc-length positions s.
+    Return: points (N, 2), tangents (N, 2)
     """
-    rng = np.random.default_rng(seed)
     s = np.asarray(s, float)
-    n = len(s)
-    ds = s[1] - s[0]  # assume uniform
-    k = np.fft.rfftfreq(n, d=ds)  # cycles per unit length
+    M = len(seg["length"])
+    if M == 0:
+        # single-point path: nothing to follow
+        points = np.tile(seg["start"], (len(s), 1))
+        tangents = np.tile([1.0, 0.0], (len(s), 1))
+        return points, tangents
 
-    # characteristic cutoff ~ 1/Lc
-    kc = 1.0 / max(Lc, 1e-30)
+    i = np.clip(np.searchsorted(seg["s0"], s, side="right") - 1, 0, M - 1)
+    u = np.clip((s - seg["s0"][i]) / seg["length"][i], 0.0, 1.0)
+    arc = seg["is_arc"][i]
 
-    # Shape function H(k) (amplitude shaping)
+    p0, p1 = seg["p0"][i], seg["p1"][i]
+    chord = p1 - p0
+    points = p0 + u[:, None] * chord
+    tangents = chord / np.linalg.norm(chord, axis=1)[:, None]
+
+    theta = seg["ang0"][i][arc] + u[arc] * seg["dtheta"][i][arc]
+    radial = np.column_stack([np.cos(theta), np.sin(theta)])
+    points[arc] = seg["center"][i][arc] + seg["R"][i][arc][:, None] * radial
+    tangents[arc] = np.sign(seg["dtheta"][i][arc])[:, None] * np.column_stack([-radial[:, 1], radial[:, 0]])
+    return points, tangents
+
+def resample_path_exact(raw_pts, n_samples=1200):
+    """
+    Uniform-s resample straight from the exact path (no dense centerline).
+    Return: centerline (N, 2), s (N,), tangents (N, 2)
+    """
+    seg = path_segments(raw_pts)
+    s_new = np.linspace(0, seg["s0"][-1], n_samples)
+    centerline, tangents = sample_path_segments(seg, s_new)
+    return centerline, s_new, tangents
+
+def resample_many_exact(paths, n_samples=1200):
+    """
+    Batched resample_path_exact into (B, n_samples, 2) arrays.
+    Return: centerlines, s (B, n_samples), tangents
+    """
+    segs = [path_segments(p) for p in paths]
+    totals = np.array([seg["s0"][-1] for seg in segs])
+    s_new = np.linspace(0, totals, n_samples, axis=-1)
+
+    centerlines = np.empty((len(segs), n_samples, 2))
+    tangents = np.empty((len(segs), n_samples, 2))
+    for b, seg in enumerate(segs):
+        centerlines[b], tangents[b] = sample_path_segments(seg, s_new[b])
+    return centerlines, s_new, tangents
+
+# -----------------------------
+# 2c) Adaptive sample counts (length / L_c / arc-error aware)
+# -----------------------------
+def _fft_friendly_size(n):
+    """Smallest 2^a * 3^b >= n (keeps FFTs fast and groups similar traces)."""
+    n = int(n)
+    best = 1 << max(n - 1, 0).bit_length()
+    p3 = 1
+    while p3 < best:
+        p2 = p3
+        while p2 < n:
+            p2 *= 2
+        best = min(best, p2)
+        p3 *= 3
+    return best
+
+def _fft_friendly_floor(counts):
+    """Largest 2^a * 3^b <= n for every n in counts (n >= 1)."""
+    counts = np.asarray(counts, dtype=int)
+    limit = int(counts.max(initial=1))
+    sizes = []
+    p3 = 1
+    while p3 <= limit:
+        p2 = p3
+        while p2 <= limit:
+            sizes.append(p2)
+            p2 *= 2
+        p3 *= 3
+    sizes = np.sort(sizes)
+    return sizes[np.searchsorted(sizes, np.maximum(counts, 1), side="right") - 1]
+
+def adaptive_sample_counts(
+    paths,
+    L_c,
+    samples_per_lc=10.0,
+    max_error=1e-6,
+    n_min=16,
+    n_max=None,
+    max_vertices=None,
+    vertex_budget=None,
+):
+    """
+    Choose n_resample per path instead of a fixed count.
+      - at least samples_per_lc samples per correlation length L_c
+      - on arcs, sample spacing ds <= sqrt(8 R max_error) so the chord error stays < max_error
+      - max_vertices: per-trace polygon vertex cap (polygon has 2n vertices)
+      - vertex_budget: board-wide polygon vertex cap, all counts are scaled down to fit
+    Counts are FFT friendly sizes (2^a * 3^b) so similar traces share one batch:
+    rounded up, but rounded down wherever a cap applies. Both caps win over
+    n_min; every trace keeps at least 2 samples.
+    Return: int array, one count per path
+    """
+    counts = np.empty(len(paths), dtype=int)
+    for b, p in enumerate(paths):
+        seg = path_segments(p)
+        length = seg["s0"][-1]
+        ds = L_c / samples_per_lc
+        if max_error and np.any(seg["is_arc"]):
+            ds = min(ds, np.sqrt(8.0 * seg["R"][seg["is_arc"]].min() * max_error))
+        counts[b] = int(np.ceil(length / max(ds, 1e-30))) + 1
+
+    cap = None
+    if n_max is not None:
+        cap = int(n_max)
+    if max_vertices is not None:
+        cap = int(max_vertices) // 2 if cap is None else min(cap, int(max_vertices) // 2)
+    n_lo = n_min if cap is None else min(n_min, max(cap, 2))
+
+    counts = np.maximum(counts, n_lo)
+    counts = np.array([_fft_friendly_size(n) for n in counts], dtype=int)
+    if cap is not None:
+        counts = np.minimum(counts, _fft_friendly_floor([max(cap, 2)])[0])
+
+    if vertex_budget is not None and len(counts) and 2 * counts.sum() > vertex_budget:
+        # the even share bounds the floor, then the largest common scale that fits
+        n_lo = max(2, min(n_lo, int(vertex_budget) // (2 * len(counts))))
+
+        def scaled(scale):
+            return _fft_friendly_floor(np.maximum(np.floor(counts * scale).astype(int), n_lo))
+
+        fits, too_big = 0.0, 1.0
+        for _ in range(40):
+            mid = 0.5 * (fits + too_big)
+            if 2 * scaled(mid).sum() <= vertex_budget:
+                fits = mid
+            else:
+                too_big = mid
+        counts = scaled(fits)
+    return counts
+
+def _farthest_in_spans(x, y, starts, ends, lens):
+    """
+    Interior vertex farthest from the chord of every span x/y[starts[i]..ends[i]]
+    (lens[i] > 0 interior vertices each). Return: (index, distance) per span.
+    """
+    offs = np.cumsum(lens) - lens
+    group = np.repeat(np.arange(len(starts)), lens)
+    idx = np.arange(lens.sum()) + np.repeat(starts + 1 - offs, lens)
+
+    # distance of every interior point to its span segment
+    ax, ay = np.repeat(x[starts], lens), np.repeat(y[starts], lens)
+    abx, aby = np.repeat(x[ends] - x[starts], lens), np.repeat(y[ends] - y[starts], lens)
+    apx, apy = x[idx] - ax, y[idx] - ay
+    denom = abx * abx + aby * aby
+    t = np.clip((apx * abx + apy * aby) / np.where(denom > 0, denom, 1.0), 0.0, 1.0)
+    ex, ey = apx - t * abx, apy - t * aby
+    d2 = ex * ex + ey * ey
+
+    d2max = np.maximum.reduceat(d2, offs)
+    # first position of the maximum in each span (group is sorted)
+    hit = np.flatnonzero(d2 == d2max[group])
+    first = np.ones(len(hit), dtype=bool)
+    first[1:] = group[hit[1:]] != group[hit[:-1]]
+    return idx[hit[first]], np.sqrt(d2max)
+
+def _rdp_keep(pts, starts, ends, tol):
+    """
+    Ramer-Douglas-Peucker on many spans pts[starts[i]..ends[i]] at once,
+    processed level by level for all pending spans.
+    Return: bool mask of the vertices to keep (span end points always kept).
+    """
+    pts = np.asarray(pts, float)
+    x, y = np.ascontiguousarray(pts[:, 0]), np.ascontiguousarray(pts[:, 1])
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[starts] = keep[ends] = True
+    while len(starts):
+        lens = ends - starts - 1
+        m = lens > 0
+        starts, ends, lens = starts[m], ends[m], lens[m]
+        if not len(starts):
+            break
+
+        split, dmax = _farthest_in_spans(x, y, starts, ends, lens)
+        need = dmax > tol
+        keep[split[need]] = True
+        starts, ends = np.concatenate([starts[need], split[need]]), np.concatenate([split[need], ends[need]])
+    return keep
+
+def rdp_significance(pts, starts, ends, floor=0.0):
+    """
+    Tolerance at which Ramer-Douglas-Peucker drops each vertex, for many spans.
+    The RDP split tree does not depend on the tolerance, so for tol >= floor
+    significance > tol is exactly the _rdp_keep(pts, starts, ends, tol) mask:
+    one pass gives every level of detail (span end points are inf).
+    Spans flatter than floor are not refined; their vertices get 0.
+    """
+    pts = np.asarray(pts, float)
+    x, y = np.ascontiguousarray(pts[:, 0]), np.ascontiguousarray(pts[:, 1])
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    sig = np.zeros(len(pts))
+    sig[starts] = sig[ends] = np.inf
+    bound = np.full(len(starts), np.inf) # significance of the vertex that opened each span
+    while len(starts):
+        lens = ends - starts - 1
+        m = lens > 0
+        starts, ends, lens, bound = starts[m], ends[m], lens[m], bound[m]
+        if not len(starts):
+            break
+
+        split, dmax = _farthest_in_spans(x, y, starts, ends, lens)
+        m = dmax > floor
+        starts, ends, split, dmax, bound = starts[m], ends[m], split[m], dmax[m], bound[m]
+        # a vertex survives only while every split above it does
+        level = np.minimum(dmax, bound)
+        sig[split] = level
+        starts, ends = np.concatenate([starts, split]), np.concatenate([split, ends])
+        bound = np.concatenate([level, level])
+    return sig
+
+def polygons_significance(polygons, floor=0.0):
+    """rdp_significance of many polygons (one span each); one array per polygon."""
+    lens = np.fromiter((len(p) for p in polygons), dtype=np.int64, count=len(polygons))
+    local = np.concatenate([[0], np.cumsum(lens)])
+    sig = rdp_significance(np.concatenate(polygons), local[:-1], local[1:] - 1, floor)
+    return np.split(sig, local[1:-1])
+
+def simplify_polyline(points, tol):
+    """
+    Drop vertices that lie within tol of the simplified polyline (end points kept).
+    """
+    pts = np.asarray(points, float)
+    n = len(pts)
+    if n < 3 or not tol or tol <= 0:
+        return pts
+    return pts[_rdp_keep(pts, np.array([0]), np.array([n - 1]), tol)]
+
+# -----------------------------
+# 3) Fast spatial random width field (FFT method)
+#    (same μ, σ, Lc; different "model" shapes)
+# -----------------------------
+def _spectral_shape(k, kc, model):
+    """
+    Amplitude shaping H(k) for the given model.
+    k and kc broadcast, so this works for a single trace or a batch of rows.
+    """
     # Note: these are practical engineering shapes that yield the intended "smoothness" differences.
     if model == "band_limited":
-        H = (np.abs(k) <= kc).astype(float)
+        return (np.abs(k) <= kc).astype(float)
 
     elif model == "gaussian":
         # very smooth
-        H = np.exp(-(k / kc)**2)
+        return np.exp(-(k / kc)**2)
 
     elif model == "exponential":
         # rougher than gaussian
-        H = 1.0 / np.sqrt(1.0 + (k / kc)**2)
+        return 1.0 / np.sqrt(1.0 + (k / kc)**2)
 
     elif model == "matern32":
         # between exponential and gaussian
-        H = 1.0 / (1.0 + (k / kc)**2)
+        return 1.0 / (1.0 + (k / kc)**2)
 
-    else:
-        raise ValueError("model must be: exponential|gaussian|matern32|band_limited")
+    raise ValueError("model must be: exponential|gaussian|matern32|band_limited")
+
+SPECTRAL_CACHE_SIZE = 128
+
+@lru_cache(maxsize=SPECTRAL_CACHE_SIZE)
+def _spectral_filter(n, ds, Lc, model):
+    """
+    H(k) on the rfft grid of n samples spaced ds (cached, read-only).
+    Traces of one generation mostly share (n, ds, Lc, model), so H is computed once.
+    """
+    k = np.fft.rfftfreq(n, d=ds)  # cycles per unit length
+
+    # characteristic cutoff ~ 1/Lc
+    kc = 1.0 / max(Lc, 1e-30)
+
+    H = _spectral_shape(k, kc, model)
+    H.setflags(write=False)
+    return H
+
+def spectral_filter_cache_info():
+    """Hit/miss counters of the H(k) cache."""
+    info = _spectral_filter.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+def clear_spectral_filter_cache():
+    _spectral_filter.cache_clear()
+
+def derive_seed(*entropy):
+    """Reproducible seed from integers such as (base seed, variant, primitive id)."""
+    return int(np.random.SeedSequence([int(e) for e in entropy]).generate_state(1)[0])
+
+def width_random_field_fft(s, mu, sigma, Lc, model="exponential", seed=0):
+    """
+    Generate w(s) on uniform grid s using spectral shaping.
+    This is fast: O(N log N). Good for large N.
+    """
+    rng = np.random.default_rng(seed)
+    s = np.asarray(s, float)
+    n = len(s)
+    ds = s[1] - s[0]  # assume uniform
+
+    # Shape function H(k) (amplitude shaping)
+    H = _spectral_filter(n, float(ds), float(Lc), model)
 
     # White noise in frequency (complex), shape, then iFFT
-    re = rng.standard_normal(len(k))
-    im = rng.standard_normal(len(k))
+    re = rng.standard_normal(len(H))
+    im = rng.standard_normal(len(H))
     X = (re + 1j * im) * H
     x = np.fft.irfft(X, n=n)
 
@@ -160,23 +568,207 @@ def width_random_field_fft(s, mu, sigma, Lc, model="exponential", seed=0):
     w = mu + sigma * x
     return w
 
+def width_random_fields_fft(s, mu, sigma, Lc, model="exponential", seeds=None):
+    """
+    Batched width_random_field_fft.
+      s     : (B, N) uniform grids, one row per trace (same N for all rows)
+      mu, sigma, Lc : scalars or length-B arrays
+      seeds : length-B seeds; row b matches width_random_field_fft(..., seed=seeds[b])
+    One rfft/irfft call is done for the whole batch.
+    """
+    s = np.atleast_2d(np.asarray(s, float))
+    B, n = s.shape
+    nk = n // 2 + 1
+    seeds = np.zeros(B, dtype=int) if seeds is None else seeds
+
+    # one cached H(k) per distinct (ds, Lc) in the batch
+    ds = s[:, 1] - s[:, 0]
+    Lc = np.broadcast_to(np.asarray(Lc, float), (B,))
+    keys, inverse = np.unique(np.column_stack([ds, Lc]), axis=0, return_inverse=True)
+    H = np.stack([_spectral_filter(n, float(d), float(l), model) for d, l in keys])[inverse.reshape(-1)]
+
+    # per-row generators keep results identical to the single-trace path
+    re = np.empty((B, nk))
+    im = np.empty((B, nk))
+    for b in range(B):
+        rng = np.random.default_rng(seeds[b])
+        re[b] = rng.standard_normal(nk)
+        im[b] = rng.standard_normal(nk)
+    X = (re + 1j * im) * H
+    x = np.fft.irfft(X, n=n, axis=-1)
+
+    x = x - np.mean(x, axis=-1, keepdims=True)
+    x = x / (np.std(x, axis=-1, keepdims=True) + 1e-30)
+    mu = np.broadcast_to(np.asarray(mu, float), (B,))[:, None]
+    sigma = np.broadcast_to(np.asarray(sigma, float), (B,))[:, None]
+    return mu + sigma * x
+
+# -----------------------------
+# 3b) Streaming width field (bounded memory, O(N))
+#     exponential / matern32: exact state-space recursion
+#     gaussian / band_limited: overlap-save FIR filtering of white noise
+#     Both use the same spectra as width_random_field_fft (decay rate 2*pi/Lc),
+#     normalized by the model variance instead of the sample statistics.
+# -----------------------------
+# Longest FIR half width (taps) of the gaussian / band_limited stream: bounds
+# its memory (kernel and FFT buffers) independently of L_c / ds
+MAX_FIR_HALF_WIDTH = 1 << 18
+
+def _ar1_block(x0, q, r):
+    """x_i = r x_{i-1} + q_i for a block, vectorized (r^-j stays bounded per block)."""
+    j = np.arange(1, len(q) + 1)
+    rj = r ** j
+    return rj * (x0 + np.cumsum(q / rj))
+
+def _matern32_block(z0, q, r, N):
+    """
+    z_i = A z_{i-1} + q_i with A = r (I + N), N nilpotent (N @ N = 0):
+    A^m = r^m (I + m N), so the recursion is a pair of scaled cumsums.
+    """
+    j = np.arange(1, len(q) + 1)
+    rj = (r ** j)[:, None]
+    U = np.cumsum(q / rj, axis=0)
+    V = np.cumsum(j[:, None] * q / rj, axis=0)
+    inner = z0 + U + (j[:, None] * (z0 + U) - V) @ N.T
+    return rj * inner
+
+def _fir_kernel(ds, Lc, model):
+    """Unit-energy, centered FIR kernel whose spectrum is H(k) of the model."""
+    span = 16.0 if model == "band_limited" else 4.0
+    K = span * Lc / ds
+    if not K <= MAX_FIR_HALF_WIDTH:
+        raise ValueError(
+            f"{model} stream field: L_c / ds = {Lc / ds:.3g} needs a kernel of {K:.3g} taps each side "
+            f"(limit {MAX_FIR_HALF_WIDTH}); use field_method='fft' or fewer samples per trace"
+        )
+    K = max(int(np.ceil(K)), 1)
+    M = _fft_friendly_size(4 * K + 1)
+    h = np.fft.fftshift(np.fft.irfft(_spectral_filter(M, float(ds), float(Lc), model), n=M))
+    c = M // 2
+    h = h[c - K:c + K + 1]
+    return h / np.sqrt(np.sum(h * h))
+
+def width_random_field_stream(n, ds, mu, sigma, Lc, model="exponential", seed=0, chunk_size=65536):
+    """
+    Generate w(s) on a uniform grid of n samples spaced ds, chunk by chunk.
+    Yields arrays of at most chunk_size samples; memory stays O(chunk_size).
+    The field is stationary and continuous across chunks, and the output
+    does not depend on chunk_size.
+    """
+    rng = np.random.default_rng(seed)
+    lam = 2.0 * np.pi / max(Lc, 1e-30)
+    r = np.exp(-lam * ds)
+    # keep r^-m finite inside one recursion block
+    block = int(max(1, min(chunk_size, 50.0 / max(lam * ds, 1e-300))))
+
+    if model in ("exponential", "matern32") and r < 1e-100:
+        # L_c far below ds: neighbouring samples are uncorrelated, and q / r^j
+        # would overflow (r underflows to 0 once ds > ~120 L_c)
+        done = 0
+        while done < n:
+            m = min(chunk_size, n - done)
+            done += m
+            yield mu + sigma * rng.standard_normal(m)
+
+    elif model == "exponential":
+        x = rng.standard_normal()  # stationary start
+        q_scale = np.sqrt(1.0 - r * r)
+        done = 0
+        while done < n:
+            m = min(block, n - done)
+            out = _ar1_block(x, q_scale * rng.standard_normal(m), r)
+            x = out[-1]
+            done += m
+            yield mu + sigma * out
+
+    elif model == "matern32":
+        P = np.diag([1.0, lam * lam])  # stationary state covariance (unit variance)
+        N = np.array([[lam * ds, ds], [-lam * lam * ds, -lam * ds]])
+        A = r * (np.eye(2) + N)
+        Lq = np.linalg.cholesky(P - A @ P @ A.T + 1e-300 * np.eye(2))
+        z = np.linalg.cholesky(P) @ rng.standard_normal(2)
+        done = 0
+        while done < n:
+            m = min(block, n - done)
+            out = _matern32_block(z, rng.standard_normal((m, 2)) @ Lq.T, r, N)
+            z = out[-1]
+            done += m
+            yield mu + sigma * out[:, 0]
+
+    elif model in ("gaussian", "band_limited"):
+        h = _fir_kernel(ds, Lc, model)
+        K = len(h) // 2
+        nfft = _fft_friendly_size(chunk_size + 4 * K)
+        Hf = np.fft.rfft(h, n=nfft)
+        buf = rng.standard_normal(2 * K)  # noise at samples -K .. K-1
+        done = 0
+        while done < n:
+            m = min(chunk_size, n - done)
+            x = np.concatenate([buf, rng.standard_normal(m)])
+            # overlap-save: 'valid' part of the linear convolution
+            y = np.fft.irfft(np.fft.rfft(x, n=nfft) * Hf, n=nfft)[2 * K:2 * K + m]
+            buf = x[m:]
+            done += m
+            yield mu + sigma * y
+
+    else:
+        raise ValueError("model must be: exponential|gaussian|matern32|band_limited")
+
+def width_random_field_streamed(s, mu, sigma, Lc, model="exponential", seed=0, chunk_size=65536):
+    """width_random_field_stream collected on the uniform grid s (same call shape as the FFT version)."""
+    s = np.asarray(s, float)
+    ds = s[1] - s[0]  # assume uniform
+    w = np.empty(len(s))
+    i = 0
+    for chunk in width_random_field_stream(len(s), ds, mu, sigma, Lc, model=model, seed=seed, chunk_size=chunk_size):
+        w[i:i + len(chunk)] = chunk
+        i += len(chunk)
+    return w
+
 # -----------------------------
 # 4) Build trace polygon from centerline + width(s)
 # -----------------------------
-def trace_polygon(centerline, width):
+def trace_polygon(centerline, width, tangent=None):
+    """
+    centerline: (N, 2) or batched (B, N, 2); width: (N,) or (B, N).
+    tangent: optional exact unit tangents (same shape as centerline);
+             estimated with np.gradient when omitted.
+    """
     centerline = np.asarray(centerline, float)
     width = np.asarray(width, float)
 
-    tang = np.gradient(centerline, axis=0)
-    tang = tang / np.linalg.norm(tang, axis=1)[:,None]
-    normal = np.column_stack([-tang[:,1], tang[:,0]])
+    if tangent is None:
+        tang = np.gradient(centerline, axis=-2)
+        tang = tang / np.linalg.norm(tang, axis=-1, keepdims=True)
+    else:
+        tang = np.asarray(tangent, float)
+    normal = np.stack([-tang[..., 1], tang[..., 0]], axis=-1)
 
-    left  = centerline + normal*(width[:,None]/2)
-    right = centerline - normal*(width[:,None]/2)
+    half = width[..., None] / 2
+    left  = centerline + normal*half
+    right = centerline - normal*half
 
-    polygon = np.vstack([left, right[::-1]])
+    polygon = np.concatenate([left, right[..., ::-1, :]], axis=-2)
     return polygon, left, right
 
+def _simplified_polygons(left, right, tol):
+    """
+    Drop redundant vertices (within tol) from both sides of every polygon.
+      left, right: (B, N, 2) offset lines; return: list of B closed polygons
+    """
+    left = np.asarray(left, float).reshape(-1, left.shape[-2], 2)
+    right = np.asarray(right, float).reshape(-1, right.shape[-2], 2)
+    B, n, _ = left.shape
+    if n < 3 or not tol or tol <= 0:
+        return list(np.concatenate([left, right[:, ::-1]], axis=1))
+
+    # one polyline per side, all simplified in one pass
+    sides = np.concatenate([left, right[:, ::-1]], axis=0).reshape(-1, 2)
+    starts = np.arange(2 * B) * n
+    keep = _rdp_keep(sides, starts, starts + n - 1, tol).reshape(2 * B, n)
+    sides = sides.reshape(2 * B, n, 2)
+    return [np.vstack([sides[b][keep[b]], sides[B + b][keep[B + b]]]) for b in range(B)]
+
 # -----------------------------
 # 5) Main function you asked for
 # -----------------------------
@@ -192,6 +784,9 @@ def build_trace(
     w_min=None,
     w_max=None,
     plot=True,
+    exact_arcs=False,   # True => sample the exact arcs, no ds_arc densification
+    simplify_tol=None,  # drop polygon vertices that deviate less than this
+    field_method="fft", # "stream" => chunked O(N) generator for very long traces
 ):
     """
     Inputs:
@@ -202,17 +797,31 @@ def build_trace(
       1) polygon points (Mx2)
       2) (s, w_s) width variation with distance
       3) centerline (Nx2) resampled
-      4) dense_centerline (Kx2) (arc already densified)
+      4) dense_centerline (Kx2) (arc already densified;
+         with exact_arcs it is the resampled centerline itself)
     """
 
-    # A) arc-height -> dense polyline
-    dense_centerline = densify_path_with_arc_height(path_pts, ds_arc=ds_arc)
+    if exact_arcs:
+        # A+B) uniform s samples evaluated on the exact lines/arcs
+        with PERF.stage("trace.resample_exact", items=1):
+            centerline, s, tangent = resample_path_exact(path_pts, n_samples=n_resample)
+        dense_centerline = centerline
+    else:
+        # A) arc-height -> dense polyline
+        with PERF.stage("trace.densify", items=1):
+            dense_centerline = densify_path_with_arc_height(path_pts, ds_arc=ds_arc)
 
-    # B) uniform resample by arc-length
-    centerline, s = resample_by_arclength(dense_centerline, n_samples=n_resample)
+        # B) uniform resample by arc-length
+        with PERF.stage("trace.resample", items=1):
+            centerline, s = resample_by_arclength(dense_centerline, n_samples=n_resample)
+        tangent = None
 
     # C) width field on uniform s (FAST)
-    w_s = width_random_field_fft(s, mu_w, sigma_w, L_c, model=model, seed=seed)
+    with PERF.stage("trace.width_field", items=1):
+        if field_method == "stream":
+            w_s = width_random_field_streamed(s, mu_w, sigma_w, L_c, model=model, seed=seed)
+        else:
+            w_s = width_random_field_fft(s, mu_w, sigma_w, L_c, model=model, seed=seed)
 
     # optional clamp (process limits)
     if (w_min is not None) or (w_max is not None):
@@ -221,10 +830,15 @@ def build_trace(
         w_s = np.clip(w_s, lo, hi)
 
     # D) polygon
-    polygon, left, right = trace_polygon(centerline, w_s)
+    with PERF.stage("trace.polygon", items=1):
+        polygon, left, right = trace_polygon(centerline, w_s, tangent=tangent)
+        if simplify_tol:
+            polygon = _simplified_polygons(left, right, simplify_tol)[0]
 
-    # E) plots
+    # E) plots (matplotlib is only imported here, headless runs never load it)
     if plot:
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(figsize=(6,8))
         ax.plot(dense_centerline[:,0], dense_centerline[:,1], lw=1.0, label="Dense centerline (arc≈segments)")
         ax.plot(polygon[:,0], polygon[:,1], lw=1.1, label="Trace polygon")
@@ -245,3 +859,196 @@ def build_trace(
         plt.show()
 
     return polygon, (s, w_s), centerline, dense_centerline
+
+def _per_trace(value, B, fill):
+    """Broadcast a scalar / per-trace value to a float array of length B (None -> fill)."""
+    if value is None:
+        return np.full(B, fill)
+    if np.ndim(value) == 0:
+        return np.full(B, float(value))
+    return np.array([fill if v is None else v for v in value], float)
+
+# -----------------------------
+# 6) Batched pipeline, split in stages so callers can cache each one
+#    A+B) resample_centerlines  C) unit_width_fields  D) finish_traces
+# -----------------------------
+def resample_centerlines(paths, n_samples, ds_arc=2e-4, exact_arcs=False, dense=None):
+    """
+    Stage A+B for paths sharing one sample count.
+      dense : optional list of already densified centerlines (None entries are computed)
+    Return: centerlines (B, n, 2), s (B, n), tangents (B, n, 2) or None, dense list
+    """
+    if exact_arcs:
+        # exact lines/arcs sampled straight into one 2-D batch
+        centerlines, s, tangents = resample_many_exact(paths, n_samples=n_samples)
+        return centerlines, s, tangents, list(centerlines)
+
+    # arc-height -> dense polyline (per path, ragged)
+    dense = [None] * len(paths) if dense is None else list(dense)
+    for b, p in enumerate(paths):
+        if dense[b] is None:
+            dense[b] = densify_path_with_arc_height(p, ds_arc=ds_arc)
+
+    # uniform resample into one 2-D batch
+    centerlines, s = resample_many_by_arclength(dense, n_samples=n_samples)
+    return centerlines, s, None, dense
+
+def unit_width_fields(s, L_c, model="matern32", seeds=None, field_method="fft"):
+    """
+    Stage C: zero-mean, unit-variance fields x on the (B, n) grids s.
+    mu + sigma * x equals the width field of build_trace for the same seed.
+    """
+    B = len(s)
+    seeds = np.zeros(B, dtype=int) if seeds is None else np.asarray(seeds)
+    L_c = _per_trace(L_c, B, 0.0)
+    if field_method == "stream":
+        return np.stack([
+            width_random_field_streamed(s[b], 0.0, 1.0, L_c[b], model=model, seed=seeds[b])
+            for b in range(B)
+        ])
+    # one FFT for the batch
+    return width_random_fields_fft(s, 0.0, 1.0, L_c, model=model, seeds=seeds)
+
+def finish_traces(centerlines, x, mu_w, sigma_w, w_min=None, w_max=None, tangents=None, simplify_tol=None):
+    """
+    Stage D: scale and clamp the unit fields, then build the polygons.
+    Return: polygons ((B, 2n, 2) array, or list when simplified), w_s (B, n)
+    """
+    B = len(x)
+    w_s = _per_trace(mu_w, B, 0.0)[:, None] + _per_trace(sigma_w, B, 0.0)[:, None] * x
+
+    # optional clamp (process limits)
+    if (w_min is not None) or (w_max is not None):
+        w_s = np.clip(w_s, _per_trace(w_min, B, -np.inf)[:, None], _per_trace(w_max, B, np.inf)[:, None])
+
+    polygons, left, right = trace_polygon(centerlines, w_s, tangent=tangents)
+    if simplify_tol:
+        polygons = _simplified_polygons(left, right, simplify_tol)
+    return polygons, w_s
+
+def build_traces(
+    paths,
+    mu_w,
+    sigma_w,
+    L_c,
+    model="matern32",
+    ds_arc=2e-4,
+    n_resample=1200,
+    seeds=None,
+    w_min=None,
+    w_max=None,
+    exact_arcs=False,
+    simplify_tol=None,
+    field_method="fft",
+):
+    """
+    Batched build_trace for many primitives at once.
+      paths : list of path_pts (same format as build_trace)
+      mu_w, sigma_w, L_c, w_min, w_max : scalar or one value per path
+      n_resample : scalar or one count per path (see adaptive_sample_counts)
+      seeds : one seed per path
+    Paths sharing a sample count are resampled into one (B, n, 2) array, their
+    width fields come from one batched rfft/irfft and their polygons from one
+    trace_polygon call. Entry b equals build_trace(paths[b], ..., seed=seeds[b]).
+    Returns: list of (polygon, (s, w_s), centerline, dense_centerline)
+    """
+    B = len(paths)
+    if B == 0:
+        return []
+    seeds = np.zeros(B, dtype=int) if seeds is None else np.asarray(seeds)
+    ns = np.broadcast_to(np.asarray(n_resample, dtype=int), (B,))
+    L_c = _per_trace(L_c, B, 0.0)
+    mu_w = _per_trace(mu_w, B, 0.0)
+    sigma_w = _per_trace(sigma_w, B, 0.0)
+    clamp = (w_min is not None) or (w_max is not None)
+    lo = _per_trace(w_min, B, -np.inf) if clamp else None
+    hi = _per_trace(w_max, B,  np.inf) if clamp else None
+
+    results = [None] * B
+    for n in np.unique(ns):
+        rows = np.flatnonzero(ns == n)
+        centerlines, s, tangents, dense = resample_centerlines(
+            [paths[b] for b in rows], n, ds_arc=ds_arc, exact_arcs=exact_arcs,
+        )
+        x = unit_width_fields(s, L_c[rows], model=model, seeds=seeds[rows], field_method=field_method)
+        polygons, w_s = finish_traces(
+            centerlines, x, mu_w[rows], sigma_w[rows],
+            w_min=None if lo is None else lo[rows], w_max=None if hi is None else hi[rows],
+            tangents=tangents, simplify_tol=simplify_tol,
+        )
+        for i, b in enumerate(rows):
+            results[b] = (polygons[i], (s[i], w_s[i]), centerlines[i], dense[i])
+
+    return results
+
+def build_stages_job(items, params):
+    """
+    Process-pool entry point: run only the stages that are not cached yet.
+      items  : one dict per trace with path, n, seed, mu_w, sigma_w, w_min, w_max and
+               optional cached "dense", "geometry" (centerline, s, tangent) and "field"
+      params : model, L_c, ds_arc, exact_arcs, field_method, simplify_tol and
+               lod_floor (None: no "significance" of the polygon vertices for LOD)
+    Returns: (one dict per trace with polygon, w_s and every newly computed stage,
+              CPU seconds of this thread: unlike wall time, not inflated when
+              workers share cores)
+    """
+    t0 = time.thread_time()
+    out = [{} for _ in items]
+    ns = np.array([it["n"] for it in items], dtype=int)
+
+    for n in np.unique(ns):
+        rows = np.flatnonzero(ns == n)
+
+        # A+B) geometry for the traces that miss it
+        todo = [b for b in rows if items[b].get("geometry") is None]
+        if todo:
+            with PERF.stage("trace.geometry", items=len(todo)):
+                centerlines, s, tangents, dense = resample_centerlines(
+                    [items[b]["path"] for b in todo], n,
+                    ds_arc=params["ds_arc"], exact_arcs=params["exact_arcs"],
+                    dense=[items[b].get("dense") for b in todo],
+                )
+            for i, b in enumerate(todo):
+                out[b]["geometry"] = (centerlines[i], s[i], None if tangents is None else tangents[i])
+                if not params["exact_arcs"] and items[b].get("dense") is None:
+                    out[b]["dense"] = dense[i]
+
+        geometry = [items[b].get("geometry") or out[b]["geometry"] for b in rows]
+        centerlines = np.stack([g[0] for g in geometry])
+        s = np.stack([g[1] for g in geometry])
+        tangents = None if geometry[0][2] is None else np.stack([g[2] for g in geometry])
+
+        # C) unit fields for the traces that miss them
+        x = np.empty((len(rows), n))
+        todo = [i for i, b in enumerate(rows) if items[b].get("field") is None]
+        if todo:
+            with PERF.stage("trace.width_field", items=len(todo)):
+                x[todo] = unit_width_fields(
+                    s[todo], params["L_c"], model=params["model"],
+                    seeds=[items[rows[i]]["seed"] for i in todo], field_method=params["field_method"],
+                )
+        for i, b in enumerate(rows):
+            if items[b].get("field") is None:
+                out[b]["field"] = x[i]
+            else:
+                x[i] = items[b]["field"]
+
+        # D) always: scale, clamp, polygon
+        with PERF.stage("trace.polygon", items=len(rows)):
+            polygons, w_s = finish_traces(
+                centerlines, x,
+                [items[b]["mu_w"] for b in rows], [items[b]["sigma_w"] for b in rows],
+                w_min=[items[b].get("w_min") for b in rows], w_max=[items[b].get("w_max") for b in rows],
+                tangents=tangents, simplify_tol=params["simplify_tol"],
+            )
+        for i, b in enumerate(rows):
+            out[b]["polygon"] = polygons[i]
+            out[b]["w_s"] = w_s[i]
+            out[b]["s"] = s[i]
+        if params.get("lod_floor") is not None:
+            with PERF.stage("trace.lod", items=len(rows)):
+                significance = polygons_significance(polygons, params["lod_floor"])
+            for i, b in enumerate(rows):
+                out[b]["significance"] = significance[i]
+
+    return out, time.thread_time() - t0
@@ -0,0 +1,123 @@
+import base64
+import json
+import time
+
+import numpy as np
+
+from backend.trace_generator import SENTINEL_Y
+
+# "json": number lists, the others: base64 buffers (see encode_array)
+ENCODINGS = ("json", "float64", "float32", "quantized")
+QUANTIZED_MARKER = np.iinfo(np.int32).max
+
+
+def encode_array(a, dtype="float64"):
+    """
+    Little-endian base64 buffer of an array, ready for
+    new Float64Array / Float32Array / Int32Array(bytes.buffer) on the JS side.
+    """
+    a = np.ascontiguousarray(a, dtype=np.dtype(dtype).newbyteorder("<"))
+    return {
+        "dtype": np.dtype(dtype).name,
+        "shape": list(a.shape),
+        "data": base64.b64encode(a.tobytes()).decode("ascii"),
+    }
+
+
+def decode_array(encoded):
+    a = np.frombuffer(base64.b64decode(encoded["data"]), dtype=np.dtype(encoded["dtype"]).newbyteorder("<"))
+    return a.reshape(encoded["shape"])
+
+
+def encode_points(points, encoding, origin=(0.0, 0.0), quantum=1e-9):
+    """
+    (N, 2) points incl. [h, SENTINEL_Y] arc markers in one of the binary encodings.
+      float64   - exact
+      float32   - marker y becomes +inf
+      quantized - int32 steps of quantum from origin; marker rows keep h / quantum
+                  (a length, not a position) and y = QUANTIZED_MARKER
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    marker = points[:, 1] == SENTINEL_Y
+    if encoding == "float64":
+        return encode_array(points, "float64")
+    if encoding == "float32":
+        with np.errstate(over="ignore"):
+            out = points.astype(np.float32)
+        out[marker, 1] = np.inf
+        return {**encode_array(out, "float32"), "marker_y": "inf"}
+    if encoding == "quantized":
+        q = np.zeros_like(points)
+        q[~marker] = (points[~marker] - np.asarray(origin, dtype=float)) / quantum
+        q[marker, 0] = points[marker, 0] / quantum
+        q = np.rint(q)
+        if len(q) and np.abs(q).max() >= QUANTIZED_MARKER:
+            raise ValueError(f"Board does not fit int32 steps of {quantum}; use a larger quantum")
+        out = q.astype(np.int32)
+        out[marker, 1] = QUANTIZED_MARKER
+        return {
+            **encode_array(out, "int32"),
+            "origin": [float(origin[0]), float(origin[1])],
+            "quantum": float(quantum),
+            "marker_y": QUANTIZED_MARKER,
+        }
+    raise ValueError(f"Unknown encoding: {encoding}")
+
+
+def encode_primitives(primitives, encoding="json", origin=(0.0, 0.0), quantum=1e-9):
+    """
+    Encode the "points" arrays of primitive dicts in place. "json" turns them
+    into lists; binary encodings move all points into one buffer and give
+    every primitive its "offset" and "count" (rows) in it instead.
+    Return: the keys to add next to the primitives ({} for json).
+    """
+    if encoding == "json":
+        for prim in primitives:
+            prim["points"] = np.asarray(prim["points"]).tolist()
+        return {}
+
+    chunks, offset = [], 0
+    for prim in primitives:
+        points = np.asarray(prim.pop("points"), dtype=float).reshape(-1, 2)
+        prim["offset"], prim["count"] = offset, len(points)
+        offset += len(points)
+        chunks.append(points)
+    points = np.concatenate(chunks) if chunks else np.empty((0, 2))
+    return {"encoding": encoding, "points": encode_points(points, encoding, origin, quantum)}
+
+
+def encode_series(series, encoding="json"):
+    """{"s": array, "w_s": array, ...}: arrays as lists (json) or buffers (float32/64)."""
+    out = {}
+    for key, value in series.items():
+        if isinstance(value, np.ndarray):
+            if encoding == "json":
+                value = value.tolist()
+            else:
+                # stats are relative quantities, quantizing them buys nothing
+                value = encode_array(value, "float32" if encoding == "float32" else "float64")
+        out[key] = value
+    if encoding != "json":
+        out["encoding"] = encoding
+    return out
+
+
+def measure(build, encodings=ENCODINGS, repeat=3):
+    """
+    Size of the JSON text the bridge would send and the time to build and
+    serialize it, for build(encoding) -> payload in every encoding.
+    """
+    report = {}
+    for encoding in encodings:
+        best = np.inf
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            text = json.dumps(build(encoding))
+            best = min(best, time.perf_counter() - t0)
+        report[encoding] = {"bytes": len(text), "seconds": best}
+    base = report.get("json")
+    if base:
+        for entry in report.values():
+            entry["size_ratio"] = entry["bytes"] / base["bytes"] if base["bytes"] else 1.0
+            entry["speedup"] = base["seconds"] / entry["seconds"] if entry["seconds"] > 0 else 1.0
+    return report
@@ -1,11 +1,20 @@
-import { useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import './App.css';
-import { useStore } from './store';
+import { useStore, type JobStatus } from './store';
 import { SettingsPanel } from './components/SettingsPanel';
 import { NetsPanel } from './components/NetsPanel';
 import { Canvas } from './components/Canvas';
 import { StatsPanel } from './components/StatsPanel';
 import { Save, FolderOpen } from 'lucide-react';
+import { CANVAS_ENCODING, decodeNets, type EncodedPayload } from './transport';
+
+// Events of a streaming load (EdbManager.load_edb_streaming), tagged with the load job's id
+type LoadEvent =
+  | (EncodedPayload & { type: 'chunk', job: number, nets: any[], processed: number, total: number })
+  | { type: 'complete', job: number, nets: number, primitives: number, elapsed: number };
+
+// Binary payloads carry offset / count into the shared buffer until decoded
+type LodPrimitive = { id: string | number, points: number[][], offset?: number, count?: number };
 
 // Define the API interface
 declare global {
@@ -16,31 +25,76 @@ declare global {
         open_file_dialog: () => Promise<string | null>;
         save_file_dialog: () => Promise<string | null>;
         load_edb: (path: string, version: string) => Promise<{ nets: any[] } | { error: string }>;
+        start_load_edb: (path: string, version: string, priority?: string[] | null, encoding?: string) => Promise<JobStatus | { error: string }>;
         save_edb: (path: string) => Promise<boolean>;
         generate_variation: (settings: any) => Promise<boolean>;
-        get_primitive_stats: (id: string | number) => Promise<{ s: number[], w_s: number[] } | null>;
-        get_nets: () => Promise<{ nets: any[] }>;
+        start_generation: (settings: any) => Promise<JobStatus | { error: string } | null>;
+        get_job_status: (job_id: number) => Promise<JobStatus | null>;
+        cancel_job: (job_id: number) => Promise<JobStatus | null>;
+        // encoding: 'json' or a binary encoding, decoded by ./transport
+        get_primitive_stats: (id: string | number, variant?: number | null, encoding?: string) => Promise<Record<string, unknown> | null>;
+        get_nets: (zoom?: number | null, pixel_tol?: number, selected_id?: string | number | null, encoding?: string, viewport_px?: number) => Promise<EncodedPayload & { nets: any[] }>;
+        query_viewport: (bbox: number[], layers?: string[] | null, zoom?: number | null, encoding?: string, viewport_px?: number, selected_id?: string | number | null) => Promise<EncodedPayload & { ids: (string | number)[], primitives: LodPrimitive[] }>;
+        pick_primitive: (x: number, y: number, tol: number) => Promise<{ id: string | number, net: string, distance: number } | null>;
+        get_lod: (zoom: number, pixel_tol?: number, selected_id?: string | number | null, primitive_ids?: (string | number)[] | null, encoding?: string, viewport_px?: number) => Promise<EncodedPayload & { tolerance: number | null, primitives: LodPrimitive[] }>;
       };
     };
+    onJobProgress?: (status: JobStatus) => void;
+    onLoadEvent?: (event: LoadEvent) => void;
   }
 }
 
 function App() {
-  const { setNets, settings } = useStore();
+  const { setNets, appendNets, fitView, selectPrimitive, settings, jobs, updateJob } = useStore();
   const [loading, setLoading] = useState(false);
+  const [loadJobId, setLoadJobId] = useState<number | null>(null);
+  const loadJob = useRef(0); // newest load whose chunks are drawn
+  const load = loadJobId === null ? null : jobs[loadJobId];
+
+  // the backend pushes the status of its background jobs here
+  useEffect(() => {
+    window.onJobProgress = updateJob;
+    return () => { window.onJobProgress = undefined; };
+  }, [updateJob]);
+
+  // Nets are drawn chunk by chunk while the board is extracted. Job ids only grow,
+  // so the first chunk of a newer load replaces the previous board and late
+  // chunks of an older one are dropped.
+  useEffect(() => {
+    window.onLoadEvent = (event) => {
+      if (event.job < loadJob.current) return;
+      const first = event.job > loadJob.current;
+      if (first) {
+        loadJob.current = event.job;
+        setLoadJobId(event.job);
+        setNets([]);
+        selectPrimitive(null);
+      }
+      if (event.type === 'chunk') {
+        decodeNets(event);
+        appendNets(event.nets);
+      }
+      // fit the first chunk, then the whole board
+      if (first || event.type === 'complete') fitView();
+    };
+    return () => { window.onLoadEvent = undefined; };
+  }, [setNets, appendNets, fitView, selectPrimitive]);
+
+  useEffect(() => {
+    if (load?.state === 'failed') alert('Error loading EDB: ' + load.error);
+  }, [load?.state, load?.error]);
 
   const handleOpen = async () => {
     if (!window.pywebview) return;
     const path = await window.pywebview.api.open_file_dialog();
     if (path) {
-      setLoading(true);
-      const data = await window.pywebview.api.load_edb(path, settings.aedbVersion);
-      setLoading(false);
-      if ('nets' in data) {
-        setNets(data.nets);
-      } else {
-        alert('Error loading EDB: ' + data.error);
+      const status = await window.pywebview.api.start_load_edb(path, settings.aedbVersion, null, CANVAS_ENCODING);
+      if ('error' in status) {
+        alert('Error loading EDB: ' + status.error);
+        return;
       }
+      updateJob(status);
+      setLoadJobId(status.id);
     }
   };
 
@@ -61,6 +115,7 @@ function App() {
         <div className="toolbar">
           <button onClick={handleOpen}><FolderOpen size={16} /> Open</button>
           <button onClick={handleSave}><Save size={16} /> Save As</button>
+          {load?.state === 'running' && <span>Loading nets {load.processed} / {load.total}</span>}
         </div>
       </header>
       <div className="main-content">
@@ -1,33 +1,56 @@
-import { useStore } from '../store';
+import { PIXEL_TOL, useStore } from '../store';
 import { TransformWrapper, TransformComponent, useControls } from 'react-zoom-pan-pinch';
-import { useEffect } from 'react';
+import React, { useCallback, useEffect, useMemo, useRef } from 'react';
+import { CANVAS_ENCODING, SENTINEL_Y, decodePrimitives } from '../transport';
+
+// Wait this long after the last zoom / pan step before asking for another level of detail
+const LOD_DELAY_MS = 150;
+// A click selects the nearest primitive within this many pixels
+const PICK_PX = 6;
+
+// Fit the board into the view when fitVersion changes (a new board), not on every redraw
+function AutoFit({ fitVersion }: { fitVersion: number }) {
+    const { resetTransform } = useControls();
+    const fitted = useRef(0);
+    useEffect(() => {
+        if (fitVersion !== fitted.current) {
+            fitted.current = fitVersion;
+            resetTransform();
+        }
+    }, [fitVersion, resetTransform]);
+    return null;
+}
 
 export function Canvas() {
-    const { nets, selectedPrimitiveId, selectPrimitive } = useStore();
+    const { nets, selectedPrimitiveId, selectPrimitive, view, setView, updatePoints, fitVersion } = useStore();
+    const containerRef = useRef<HTMLDivElement>(null);
+    const boardRef = useRef<SVGGElement>(null);
+    const pointerDown = useRef<{ x: number, y: number } | null>(null);
+    const lodTimer = useRef<number | undefined>(undefined);
+    const lodRequest = useRef(0);
 
     // Calculate bounding box
-    let minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
-
-    // Filter out sentinel points
-    const SENTINEL_Y = 1.7976931348623157e+308;
-
-    nets.forEach(net => {
-        net.primitives.forEach(p => {
-            p.points.forEach(pt => {
-                const x = pt[0];
-                const y = pt[1];
-                if (Math.abs(y - SENTINEL_Y) < 1e20) return; // Skip sentinel
-                if (x < minX) minX = x;
-                if (x > maxX) maxX = x;
-                if (y < minY) minY = y;
-                if (y > maxY) maxY = y;
+    const { minX, minY, maxX, maxY } = useMemo(() => {
+        let minX = Infinity, minY = Infinity, maxX = -Infinity, maxY = -Infinity;
+        nets.forEach(net => {
+            net.primitives.forEach(p => {
+                p.points.forEach(pt => {
+                    const x = pt[0];
+                    const y = pt[1];
+                    if (Math.abs(y - SENTINEL_Y) < 1e20) return; // Skip sentinel
+                    if (x < minX) minX = x;
+                    if (x > maxX) maxX = x;
+                    if (y < minY) minY = y;
+                    if (y > maxY) maxY = y;
+                });
             });
         });
-    });
 
-    if (minX === Infinity) {
-        minX = 0; maxX = 0.1; minY = 0; maxY = 0.1;
-    }
+        if (minX === Infinity) {
+            minX = 0; maxX = 0.1; minY = 0; maxY = 0.1;
+        }
+        return { minX, minY, maxX, maxY };
+    }, [nets]);
 
     const width = maxX - minX;
     const height = maxY - minY;
@@ -68,30 +91,81 @@ export function Canvas() {
         return d;
     };
 
-    const AutoFit = () => {
-        const { resetTransform } = useControls();
-        useEffect(() => {
-            if (nets.length > 0) {
-                resetTransform();
-            }
-        }, [nets, resetTransform]);
-        return null;
+    // Screen position -> board coordinates (through the zoom / pan transform and the Y flip)
+    const toBoard = (ctm: DOMMatrix, clientX: number, clientY: number) =>
+        new DOMPoint(clientX, clientY).matrixTransform(ctm.inverse());
+
+    // Generated polygons at the level of detail of the current zoom; the selected
+    // primitive always comes at full resolution. Zoomed in, only the primitives in
+    // view are asked for (query_viewport). Late answers of older requests are dropped.
+    const refreshLod = useCallback(async (zoom: number) => {
+        const ctm = boardRef.current?.getScreenCTM();
+        const rect = containerRef.current?.getBoundingClientRect();
+        if (!window.pywebview || !ctm || !rect || nets.length === 0) return;
+        // screen pixels per board unit (zoom included), so the board diagonal at zoom 1 is:
+        const viewportPx = Math.hypot(width, height) * Math.hypot(ctm.a, ctm.b) / zoom;
+        if (!(viewportPx > 0)) return;
+        setView({ zoom, viewportPx });
+
+        const a = toBoard(ctm, rect.left, rect.top);
+        const b = toBoard(ctm, rect.right, rect.bottom);
+        const bbox = [Math.min(a.x, b.x), Math.min(a.y, b.y), Math.max(a.x, b.x), Math.max(a.y, b.y)];
+        const wholeBoard = bbox[0] <= minX && bbox[1] <= minY && bbox[2] >= maxX && bbox[3] >= maxY;
+
+        const request = ++lodRequest.current;
+        const lod = wholeBoard
+            ? await window.pywebview.api.get_lod(zoom, PIXEL_TOL, selectedPrimitiveId, null, CANVAS_ENCODING, viewportPx)
+            : await window.pywebview.api.query_viewport(bbox, null, zoom, CANVAS_ENCODING, viewportPx, selectedPrimitiveId);
+        if (request === lodRequest.current && lod.primitives.length > 0) {
+            decodePrimitives(lod, lod.primitives);
+            updatePoints(lod.primitives);
+        }
+    }, [nets.length, width, height, minX, minY, maxX, maxY, selectedPrimitiveId, setView, updatePoints]);
+
+    // Nearest primitive within PICK_PX of a click; also hits thin traces and polygon insides
+    const handlePick = async (e: React.MouseEvent) => {
+        const start = pointerDown.current;
+        const ctm = boardRef.current?.getScreenCTM();
+        if (!window.pywebview || !ctm || !start) return;
+        if (Math.hypot(e.clientX - start.x, e.clientY - start.y) > 3) return; // end of a pan
+        const p = toBoard(ctm, e.clientX, e.clientY);
+        const hit = await window.pywebview.api.pick_primitive(p.x, p.y, PICK_PX / Math.hypot(ctm.a, ctm.b));
+        selectPrimitive(hit ? hit.id : null);
     };
 
+    const scheduleLod = (zoom: number) => {
+        window.clearTimeout(lodTimer.current);
+        lodTimer.current = window.setTimeout(() => refreshLod(zoom), LOD_DELAY_MS);
+    };
+
+    // the selected primitive switches to full resolution, the previous one back to the zoom level
+    useEffect(() => {
+        refreshLod(view.zoom);
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [selectedPrimitiveId]);
+
+    useEffect(() => () => window.clearTimeout(lodTimer.current), []);
+
     return (
-        <div className="canvas-container">
+        <div className="canvas-container" ref={containerRef}>
             <TransformWrapper
                 initialScale={1}
                 minScale={0.1}
                 maxScale={10000}
                 centerOnInit={true}
+                onTransformed={(_, state) => scheduleLod(state.scale)}
             >
                 {() => (
                     <>
-                        <AutoFit />
+                        <AutoFit fitVersion={fitVersion} />
                         <TransformComponent wrapperStyle={{ width: '100%', height: '100%' }}>
-                            <svg viewBox={viewBox} style={{ width: '100%', height: '100%' }}>
-                                <g transform="scale(1, -1)">
+                            <svg
+                                viewBox={viewBox}
+                                style={{ width: '100%', height: '100%' }}
+                                onPointerDown={(e) => { pointerDown.current = { x: e.clientX, y: e.clientY }; }}
+                                onClick={handlePick}
+                            >
+                                <g ref={boardRef} transform="scale(1, -1)">
                                     {nets.map(net => (
                                         <g key={net.name}>
                                             {net.primitives.map(p => (
@@ -102,10 +176,6 @@ export function Canvas() {
                                                     strokeWidth="2px"
                                                     fill="none"
                                                     vectorEffect="non-scaling-stroke"
-                                                    onClick={(e) => {
-                                                        e.stopPropagation();
-                                                        selectPrimitive(p.id);
-                                                    }}
                                                     style={{ cursor: 'pointer' }}
                                                 >
                                                     <title>{net.name} (ID: {p.id})</title>
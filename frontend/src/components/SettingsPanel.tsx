@@ -1,34 +1,72 @@
-import React, { useState } from 'react';
-import { useStore } from '../store';
-import { Play } from 'lucide-react';
+import React, { useEffect, useState } from 'react';
+import { PIXEL_TOL, useStore } from '../store';
+import { Play, X } from 'lucide-react';
+import { CANVAS_ENCODING, decodeNets, decodeSeries } from '../transport';
+
+// Poll the job status as a fallback for missed progress pushes
+const POLL_MS = 1000;
 
 export function SettingsPanel() {
-    const { settings, updateSettings, setNets, selectedPrimitiveId, setVariationStats } = useStore();
-    const [loading, setLoading] = useState(false);
+    const { settings, updateSettings, setNets, selectedPrimitiveId, setVariationStats, view, jobs, updateJob } = useStore();
+    const [jobId, setJobId] = useState<number | null>(null);
+    const job = jobId === null ? null : jobs[jobId];
+    const running = job?.state === 'queued' || job?.state === 'running';
 
+    // generate_variation would block the bridge for the whole run; a job reports progress and can be cancelled
     const handleGenerate = async () => {
         if (!window.pywebview) return;
-        setLoading(true);
-        const success = await window.pywebview.api.generate_variation(settings);
-        if (success) {
-            if (window.pywebview.api.get_nets) {
-                const data = await window.pywebview.api.get_nets();
-                if ('nets' in data) {
-                    setNets(data.nets);
-                }
+        const status = await window.pywebview.api.start_generation(settings);
+        if (!status || 'error' in status) {
+            alert('Error generating variation: ' + (status ? status.error : 'no EDB loaded'));
+            return;
+        }
+        updateJob(status);
+        setJobId(status.id);
+    };
+
+    const handleCancel = async () => {
+        if (!window.pywebview || jobId === null) return;
+        const status = await window.pywebview.api.cancel_job(jobId);
+        if (status) updateJob(status);
+    };
+
+    useEffect(() => {
+        if (!window.pywebview || jobId === null || !running) return;
+        const timer = window.setInterval(async () => {
+            const status = await window.pywebview.api.get_job_status(jobId);
+            if (status) updateJob(status);
+        }, POLL_MS);
+        return () => window.clearInterval(timer);
+    }, [jobId, running, updateJob]);
+
+    // a finished generation: its polygons and the stats of the selected primitive
+    useEffect(() => {
+        if (!window.pywebview || job?.state !== 'done') return;
+        const refresh = async () => {
+            // polygons at the canvas' current level of detail, the selected one at full resolution
+            const data = await window.pywebview.api.get_nets(view.zoom, PIXEL_TOL, selectedPrimitiveId, CANVAS_ENCODING, view.viewportPx);
+            if ('nets' in data) {
+                decodeNets(data);
+                setNets(data.nets);
             }
 
             // Refresh stats if a primitive is selected
             if (selectedPrimitiveId) {
-                const stats = await window.pywebview.api.get_primitive_stats(selectedPrimitiveId);
-                setVariationStats(stats as { s: number[], w_s: number[], mu_w: number } | null);
+                const stats = await window.pywebview.api.get_primitive_stats(selectedPrimitiveId, null, CANVAS_ENCODING);
+                setVariationStats(decodeSeries<{ s: number[], w_s: number[], mu_w: number }>(stats));
             }
-        }
-        setLoading(false);
-    };
+        };
+        refresh();
+        // eslint-disable-next-line react-hooks/exhaustive-deps
+    }, [jobId, job?.state]);
 
     const handleChange = (e: React.ChangeEvent<HTMLInputElement | HTMLSelectElement>) => {
         const { name, value } = e.target;
+        if (name === 'seed') {
+            // empty: random seeds; only seeded generations are cached on disk
+            updateSettings({ seed: value === '' ? null : parseInt(value, 10) });
+            return;
+        }
         // Handle number inputs
         const isNumber = e.target.type === 'number';
         updateSettings({ [name]: isNumber ? parseFloat(value) : value });
@@ -75,11 +113,34 @@ export function SettingsPanel() {
                     <label>w_max (%)</label>
                     <input type="number" name="w_max" value={settings.w_max} onChange={handleChange} />
                 </div>
+                <div className="form-group">
+                    <label>Seed (optional)</label>
+                    <input type="number" name="seed" value={settings.seed ?? ''} onChange={handleChange} step="1" placeholder="random" />
+                </div>
                 <div className="form-group" style={{ marginTop: '20px' }}>
-                    <button onClick={handleGenerate} className="primary" disabled={loading} style={{ width: '100%', display: 'flex', justifyContent: 'center', alignItems: 'center', gap: '8px' }}>
-                        <Play size={16} /> {loading ? 'Generating...' : 'Generate'}
+                    <button onClick={handleGenerate} className="primary" disabled={running} style={{ width: '100%', display: 'flex', justifyContent: 'center', alignItems: 'center', gap: '8px' }}>
+                        <Play size={16} /> {running ? 'Generating...' : 'Generate'}
                     </button>
                 </div>
+                {job && (
+                    <div className="form-group">
+                        <progress value={job.processed} max={job.total || 1} style={{ width: '100%' }} />
+                        <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', gap: '8px' }}>
+                            <span>
+                                {job.state === 'running' && `${job.processed} / ${job.total} primitives` + (job.eta !== null ? `, ${job.eta.toFixed(1)} s left` : '')}
+                                {job.state === 'queued' && 'Waiting...'}
+                                {job.state === 'done' && `Done in ${job.elapsed.toFixed(1)} s`}
+                                {job.state === 'cancelled' && 'Cancelled, the previous variation is kept'}
+                                {job.state === 'failed' && `Failed: ${job.error}`}
+                            </span>
+                            {running && (
+                                <button onClick={handleCancel} style={{ display: 'flex', alignItems: 'center', gap: '4px' }}>
+                                    <X size={14} /> Cancel
+                                </button>
+                            )}
+                        </div>
+                    </div>
+                )}
             </div>
         </>
     );
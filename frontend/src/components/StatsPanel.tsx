@@ -1,5 +1,6 @@
 import { useEffect, useState } from 'react';
 import { useStore } from '../store';
+import { CANVAS_ENCODING, decodeSeries } from '../transport';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Legend, ReferenceLine } from 'recharts';
 
 export function StatsPanel() {
@@ -10,8 +11,8 @@ export function StatsPanel() {
         const fetchStats = async () => {
             if (selectedPrimitiveId && window.pywebview) {
                 setLoading(true);
-                const stats = await window.pywebview.api.get_primitive_stats(selectedPrimitiveId) as { s: number[], w_s: number[], mu_w: number };
-                setVariationStats(stats);
+                const stats = await window.pywebview.api.get_primitive_stats(selectedPrimitiveId, null, CANVAS_ENCODING);
+                setVariationStats(decodeSeries<{ s: number[], w_s: number[], mu_w: number }>(stats));
                 setLoading(false);
             } else {
                 setVariationStats(null);
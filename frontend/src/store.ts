@@ -21,17 +21,49 @@ interface Settings {
     n_resample: number;
     w_min: number;
     w_max: number;
+    seed: number | null; // null: random seeds, a new variation every time
     aedbVersion: string;
 }
 
+// Canvas zoom as the backend's level of detail expects it (see EdbManager.lod_tolerance)
+interface View {
+    zoom: number; // canvas scale, 1: the whole board fits
+    viewportPx: number; // pixels the board diagonal spans at zoom 1
+}
+
+// Status of a background job (backend/jobs.py), pushed to window.onJobProgress
+export interface JobStatus {
+    id: number;
+    kind: 'generation' | 'load';
+    state: 'queued' | 'running' | 'done' | 'failed' | 'cancelled';
+    processed: number;
+    total: number;
+    elapsed: number; // seconds
+    eta: number | null; // seconds
+    error: string | null;
+}
+
+const FINAL_STATES = ['done', 'failed', 'cancelled'];
+
+// Generated polygons are decimated to stay within this many pixels of the full outline
+export const PIXEL_TOL = 0.5;
+
 interface AppState {
     nets: Net[];
     selectedPrimitiveId: string | number | null;
     settings: Settings;
     variationStats: { s: number[], w_s: number[], mu_w: number } | null;
     isLoading: boolean;
+    view: View;
+    fitVersion: number; // bumped to fit the canvas to the board again
+    jobs: Record<number, JobStatus>;
 
     setNets: (nets: Net[]) => void;
+    appendNets: (nets: Net[]) => void;
+    updatePoints: (primitives: { id: string | number, points: number[][] }[]) => void;
+    setView: (view: View) => void;
+    fitView: () => void;
+    updateJob: (status: JobStatus) => void;
     selectPrimitive: (id: string | number | null) => void;
     updateSettings: (settings: Partial<Settings>) => void;
     setVariationStats: (stats: { s: number[], w_s: number[], mu_w: number } | null) => void;
@@ -49,12 +81,52 @@ export const useStore = create<AppState>((set) => ({
         n_resample: 1200,
         w_min: 80,
         w_max: 120,
+        seed: null,
         aedbVersion: "2024.1"
     },
     variationStats: null,
     isLoading: false,
+    view: { zoom: 1, viewportPx: 1000 },
+    fitVersion: 0,
+    jobs: {},
 
     setNets: (nets) => set({ nets }),
+    // a chunk of a streaming load; a large net may be split over several chunks
+    appendNets: (nets) => set((state) => {
+        const merged = [...state.nets];
+        const index = new Map(merged.map((net, i) => [net.name, i]));
+        for (const net of nets) {
+            const i = index.get(net.name);
+            if (i === undefined) {
+                index.set(net.name, merged.length);
+                merged.push(net);
+            } else {
+                merged[i] = { ...merged[i], primitives: [...merged[i].primitives, ...net.primitives] };
+            }
+        }
+        return { nets: merged };
+    }),
+    // new points (e.g. another level of detail) for some primitives; the other nets keep their objects
+    updatePoints: (primitives) => set((state) => {
+        const byId = new Map(primitives.map(p => [p.id, p.points]));
+        return {
+            nets: state.nets.map(net => net.primitives.some(p => byId.has(p.id)) ? {
+                ...net,
+                primitives: net.primitives.map(p => {
+                    const points = byId.get(p.id);
+                    return points ? { ...p, points } : p;
+                }),
+            } : net),
+        };
+    }),
+    setView: (view) => set({ view }),
+    fitView: () => set((state) => ({ fitVersion: state.fitVersion + 1 })),
+    // pushes and polled statuses can arrive out of order; a finished job stays finished
+    updateJob: (status) => set((state) => {
+        const known = state.jobs[status.id];
+        if (known && FINAL_STATES.includes(known.state)) return {};
+        return { jobs: { ...state.jobs, [status.id]: status } };
+    }),
     selectPrimitive: (id) => set({ selectedPrimitiveId: id }),
     updateSettings: (newSettings) => set((state) => ({ settings: { ...state.settings, ...newSettings } })),
     setVariationStats: (stats) => set({ variationStats: stats }),
@@ -0,0 +1,88 @@
+// Decoding of the binary encodings of backend/transport.py
+
+// Arc marker rows: [h, SENTINEL_Y]
+export const SENTINEL_Y = 1.7976931348623157e+308;
+const QUANTIZED_MARKER = 2147483647;
+
+// Encoding the canvas asks for; float32 is well below a pixel at any usable zoom
+export const CANVAS_ENCODING = 'float32';
+
+export interface EncodedArray {
+    dtype: 'float64' | 'float32' | 'int32';
+    shape: number[];
+    data: string; // base64, little-endian
+    marker_y?: string | number;
+    origin?: [number, number];
+    quantum?: number;
+}
+
+export interface EncodedPayload {
+    encoding?: string;
+    points?: EncodedArray;
+}
+
+interface EncodedPrimitive {
+    points?: number[][];
+    offset?: number;
+    count?: number;
+}
+
+export function decodeArray(encoded: EncodedArray): Float64Array | Float32Array | Int32Array {
+    const binary = atob(encoded.data);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) bytes[i] = binary.charCodeAt(i);
+    // typed arrays use the platform byte order, little-endian on every target we run on
+    if (encoded.dtype === 'float32') return new Float32Array(bytes.buffer);
+    if (encoded.dtype === 'int32') return new Int32Array(bytes.buffer);
+    return new Float64Array(bytes.buffer);
+}
+
+// (N, 2) rows of an encode_points buffer, arc markers back at SENTINEL_Y
+export function decodePoints(encoded: EncodedArray): number[][] {
+    const flat = decodeArray(encoded);
+    const rows: number[][] = new Array(flat.length / 2);
+    if (encoded.dtype === 'int32') {
+        const [x0, y0] = encoded.origin ?? [0, 0];
+        const q = encoded.quantum ?? 1e-9;
+        for (let i = 0; i < rows.length; i++) {
+            const x = flat[2 * i], y = flat[2 * i + 1];
+            // marker rows hold h / quantum, a length rather than a position
+            rows[i] = y === QUANTIZED_MARKER ? [x * q, SENTINEL_Y] : [x0 + x * q, y0 + y * q];
+        }
+    } else {
+        for (let i = 0; i < rows.length; i++) {
+            const y = flat[2 * i + 1];
+            rows[i] = [flat[2 * i], y === Infinity || y === SENTINEL_Y ? SENTINEL_Y : y];
+        }
+    }
+    return rows;
+}
+
+// Fill in the points of the primitives of a payload (in payload order); JSON payloads already have them
+export function decodePrimitives(payload: EncodedPayload, primitives: EncodedPrimitive[]) {
+    if (!payload.encoding || !payload.points) return;
+    const rows = decodePoints(payload.points);
+    for (const p of primitives) {
+        const offset = p.offset ?? 0;
+        p.points = rows.slice(offset, offset + (p.count ?? 0));
+    }
+}
+
+// get_nets / load events: the primitives of all nets share one buffer
+export function decodeNets(payload: EncodedPayload & { nets: { primitives: EncodedPrimitive[] }[] }) {
+    decodePrimitives(payload, payload.nets.flatMap(net => net.primitives));
+}
+
+// get_primitive_stats: every array is its own buffer
+export function decodeSeries<T>(stats: Record<string, unknown> | null): T | null {
+    if (!stats || !stats.encoding) return stats as T | null;
+    const out: Record<string, unknown> = {};
+    for (const [key, value] of Object.entries(stats)) {
+        if (key === 'encoding') continue;
+        const encoded = value as EncodedArray | null;
+        out[key] = encoded && typeof encoded === 'object' && 'data' in encoded
+            ? Array.from(decodeArray(encoded))
+            : value;
+    }
+    return out as T;
+}
@@ -0,0 +1,40 @@
+"""
+Shared fixtures. The tests need neither pyedb nor Ansys: boards are
+synthetic or JSON boards (backend.geometry_backend.MemoryBackend).
+
+    uv run --with pytest pytest
+"""
+import importlib.util
+import os
+
+import pytest
+
+from backend import edb_manager
+from backend.benchmark import synthetic_paths
+from backend.edb_manager import EdbManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    """The per-trace build_trace the batched pipeline replaced."""
+    pytest.importorskip("matplotlib")
+    spec = importlib.util.spec_from_file_location("baseline_trace", os.path.join(ROOT, "test", "trace.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="module")
+def paths():
+    return [p for shape in ("straight", "serpentine", "arcs") for p in synthetic_paths(shape, 6, seed=3)]
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(edb_manager, "LAST_SESSION_PATH", str(tmp_path / "last_session.json"))
+    manager = EdbManager()
+    manager.disk_cache.enabled = False
+    yield manager
+    manager.close()
@@ -0,0 +1,78 @@
+"""adaptive_sample_counts: sizes from length, L_c and arc error, within the caps."""
+import numpy as np
+import pytest
+
+from backend import trace_generator as trace
+from backend.benchmark import synthetic_board, synthetic_paths
+from backend.trace_generator import SENTINEL_Y
+
+
+def is_fft_friendly(n):
+    for p in (2, 3):
+        while n % p == 0:
+            n //= p
+    return n == 1
+
+
+def line(length):
+    return [[0.0, 0.0], [length, 0.0]]
+
+
+def test_counts_follow_length_and_correlation_length():
+    counts = trace.adaptive_sample_counts([line(1e-3), line(1e-2), line(1e-1)], L_c=1e-3)
+    assert all(is_fft_friendly(n) for n in counts)
+    assert counts[0] < counts[1] < counts[2]
+    # at least samples_per_lc samples per L_c
+    assert counts[2] >= 1e-1 / 1e-3 * 10
+    assert trace.adaptive_sample_counts([line(1e-2)], L_c=5e-4)[0] > counts[1]
+
+
+def test_arcs_bound_the_chord_error():
+    R, max_error = 1e-3, 1e-7
+    semicircle = [[0.0, 0.0], [R, SENTINEL_Y], [2 * R, 0.0]]
+    (n,) = trace.adaptive_sample_counts([semicircle], L_c=1.0, max_error=max_error)
+    ds = np.pi * R / (n - 1)
+    assert R * (1 - np.cos(ds / (2 * R))) <= max_error
+    assert n > trace.adaptive_sample_counts([semicircle], L_c=1.0, max_error=1e-5)[0]
+
+
+@pytest.mark.parametrize("max_vertices", [20, 64, 1000])
+def test_max_vertices_caps_every_trace(max_vertices):
+    paths = synthetic_paths("serpentine", 10, seed=1)
+    counts = trace.adaptive_sample_counts(paths, L_c=1e-4, max_vertices=max_vertices)
+    # the cap wins over n_min (16 samples = 32 vertices)
+    assert (2 * counts <= max_vertices).all()
+    assert all(is_fft_friendly(n) for n in counts)
+
+
+@pytest.mark.parametrize("budget", [80, 1000, 30_000])
+def test_vertex_budget_caps_the_board(budget):
+    paths = synthetic_paths("arcs", 10, seed=2) + synthetic_paths("straight", 10, seed=2)
+    free = trace.adaptive_sample_counts(paths, L_c=2e-4)
+    counts = trace.adaptive_sample_counts(paths, L_c=2e-4, vertex_budget=budget)
+    assert 2 * free.sum() > budget
+    assert 2 * counts.sum() <= budget
+    assert (counts >= 2).all() and (counts <= free).all()
+
+
+def test_budget_below_two_samples_per_trace():
+    counts = trace.adaptive_sample_counts([line(1e-2)] * 20, L_c=2e-4, vertex_budget=40)
+    assert (counts == 2).all()
+
+
+def test_fft_friendly_rounding():
+    n = np.arange(1, 3000)
+    up = np.array([trace._fft_friendly_size(k) for k in n])
+    down = trace._fft_friendly_floor(n)
+    assert all(is_fft_friendly(k) for k in np.concatenate([up, down]))
+    assert (down <= n).all() and (n <= up).all()
+    friendly = np.array([is_fft_friendly(k) for k in n])
+    np.testing.assert_array_equal(up[friendly], n[friendly])
+    np.testing.assert_array_equal(down[friendly], n[friendly])
+
+
+def test_generated_polygons_respect_max_vertices(manager):
+    manager.snapshot = synthetic_board(50, seed=3)
+    manager.apply_variation({"seed": 1, "resample_mode": "adaptive", "max_vertices": 64, "L_c": 1e-4})
+    polygons = manager.generated_data.polygons
+    assert np.diff(polygons.offsets).max() <= 64
@@ -0,0 +1,14 @@
+"""Baseline comparison of the benchmark runner."""
+from backend.benchmark import compare, format_comparison
+
+
+def test_comparison_with_a_zero_baseline_time():
+    current = {"results": {"fast": {"seconds": 0.002}, "slow": {"seconds": 2.0, "peak_bytes": 300}}}
+    baseline = {"results": {"fast": {"seconds": 0.0}, "slow": {"seconds": 1.0, "peak_bytes": 100}}}
+    rows = {row["name"]: row for row in compare(current, baseline)}
+    assert rows["fast"]["time_ratio"] is None and not rows["fast"]["regression"]
+    assert rows["slow"]["time_ratio"] == 2.0 and rows["slow"]["regression"]
+
+    lines = format_comparison(list(rows.values())).splitlines()
+    assert "n/a" in lines[1] and lines[2].endswith("REGRESSION")
+    assert "  2.00x   3.00x" in lines[2]
@@ -0,0 +1,42 @@
+"""Vectorized densify_path_with_arc_height against the per-marker original."""
+import numpy as np
+import pytest
+
+from backend import trace_generator as trace
+from backend.trace_generator import SENTINEL_Y
+
+
+def test_densify_matches_baseline(baseline, paths):
+    for p in paths:
+        expected = baseline.densify_path_with_arc_height(p, ds_arc=2e-4)
+        np.testing.assert_allclose(trace.densify_path_with_arc_height(p, ds_arc=2e-4), expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.filterwarnings("error")
+def test_densify_edge_cases_match_baseline(baseline):
+    cases = [
+        [[0.0, 0.0], [1e-3, 0.0]],
+        # marker first / last: no neighbouring point, so it is dropped
+        [[2e-4, SENTINEL_Y], [0.0, 0.0], [1e-3, 0.0], [1e-4, SENTINEL_Y]],
+        # straight (h = 0) and zero-length chords
+        [[0.0, 0.0], [0.0, SENTINEL_Y], [1e-3, 0.0], [1e-4, SENTINEL_Y], [1e-3, 0.0]],
+        # consecutive arcs of both signs
+        [[0.0, 0.0], [3e-4, SENTINEL_Y], [2e-3, 0.0], [-3e-4, SENTINEL_Y], [4e-3, 0.0]],
+    ]
+    for p in cases:
+        np.testing.assert_allclose(
+            trace.densify_path_with_arc_height(p), baseline.densify_path_with_arc_height(p), rtol=0, atol=1e-12
+        )
+    assert trace.densify_path_with_arc_height([]).shape == (0, 2)
+
+
+@pytest.mark.filterwarnings("error")
+def test_arc_batch_matches_single_arcs():
+    rng = np.random.default_rng(0)
+    p0 = rng.uniform(-1e-2, 1e-2, (20, 2))
+    p1 = p0 + rng.uniform(-2e-3, 2e-3, (20, 2))
+    h = rng.uniform(-5e-4, 5e-4, 20)
+    h[:3] = 0.0
+    points, counts = trace._arc_points_from_sagitta_batch(p0, p1, h)
+    for m, chunk in enumerate(np.split(points, np.cumsum(counts)[:-1])):
+        np.testing.assert_allclose(chunk, trace._arc_points_from_sagitta(p0[m], p1[m], h[m]), rtol=0, atol=1e-15)
@@ -0,0 +1,140 @@
+"""On-disk cache of snapshots and generations."""
+import os
+
+import numpy as np
+import pytest
+
+from backend import edb_manager
+from backend.benchmark import synthetic_board
+from backend.disk_cache import DiskCache, edb_fingerprint, generation_key
+from backend.edb_manager import EdbManager, RUN_ONLY_SETTINGS
+from backend.geometry_backend import MemoryBackend
+from backend.packed_data import PackedSeries
+
+
+def generation(n, seed):
+    """polygons, s, w_s of n primitives (s and w_s share their offsets)."""
+    rng = np.random.default_rng(seed)
+    ids = np.arange(1, n + 1)
+    lengths = rng.integers(4, 40, n)
+    polygons = PackedSeries.from_arrays(ids, [rng.normal(size=(2 * k, 2)) for k in lengths])
+    s = PackedSeries.from_arrays(ids, [np.linspace(0.0, 1e-3, k) for k in lengths])
+    w_s = PackedSeries.from_arrays(ids, [rng.normal(1e-4, 1e-5, k) for k in lengths], offsets=s.offsets)
+    return polygons, s, w_s
+
+
+def test_fingerprint_follows_the_content(tmp_path):
+    path = tmp_path / "board.json"
+    path.write_text("a")
+    first = edb_fingerprint(str(path))
+    assert edb_fingerprint(str(path)) == first
+    path.write_text("bb")
+    assert edb_fingerprint(str(path)) != first
+    assert edb_fingerprint(str(tmp_path / "missing.aedb")) is None
+
+
+def test_generation_key_ignores_run_only_settings():
+    ids, seeds = np.arange(5), np.arange(5) * 7
+    key = generation_key("fp", {"sigma_w": 10, "workers": 1}, ids, seeds, ignore=RUN_ONLY_SETTINGS)
+    assert key == generation_key("fp", {"workers": 8, "sigma_w": 10}, ids, seeds, ignore=RUN_ONLY_SETTINGS)
+    assert key != generation_key("fp", {"sigma_w": 11}, ids, seeds, ignore=RUN_ONLY_SETTINGS)
+    assert key != generation_key("fp", {"sigma_w": 10}, ids, seeds + 1, ignore=RUN_ONLY_SETTINGS)
+    assert key != generation_key("fp2", {"sigma_w": 10}, ids, seeds, ignore=RUN_ONLY_SETTINGS)
+
+
+def test_snapshot_round_trip(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    snap = synthetic_board(20, seed=1)
+    assert cache.load_snapshot("fp") is None
+    cache.store_snapshot("fp", snap)
+    loaded = DiskCache(str(tmp_path)).load_snapshot("fp")
+    np.testing.assert_array_equal(loaded.points, snap.points)
+    np.testing.assert_array_equal(loaded.ids, snap.ids)
+    assert loaded.net_names == snap.net_names and loaded.layer_names == snap.layer_names
+
+
+def test_background_store_and_flush(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    polygons, s, w_s = generation(10, 1)
+    cache.store_generation("k", polygons, s, w_s, significance=np.ones(len(polygons.values)), background=True)
+    cache.flush()
+    assert cache.info()["pending"] is False and cache.last_error is None
+    loaded = cache.load_generation("k")
+    for got, expected in zip(loaded[:3], (polygons, s, w_s)):
+        np.testing.assert_array_equal(got.values, expected.values)
+        np.testing.assert_array_equal(got.offsets, expected.offsets)
+    np.testing.assert_array_equal(loaded[3], np.ones(len(polygons.values)))
+    assert cache.info()["hits"] == {"generation": 1}
+
+
+def test_size_cap(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.store_snapshot("fp", synthetic_board(5, seed=1))
+    cache.store_generation("g0", *generation(100, 0))
+    # room for the snapshot and about two generations
+    cache.max_bytes = int(2.5 * cache.info()["bytes"])
+    for k in range(1, 5):
+        cache.store_generation(f"g{k}", *generation(100, k))
+    assert cache.info()["bytes"] <= cache.max_bytes
+    # generations are evicted first, oldest first
+    assert cache.load_snapshot("fp") is not None
+    assert cache.load_generation("g4") is not None and cache.load_generation("g0") is None
+
+    cache.store_generation("huge", *generation(20_000, 9))
+    assert cache.skipped == 1 and cache.load_generation("huge") is None
+
+
+def test_disabled_cache_writes_nothing(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache"), enabled=False)
+    cache.store_snapshot("fp", synthetic_board(5, seed=1))
+    cache.store_generation("k", *generation(3, 1), background=True)
+    cache.flush()
+    assert not os.path.exists(cache.root)
+
+
+@pytest.fixture
+def board_path(tmp_path):
+    path = str(tmp_path / "board.json")
+    MemoryBackend.from_snapshot(synthetic_board(25, seed=8), path=path).save()
+    return path
+
+
+def session(tmp_path, board_path):
+    manager = EdbManager()
+    manager.disk_cache = DiskCache(str(tmp_path / "cache"))
+    manager.open_edb(board_path)
+    return manager
+
+
+def test_seeded_generation_is_restored_in_the_next_session(tmp_path, board_path, monkeypatch):
+    monkeypatch.setattr(edb_manager, "LAST_SESSION_PATH", str(tmp_path / "last_session.json"))
+    first = session(tmp_path, board_path)
+    try:
+        first.apply_variation({"seed": 4, "n_resample": 128, "workers": 1})
+        assert first.generation_report["disk_cache"] == "miss"
+        polygons = first.generated_data.polygons
+    finally:
+        first.close()
+
+    second = session(tmp_path, board_path)
+    try:
+        # run-only settings are not part of the key
+        second.apply_variation({"seed": 4, "n_resample": 128, "workers": 2})
+        assert second.generation_report["disk_cache"] == "hit"
+        np.testing.assert_array_equal(second.generated_data.polygons.values, polygons.values)
+        assert second.disk_cache.info()["hits"] == {"snapshot": 1, "generation": 1}
+    finally:
+        second.close()
+
+
+def test_unseeded_generations_are_not_cached(tmp_path, board_path, monkeypatch):
+    # random per-primitive seeds could never be looked up again, so nothing is stored
+    monkeypatch.setattr(edb_manager, "LAST_SESSION_PATH", str(tmp_path / "last_session.json"))
+    manager = session(tmp_path, board_path)
+    try:
+        manager.apply_variation({"n_resample": 128})
+        manager.disk_cache.flush()
+        assert manager.generation_report["disk_cache"] == "off"
+        assert manager.disk_cache.info()["entries"] == 1 # the snapshot only
+    finally:
+        manager.close()
@@ -0,0 +1,95 @@
+"""Chunked, memory-mapped EnsembleStore."""
+import numpy as np
+import pytest
+
+from backend.benchmark import synthetic_board
+from backend.ensemble_store import EnsembleStore
+from backend.geometry_backend import MemoryBackend
+
+
+def entry(variant, pid, n=50):
+    rng = np.random.default_rng(variant * 1000 + pid)
+    return np.linspace(0.0, 1e-3, n), rng.normal(1e-4, 1e-5, n), rng.normal(size=(2 * n, 2))
+
+
+@pytest.fixture
+def filled(tmp_path):
+    path = str(tmp_path / "store")
+    # ~3 entries per chunk
+    store = EnsembleStore.create(path, chunk_bytes=6000, metadata={"base_seed": 7})
+    for variant in range(4):
+        for pid in (3, 11, 12):
+            store.append(variant, pid, *entry(variant, pid))
+    store.close()
+    return path
+
+
+def test_round_trip_over_many_chunks(filled):
+    store = EnsembleStore.open(filled)
+    assert len(store) == 12
+    assert len(store.manifest["chunks"]) > 1
+    assert store.manifest["metadata"] == {"base_seed": 7}
+    assert store.variants() == [0, 1, 2, 3]
+    assert store.primitives(2) == [3, 11, 12]
+    for variant in range(4):
+        for pid in (3, 11, 12):
+            for got, expected in zip(store.get(variant, pid), entry(variant, pid)):
+                np.testing.assert_array_equal(got, expected)
+    assert store.get(4, 3) is None and store.get(0, 99) is None
+
+
+def test_reads_are_memory_mapped(filled):
+    s, w_s, polygon = EnsembleStore.open(filled).get(1, 11)
+    assert isinstance(w_s, np.memmap) and isinstance(polygon, np.memmap)
+    stats = EnsembleStore.open(filled).get_stats(1, 11)
+    assert stats["variant"] == 1 and not isinstance(stats["w_s"], np.memmap)
+
+
+def test_latest_append_wins(tmp_path):
+    store = EnsembleStore.create(str(tmp_path / "store"), chunk_bytes=1)
+    store.append(0, 5, *entry(0, 5))
+    store.append(0, 5, *entry(1, 5))
+    store.close()
+    np.testing.assert_array_equal(EnsembleStore.open(store.path).get(0, 5)[1], entry(1, 5)[1])
+
+
+def test_reader_sees_chunks_of_a_running_writer(tmp_path):
+    path = str(tmp_path / "store")
+    writer = EnsembleStore.create(path, chunk_bytes=1)
+    writer.append(0, 1, *entry(0, 1))
+    reader = EnsembleStore.open(path)
+    assert reader.variants() == [0]
+
+    writer.append(1, 1, *entry(1, 1))
+    reader.refresh()
+    assert reader.variants() == [0, 1]
+    writer.close()
+
+
+def test_float32_store_and_read_only_mode(tmp_path):
+    path = str(tmp_path / "store")
+    store = EnsembleStore.create(path, dtype="float32")
+    store.append(0, 1, *entry(0, 1))
+    store.close()
+    store = EnsembleStore.open(path)
+    assert store.get(0, 1)[1].dtype == np.float32
+    with pytest.raises(IOError):
+        store.append(0, 2, *entry(0, 2))
+    with pytest.raises(FileNotFoundError):
+        EnsembleStore.open(str(tmp_path / "missing"))
+
+
+def test_ensemble_variants_are_queried_from_the_store(manager, tmp_path):
+    source = str(tmp_path / "board.json")
+    MemoryBackend.from_snapshot(synthetic_board(10, seed=6), path=source).save()
+    manager.open_edb(source)
+    store_path = str(tmp_path / "store")
+    manager.start_ensemble({"n_resample": 128}, 2, str(tmp_path / "out_{k}.json"), base_seed=3, store_path=store_path)
+    assert manager.ensemble.wait(timeout=300)["state"] == "done"
+
+    pid = int(manager.snapshot.ids[0])
+    stats = [manager.get_primitive_stats(pid, variant=k) for k in (0, 1)]
+    assert [len(st["w_s"]) for st in stats] == [128, 128]
+    assert stats[0]["w_s"] != stats[1]["w_s"]
+    assert stats[0]["mu_w"] == float(manager.snapshot.widths[0])
+    assert manager.open_ensemble_store(store_path)["entries"] == 20
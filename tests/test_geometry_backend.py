@@ -0,0 +1,60 @@
+"""JSON board backend: the load / generate / save pipeline without Ansys."""
+import numpy as np
+import pytest
+
+from backend.benchmark import synthetic_board
+from backend.geometry_backend import MemoryBackend, PyEdbBackend, backend_class
+from backend.geometry_snapshot import GeometrySnapshot
+from backend.trace_generator import SENTINEL_Y
+
+
+def test_backend_is_picked_from_the_path():
+    assert backend_class(path="board.JSON") is MemoryBackend
+    assert backend_class(path="project.aedb") is PyEdbBackend
+    with pytest.raises(ValueError):
+        backend_class("gds")
+
+
+def test_snapshot_survives_a_save(tmp_path):
+    snap = synthetic_board(30, seed=1)
+    path = str(tmp_path / "board.json")
+    MemoryBackend.from_snapshot(snap, path=path).save()
+
+    loaded = GeometrySnapshot.from_edb(MemoryBackend.open(path))
+    np.testing.assert_array_equal(loaded.ids, snap.ids)
+    np.testing.assert_array_equal(loaded.widths, snap.widths)
+    np.testing.assert_array_equal(loaded.points, snap.points)
+    assert loaded.net_names == snap.net_names
+
+
+def test_hand_written_board_with_lists(tmp_path):
+    board = MemoryBackend([{"name": "N1", "primitives": [
+        {"id": 7, "type": "Path", "layer": "TOP", "width": 1e-4,
+         "center_line": [[0.0, 0.0], [1e-4, SENTINEL_Y], [1e-3, 0.0]]},
+    ]}, {"name": "GND", "signal": False}])
+    assert [name for name, _ in board.signal_nets()] == ["N1"]
+    ((pid, width, layer, center_line),) = board.net_paths(board.nets["N1"])
+    assert (pid, width, layer, center_line.shape) == (7, 1e-4, "TOP", (3, 2))
+    with pytest.raises(ValueError):
+        board.save()
+
+
+def test_json_board_round_trip(manager, tmp_path):
+    source = str(tmp_path / "board.json")
+    MemoryBackend.from_snapshot(synthetic_board(40, seed=4), path=source).save()
+
+    snap = manager.open_edb(source)
+    assert len(snap) == 40
+    assert manager.apply_variation({"seed": 1, "n_resample": 200})
+    expected = {pid: np.array(data["points"]) for pid, data in manager.generated_data.items()}
+
+    target = str(tmp_path / "variant.json")
+    status = manager.writer.wait(manager.queue_save(target))
+    assert status["state"] == "done", status["error"]
+    assert status["report"]["replaced"] == 40
+
+    saved = MemoryBackend.open(target)
+    records = [r for net in saved.nets.values() for r in net["primitives"].values()]
+    assert all(r["type"] == "Polygon" for r in records)
+    polygons = sorted(len(r["points"]) for r in records)
+    assert polygons == sorted(len(points) for points in expected.values())
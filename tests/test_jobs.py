@@ -0,0 +1,61 @@
+"""Background generation jobs: progress, cancelling, the newest job wins."""
+import numpy as np
+import pytest
+
+from backend.benchmark import synthetic_board
+
+SETTINGS = {"seed": 3, "n_resample": 300, "batch_size": 8}
+
+
+@pytest.fixture
+def board(manager):
+    manager.snapshot = synthetic_board(40, seed=5)
+    manager.apply_variation({**SETTINGS, "seed": 1})
+    return manager
+
+
+def test_job_reports_progress_until_done(board):
+    pushed = []
+    status = board.start_generation(SETTINGS, on_progress=pushed.append)
+    assert status["kind"] == "generation" and status["total"] == 40
+    status = board.jobs[status["id"]].wait(timeout=60)
+    assert status["state"] == "done", status["error"]
+    assert status["processed"] == status["total"] and status["eta"] == 0.0
+    assert status["report"] is not None
+    states = [s["state"] for s in pushed]
+    assert states[0] == "running" and states[-1] == "done"
+    assert board.get_job_status(status["id"])["state"] == "done"
+
+
+def test_cancel_keeps_the_previous_generation(board):
+    before = board.generated_data.polygons.values.copy()
+    seeds = dict(board.seeds)
+
+    def cancel_once_running(status):
+        if status["state"] == "running":
+            board.cancel_job(status["id"])
+
+    status = board.start_generation(SETTINGS, on_progress=cancel_once_running)
+    status = board.jobs[status["id"]].wait(timeout=60)
+    assert status["state"] == "cancelled"
+    assert 0 < status["processed"] < status["total"]
+    np.testing.assert_array_equal(board.generated_data.polygons.values, before)
+    assert board.seeds == seeds
+
+
+def test_newest_job_cancels_the_older_one(board):
+    # both wait for the lock, so the first is still queued when the second starts
+    with board._generate_lock:
+        first = board.start_generation({**SETTINGS, "seed": 7})
+        second = board.start_generation(SETTINGS)
+    assert board.jobs[first["id"]].wait(timeout=60)["state"] == "cancelled"
+    assert board.jobs[second["id"]].wait(timeout=60)["state"] == "done"
+
+    expected = board.generated_data.polygons.values.copy()
+    board.apply_variation(SETTINGS)
+    np.testing.assert_array_equal(board.generated_data.polygons.values, expected)
+
+
+def test_unknown_job(board):
+    assert board.get_job_status(12345) is None
+    assert board.cancel_job(12345) is None
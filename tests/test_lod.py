@@ -0,0 +1,71 @@
+"""Level-of-detail decimation of the generated polygons sent to the canvas."""
+import numpy as np
+import pytest
+
+from backend import trace_generator as trace
+from backend.benchmark import synthetic_board
+
+
+@pytest.fixture
+def generated(manager):
+    manager.snapshot = synthetic_board(40, seed=7)
+    manager.apply_variation({"seed": 2, "n_resample": 600})
+    return manager
+
+
+def test_significance_gives_every_rdp_level():
+    rng = np.random.default_rng(1)
+    t = np.linspace(0.0, 2 * np.pi, 400)
+    pts = np.column_stack([t, np.sin(t) + 0.01 * rng.normal(size=len(t))])
+    sig = trace.rdp_significance(pts, [0], [len(pts) - 1], floor=1e-3)
+    for tol in (1e-3, 5e-3, 2e-2, 0.1, 1.0):
+        np.testing.assert_array_equal(sig > tol, trace._rdp_keep(pts, np.array([0]), np.array([len(pts) - 1]), tol))
+
+
+def test_significance_is_computed_with_the_generation(generated):
+    data = generated.generated_data
+    sig = data.significance_values()
+    assert sig is not None and len(sig) == len(data.polygons.values)
+    assert generated.generation_report["primitives"] == 40
+
+
+def test_zoom_decimates_within_the_pixel_tolerance(generated):
+    coarse = generated.get_nets(zoom=1)
+    fine = generated.get_nets(zoom=100)
+    full = generated.get_nets()
+    assert "lod" not in full
+    assert coarse["lod"]["tolerance"] > fine["lod"]["tolerance"]
+    assert coarse["lod"]["points"] < fine["lod"]["points"] <= fine["lod"]["points_full"]
+
+    # every dropped vertex is within the tolerance of the kept outline
+    tol = coarse["lod"]["tolerance"]
+    pid = next(iter(generated.generated_data))
+    points = generated.generated_data.polygons.get(pid)
+    kept = generated.generated_data.simplified(pid, tol, generated.lod_floor())
+    np.testing.assert_array_equal(kept, trace.simplify_polyline(points, tol))
+
+
+def test_selected_and_deep_zoom_are_full_resolution(generated):
+    pid = next(iter(generated.generated_data))
+    full = len(generated.generated_data.polygons.get(pid))
+    lod = generated.get_lod(zoom=1, selected_id=pid)
+    by_id = {p["id"]: p["points"] for p in lod["primitives"]}
+    assert len(by_id[pid]) == full
+    assert sum(map(len, by_id.values())) < len(generated.generated_data.polygons.values)
+
+    # finer than the precomputed floor: nothing is dropped
+    deep = generated.get_lod(tolerance=generated.lod_floor() / 2)
+    assert sum(len(p["points"]) for p in deep["primitives"]) == len(generated.generated_data.polygons.values)
+
+
+def test_viewport_px_scales_the_tolerance(generated):
+    assert generated.lod_tolerance(2, viewport_px=2000) == pytest.approx(generated.lod_tolerance(1, viewport_px=4000))
+    assert generated.lod_tolerance(None) is None
+
+
+def test_snapshot_bounds_are_computed_once():
+    snap = synthetic_board(10, seed=1)
+    bounds = snap.bounds()
+    assert snap.bounds() is bounds
+    pts = snap.points[snap.points[:, 1] != trace.SENTINEL_Y]
+    assert bounds == (pts[:, 0].min(), pts[:, 1].min(), pts[:, 0].max(), pts[:, 1].max())
@@ -0,0 +1,45 @@
+"""Process-pool execution of apply_variation."""
+import os
+
+import numpy as np
+import pytest
+
+from backend.benchmark import synthetic_board
+
+SETTINGS = {"seed": 9, "batch_size": 16, "resample_mode": "adaptive"}
+
+
+@pytest.fixture
+def board(manager, monkeypatch):
+    # workers are capped at the core count; pretend there are enough
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    manager.snapshot = synthetic_board(120, seed=2)
+    return manager
+
+
+def test_generation_does_not_depend_on_workers(board):
+    results = []
+    for workers in (1, 3):
+        board.stage_cache.clear()
+        board.apply_variation({**SETTINGS, "workers": workers})
+        assert board.generation_report["workers"] == workers
+        results.append(board.generated_data)
+    serial, parallel = results
+    assert list(serial) == list(parallel)
+    np.testing.assert_array_equal(serial.polygons.offsets, parallel.polygons.offsets)
+    np.testing.assert_array_equal(serial.polygons.values, parallel.polygons.values)
+
+
+def test_workers_are_capped_at_the_core_count(board, monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    board.apply_variation({**SETTINGS, "workers": 8})
+    assert board.generation_report["workers"] == 2
+
+
+def test_pool_started_from_a_job_thread(board, recwarn):
+    status = board.start_generation({**SETTINGS, "workers": 3})
+    status = board.jobs[status["id"]].wait(timeout=120)
+    assert status["state"] == "done", status["error"]
+    assert status["report"]["workers"] == 3
+    # a forked pool warns "This process is multi-threaded, use of fork() may lead to deadlocks"
+    assert not [w for w in recwarn if "fork()" in str(w.message)]
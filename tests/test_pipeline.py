@@ -0,0 +1,33 @@
+"""
+Batched trace engine (build_traces) against the per-trace path and the
+original implementation in test/trace.py.
+"""
+import numpy as np
+
+from backend import trace_generator as trace
+
+
+def test_build_trace_matches_baseline(baseline, paths):
+    for k, p in enumerate(paths):
+        kwargs = dict(mu_w=1e-4, sigma_w=1e-5, L_c=0.002, n_resample=400, seed=k, w_min=8e-5, w_max=1.2e-4, plot=False)
+        expected = baseline.build_trace(p, **kwargs)
+        polygon, (s, w_s), centerline, _ = trace.build_trace(p, **kwargs)
+        np.testing.assert_allclose(polygon, expected[0], rtol=0, atol=1e-12)
+        np.testing.assert_allclose(w_s, expected[1][1], rtol=0, atol=1e-15)
+        np.testing.assert_allclose(centerline, expected[2], rtol=0, atol=1e-12)
+
+
+def test_build_traces_matches_per_trace(paths):
+    counts = [300 if k % 2 else 512 for k in range(len(paths))]
+    widths = np.linspace(8e-5, 1.5e-4, len(paths))
+    seeds = [trace.derive_seed(5, k) for k in range(len(paths))]
+    batched = trace.build_traces(
+        paths, widths, 0.1 * widths, 0.002, n_resample=counts, seeds=seeds, w_min=0.8 * widths, w_max=1.2 * widths,
+    )
+    for k, p in enumerate(paths):
+        polygon, (s, w_s), centerline, _ = trace.build_trace(
+            p, widths[k], 0.1 * widths[k], 0.002, n_resample=counts[k], seed=seeds[k],
+            w_min=0.8 * widths[k], w_max=1.2 * widths[k], plot=False,
+        )
+        np.testing.assert_allclose(batched[k][0], polygon, rtol=0, atol=1e-12)
+        np.testing.assert_allclose(batched[k][1][1], w_s, rtol=0, atol=1e-15)
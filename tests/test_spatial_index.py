@@ -0,0 +1,93 @@
+"""Grid index behind query_viewport / pick_primitive."""
+import numpy as np
+import pytest
+
+from backend import trace_generator as trace
+from backend.benchmark import synthetic_board
+from backend.geometry_snapshot import GeometrySnapshot
+from backend.spatial_index import SpatialIndex, distance_to_path, distance_to_polygon, path_bounds
+
+
+def _overlaps(boxes, bbox):
+    xmin, ymin, xmax, ymax = bbox
+    return (boxes[:, 0] <= xmax) & (boxes[:, 2] >= xmin) & (boxes[:, 1] <= ymax) & (boxes[:, 3] >= ymin)
+
+
+def test_query_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lo = rng.uniform(0, 1, (300, 2))
+    boxes = np.hstack([lo, lo + rng.uniform(0, 0.1, (300, 2))])
+    layers = rng.integers(0, 3, 300)
+    index = SpatialIndex(boxes, layers)
+    for _ in range(50):
+        a, b = rng.uniform(-0.1, 1.1, 2), rng.uniform(-0.1, 1.1, 2)
+        bbox = (*np.minimum(a, b), *np.maximum(a, b))
+        hit = _overlaps(boxes, bbox)
+        assert sorted(index.query(bbox).tolist()) == np.flatnonzero(hit).tolist()
+        assert sorted(index.query(bbox, [1]).tolist()) == np.flatnonzero(hit & (layers == 1)).tolist()
+    assert len(index.query((2, 2, 3, 3))) == 0
+    assert len(index.query((1, 1, 0, 0))) == 0
+
+
+def test_path_bounds_grow_by_width_and_sagitta():
+    # a straight Path and an arc whose bulge (sagitta 0.3) is not in its vertices
+    points = [[0.0, 0.0], [1.0, 0.0], [0.0, 2.0], [0.3, trace.SENTINEL_Y], [1.0, 2.0]]
+    snap = GeometrySnapshot([1, 2], [0.2, 0.1], [0, 0], [0, 1], [0, 2, 5], points, ["N"], ["L1", "L2"])
+    np.testing.assert_allclose(path_bounds(snap), [
+        [-0.1, -0.1, 1.1, 0.1],
+        [-0.35, 1.65, 1.35, 2.35],
+    ])
+
+
+def test_distances():
+    square = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    assert distance_to_polygon(square, 0.5, 0.5) == 0.0
+    assert distance_to_polygon(square, 1.5, 0.5) == pytest.approx(0.5)
+    line = np.array([[0.0, 0.0], [1.0, 0.0]])
+    assert distance_to_path(line, 0.2, 0.5, 0.05) == 0.0
+    assert distance_to_path(line, 0.2, 0.5, 0.3) == pytest.approx(0.2)
+
+
+@pytest.fixture
+def board(manager):
+    manager.snapshot = synthetic_board(40, seed=7)
+    return manager
+
+
+def test_query_viewport_returns_the_primitives_in_view(board):
+    boxes = path_bounds(board.snapshot)
+    xmin, ymin, xmax, ymax = board.snapshot.bounds()
+    bbox = [xmin, ymin, (xmin + xmax) / 2, (ymin + ymax) / 2]
+    result = board.query_viewport(bbox)
+    expected = board.snapshot.ids[_overlaps(boxes, bbox)].tolist()
+    assert sorted(result["ids"]) == sorted(expected)
+    assert 0 < len(expected) < len(board.snapshot)
+
+    only = board.query_viewport(bbox, layers=["L2"])
+    assert {p["layer"] for p in only["primitives"]} == {"L2"}
+
+
+@pytest.fixture
+def generated_board(board):
+    board.apply_variation({"seed": 2, "n_resample": 600})
+    return board
+
+
+def test_query_viewport_decimates_with_the_viewport_size(generated_board):
+    bbox = generated_board.snapshot.bounds()
+    coarse = generated_board.query_viewport(bbox, zoom=1, viewport_px=200)
+    fine = generated_board.query_viewport(bbox, zoom=1, viewport_px=20000)
+    assert sum(len(p["points"]) for p in coarse["primitives"]) < sum(len(p["points"]) for p in fine["primitives"])
+
+
+def test_pick_primitive(generated_board):
+    snap = generated_board.snapshot
+    pid = int(snap.ids[5])
+    polygon = generated_board.generated_data.polygons.get(pid)
+    x, y = polygon[0]
+    hit = generated_board.pick_primitive(x, y, 1e-6)
+    assert hit["id"] == pid and hit["distance"] <= 1e-6
+    assert hit["net"] == snap.net_name(5)
+
+    xmin, ymin, xmax, ymax = snap.bounds()
+    assert generated_board.pick_primitive(xmax + 1, ymax + 1, 1e-3) is None
@@ -0,0 +1,37 @@
+"""Cached spectral filters of width_random_field_fft."""
+import numpy as np
+import pytest
+
+from backend import trace_generator as trace
+
+MODELS = ("exponential", "gaussian", "matern32", "band_limited")
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_width_field_matches_baseline(baseline, model):
+    s = np.linspace(0.0, 0.03, 1200)
+    expected = baseline.width_random_field_fft(s, 1e-4, 1e-5, 0.002, model=model, seed=11)
+    trace.clear_spectral_filter_cache()
+    # cold, then from the cached filter
+    for _ in range(2):
+        w = trace.width_random_field_fft(s, 1e-4, 1e-5, 0.002, model=model, seed=11)
+        np.testing.assert_allclose(w, expected, rtol=0, atol=1e-15)
+
+
+def test_filter_is_computed_once_per_shape():
+    trace.clear_spectral_filter_cache()
+    s = np.linspace(0.0, 0.01, 500)
+    for seed in range(5):
+        trace.width_random_field_fft(s, 1e-4, 1e-5, 0.002, model="gaussian", seed=seed)
+    info = trace.spectral_filter_cache_info()
+    assert (info["misses"], info["hits"], info["size"]) == (1, 4, 1)
+
+    # another correlation length is another filter
+    trace.width_random_field_fft(s, 1e-4, 1e-5, 0.003, model="gaussian", seed=0)
+    assert trace.spectral_filter_cache_info()["misses"] == 2
+
+
+def test_cached_filter_is_read_only():
+    H = trace._spectral_filter(64, 1e-4, 0.002, "matern32")
+    with pytest.raises(ValueError):
+        H[0] = 0.0
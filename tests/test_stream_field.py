@@ -0,0 +1,65 @@
+"""O(N) streaming width fields (field_method="stream")."""
+import numpy as np
+import pytest
+
+from backend import trace_generator as trace
+
+MODELS = ("exponential", "gaussian", "matern32", "band_limited")
+
+
+def stream(n, ds, Lc, model, chunk_size=65536, seed=3):
+    return list(trace.width_random_field_stream(n, ds, 0.0, 1.0, Lc, model=model, seed=seed, chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_output_does_not_depend_on_chunk_size(model):
+    small = stream(5000, 1e-5, 2e-4, model, chunk_size=333)
+    assert max(len(chunk) for chunk in small) <= 333
+    np.testing.assert_allclose(np.concatenate(small), np.concatenate(stream(5000, 1e-5, 2e-4, model)), rtol=0, atol=1e-9)
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_field_is_stationary_with_unit_variance(model):
+    w = np.concatenate(stream(400_000, 1e-5, 1e-4, model, chunk_size=10_000))
+    assert abs(w.mean()) < 0.05
+    assert abs(w.std() - 1.0) < 0.05
+    # no seam at the chunk borders: same step statistics there as elsewhere
+    steps = np.abs(np.diff(w))
+    seams = steps[np.arange(10_000, 400_000, 10_000) - 1]
+    assert seams.mean() < 3 * steps.mean()
+
+
+def test_exponential_correlation():
+    ds, Lc = 1e-5, 2e-4
+    w = np.concatenate(stream(400_000, ds, Lc, "exponential"))
+    lag1 = np.corrcoef(w[:-1], w[1:])[0, 1]
+    assert abs(lag1 - np.exp(-2 * np.pi * ds / Lc)) < 0.01
+
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("model", ["exponential", "matern32"])
+@pytest.mark.parametrize("ratio", [50, 110, 120, 1e4])
+def test_tiny_correlation_length_gives_white_noise(model, ratio):
+    # ds = ratio * L_c: r = exp(-2 pi ratio) underflows to 0 near ratio 120
+    w = np.concatenate(stream(20_000, 1e-5, 1e-5 / ratio, model))
+    assert np.isfinite(w).all()
+    assert abs(w.std() - 1.0) < 0.05
+    assert abs(np.corrcoef(w[:-1], w[1:])[0, 1]) < 0.05
+
+
+@pytest.mark.parametrize("model", ["gaussian", "band_limited"])
+def test_fir_kernel_is_bounded(model):
+    h = trace._fir_kernel(1e-5, 1e-4, model)
+    assert np.sum(h * h) == pytest.approx(1.0)
+    assert len(h) % 2 == 1
+    with pytest.raises(ValueError, match="field_method='fft'"):
+        trace._fir_kernel(1e-9, 1.0, model)
+
+
+def test_build_trace_with_streamed_field(paths):
+    polygon, (s, w_s), _, _ = trace.build_trace(
+        paths[0], 1e-4, 1e-5, 0.002, n_resample=2000, seed=1, w_min=9e-5, w_max=1.1e-4, field_method="stream",
+    )
+    assert polygon.shape == (2 * 2000, 2)
+    assert (w_s >= 9e-5).all() and (w_s <= 1.1e-4).all()
+    assert np.std(w_s) > 0
@@ -0,0 +1,70 @@
+"""Binary encodings of the bridge payloads (backend/transport.py)."""
+import json
+
+import numpy as np
+import pytest
+
+from backend import transport
+from backend import trace_generator as trace
+from backend.benchmark import synthetic_board
+
+
+def _decode_points(encoded):
+    """What frontend/src/transport.ts decodePoints does."""
+    a = transport.decode_array(encoded).astype(float)
+    if encoded["dtype"] == "int32":
+        marker = a[:, 1] == transport.QUANTIZED_MARKER
+        a = a * encoded["quantum"]
+        a[~marker] += encoded["origin"]
+    else:
+        marker = np.isinf(a[:, 1]) | (a[:, 1] == trace.SENTINEL_Y)
+    a[marker, 1] = trace.SENTINEL_Y
+    return a
+
+
+POINTS = np.array([[0.01, 0.02], [2e-4, trace.SENTINEL_Y], [0.0125, 0.0201], [0.013, 0.019]])
+
+
+@pytest.mark.parametrize("encoding, atol", [("float64", 0), ("float32", 1e-9), ("quantized", 5e-10)])
+def test_points_round_trip(encoding, atol):
+    encoded = transport.encode_points(POINTS, encoding, origin=(0.01, 0.019))
+    decoded = _decode_points(json.loads(json.dumps(encoded)))
+    assert decoded[1, 1] == trace.SENTINEL_Y
+    np.testing.assert_allclose(decoded, POINTS, rtol=0, atol=atol)
+
+
+def test_quantized_overflow_raises():
+    with pytest.raises(ValueError):
+        transport.encode_points([[10.0, 0.0]], "quantized", quantum=1e-9)
+    with pytest.raises(ValueError):
+        transport.encode_points(POINTS, "float16")
+
+
+def test_primitives_share_one_buffer():
+    primitives = [{"id": 1, "points": POINTS[:2]}, {"id": 2, "points": POINTS[2:]}]
+    extra = transport.encode_primitives(primitives, "float64")
+    rows = _decode_points(extra["points"])
+    assert [(p["offset"], p["count"]) for p in primitives] == [(0, 2), (2, 2)]
+    np.testing.assert_array_equal(rows, POINTS)
+
+
+def test_nets_in_every_encoding_match_json(manager):
+    manager.snapshot = synthetic_board(12, seed=4)
+    manager.apply_variation({"seed": 1, "n_resample": 300})
+    reference = manager.get_nets()
+    expected = [np.asarray(p["points"]) for net in reference["nets"] for p in net["primitives"]]
+    for encoding, atol in (("float64", 0), ("float32", 1e-8), ("quantized", 1e-9)):
+        payload = json.loads(json.dumps(manager.get_nets(encoding=encoding)))
+        assert payload["encoding"] == encoding
+        rows = _decode_points(payload["points"])
+        primitives = [p for net in payload["nets"] for p in net["primitives"]]
+        for p, points in zip(primitives, expected):
+            np.testing.assert_allclose(rows[p["offset"]:p["offset"] + p["count"]], points, rtol=0, atol=atol)
+
+
+def test_series_keep_the_other_fields():
+    series = {"s": np.linspace(0, 1, 5), "w_s": np.full(5, 1e-4), "net": "N1"}
+    assert transport.encode_series(series)["s"] == series["s"].tolist()
+    encoded = transport.encode_series(series, "float32")
+    assert encoded["encoding"] == "float32" and encoded["net"] == "N1"
+    np.testing.assert_allclose(transport.decode_array(encoded["w_s"]), series["w_s"], rtol=1e-6)